@@ -1,30 +1,185 @@
 import os
+import re
+import sys
 import glob
+import json
+import hashlib
+import shutil
 import zipfile
+from collections import namedtuple
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
 import requests
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "3PrepDatos"))
+from esquema_accidentes import plan_lectura, esquema_arrow, COLUMNAS_PARTICION
+from metricas import medida, etapa, etapa_actual, ejecucion, fijar_ejecucion
+from huellas import HuellasVistas, quitar_duplicados
 
 RAW_DIR_INEGI = "./data/raw/inegi"
 PROCESSED_DIR = "./data/processed"
+INEGI_ZIP_PATH = os.path.join(RAW_DIR_INEGI, "inegi_atus.zip")
+TIDY_DATASET_DIR = os.path.join(PROCESSED_DIR, "inegi_tidy")
+ARCHIVO_FUENTES = "_fuentes.json"
+
+# Filas por bloque y procesos en el modo de lectura por bloques de tidy_inegi_data
+CHUNKSIZE_TIDY = 200_000
+WORKERS_TIDY = os.cpu_count() or 1
 
 INEGI_ZIP_URL = "https://www.inegi.org.mx/contenidos/programas/accidentes/datosabiertos/conjunto_de_datos_atus_anual_csv.zip"
 
 
-def download_inegi_zip():
-    """Descarga el ZIP de INEGI si no existe."""
-    os.makedirs(RAW_DIR_INEGI, exist_ok=True)
-    zip_path = os.path.join(RAW_DIR_INEGI, "inegi_atus.zip")
+# Descarga por bloques: bytes por escritura, reintentos ante un corte y
+# timeouts (conexión, lectura) en segundos
+CHUNK_DESCARGA = 1 << 20
+REINTENTOS_DESCARGA = 3
+TIMEOUT_DESCARGA = (10, 60)
+
+
+def _leer_json(ruta):
+    """Contenido de un JSON auxiliar ({} si no existe o está dañado)."""
+    try:
+        with open(ruta, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _escribir_json(ruta, datos):
+    """Escribe un JSON auxiliar de forma atómica (archivo temporal + rename)."""
+    tmp = ruta + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(datos, f, indent=2)
+    os.replace(tmp, ruta)
+
+
+def _validadores(respuesta):
+    """ETag / Last-Modified de una respuesta HTTP (solo los que vienen)."""
+    return {clave: respuesta.headers[encabezado]
+            for clave, encabezado in [("etag", "ETag"), ("last_modified", "Last-Modified")]
+            if encabezado in respuesta.headers}
+
+
+def _tamano_esperado(respuesta, offset):
+    """Tamaño total del archivo según Content-Range / Content-Length (None si no se sabe)."""
+    rango = respuesta.headers.get("Content-Range", "")
+    if respuesta.status_code == 206 and "/" in rango and not rango.endswith("/*"):
+        return int(rango.rsplit("/", 1)[1])
+    if "Content-Length" in respuesta.headers:
+        return offset + int(respuesta.headers["Content-Length"])
+    return None
+
+
+def _verificar_zip(ruta, tamano_esperado):
+    """Comprueba el tamaño recibido y el CRC de todos los miembros del ZIP."""
+    tamano = os.path.getsize(ruta)
+    if tamano_esperado is not None and tamano != tamano_esperado:
+        raise IOError(f"Descarga incompleta: {tamano:,} de {tamano_esperado:,} bytes")
+    try:
+        with zipfile.ZipFile(ruta) as z:
+            dañado = z.testzip()
+    except zipfile.BadZipFile as e:
+        raise IOError(f"El archivo descargado no es un ZIP válido: {e}")
+    if dañado is not None:
+        raise IOError(f"CRC incorrecto en el miembro {dañado} del ZIP descargado")
+
 
-    if not os.path.exists(zip_path):
-        print("⬇️ Descargando datos de INEGI...")
-        r = requests.get(INEGI_ZIP_URL)
-        with open(zip_path, "wb") as f:
-            f.write(r.content)
-        print("   ✓ Descarga completada")
+def _descargar_una_vez(url, zip_path, chunk_bytes, timeout):
+    """
+    Un intento de descarga. Regresa True si se actualizó zip_path y False si
+    el servidor respondió 304 (el ZIP local sigue vigente).
+
+    - Con un .part pendiente se pide solo lo que falta (Range + If-Range);
+      si el archivo cambió en el servidor, If-Range hace que llegue completo.
+    - Sin .part y con ZIP local se revalida con If-None-Match /
+      If-Modified-Since: si no cambió, cuesta una sola petición.
+    """
+    parcial = zip_path + ".part"
+    meta_parcial = _leer_json(parcial + ".json")
+    meta_zip = _leer_json(zip_path + ".json")
+
+    headers = {}
+    offset = os.path.getsize(parcial) if os.path.exists(parcial) else 0
+    validador_parcial = meta_parcial.get("etag") or meta_parcial.get("last_modified")
+    if offset and validador_parcial:
+        headers["Range"] = f"bytes={offset}-"
+        headers["If-Range"] = validador_parcial
     else:
-        print("📦 ZIP ya existe, no se descarga nuevamente.")
+        offset = 0
+        if os.path.exists(zip_path):
+            if "etag" in meta_zip:
+                headers["If-None-Match"] = meta_zip["etag"]
+            if "last_modified" in meta_zip:
+                headers["If-Modified-Since"] = meta_zip["last_modified"]
+
+    with requests.get(url, headers=headers, stream=True, timeout=timeout) as r:
+        if r.status_code == 304:
+            return False
+        if r.status_code == 416:
+            # El .part ya no corresponde al archivo del servidor
+            os.remove(parcial)
+            raise IOError("Rango no satisfacible, se reinicia la descarga")
+        r.raise_for_status()
+
+        if r.status_code == 206:
+            print(f"   ↻ Reanudando desde {offset / 1e6:,.1f} MB")
+            modo = "ab"
+        else:
+            offset = 0
+            modo = "wb"
+        total = _tamano_esperado(r, offset)
+        _escribir_json(parcial + ".json", _validadores(r))
+
+        with open(parcial, modo) as f:
+            for bloque in r.iter_content(chunk_size=chunk_bytes):
+                f.write(bloque)
+
+    try:
+        _verificar_zip(parcial, total)
+    except IOError:
+        # Un .part dañado no sirve para reanudar: el siguiente intento empieza de cero
+        os.remove(parcial)
+        os.remove(parcial + ".json")
+        raise
+    os.replace(parcial, zip_path)
+    os.replace(parcial + ".json", zip_path + ".json")
+    return True
+
 
-    return zip_path
+@medida("descarga")
+def download_inegi_zip(url=INEGI_ZIP_URL, zip_path=INEGI_ZIP_PATH, chunk_bytes=CHUNK_DESCARGA,
+                       reintentos=REINTENTOS_DESCARGA, timeout=TIMEOUT_DESCARGA):
+    """
+    Descarga (o actualiza) el ZIP de INEGI.
+
+    El contenido se escribe por bloques a <zip>.part, así que la memoria no
+    depende del tamaño del archivo; si la conexión se corta, el siguiente
+    intento (o la siguiente ejecución) continúa desde donde quedó. Al
+    terminar se verifica el ZIP y se renombra de forma atómica, por lo que
+    zip_path nunca queda a medias. ETag / Last-Modified se guardan en
+    <zip>.json para revalidar en la siguiente ejecución.
+    """
+    os.makedirs(os.path.dirname(zip_path) or ".", exist_ok=True)
+    print("⬇️ Verificando datos de INEGI...")
+
+    for intento in range(1, reintentos + 1):
+        try:
+            if _descargar_una_vez(url, zip_path, chunk_bytes, timeout):
+                print(f"   ✓ Descarga completada ({os.path.getsize(zip_path) / 1e6:,.1f} MB)")
+            else:
+                print("📦 El ZIP local está al día, no se descarga nuevamente.")
+            return zip_path
+        except (requests.RequestException, IOError) as e:
+            print(f"   ⚠️ Intento {intento}/{reintentos} fallido: {e}")
+
+    if os.path.exists(zip_path):
+        print("📦 No se pudo actualizar desde INEGI, se usa el ZIP local existente.")
+        return zip_path
+    raise RuntimeError(f"No se pudo descargar {url} después de {reintentos} intentos")
 
 
 def extract_inegi_zip(zip_path):
@@ -35,32 +190,371 @@ def extract_inegi_zip(zip_path):
     print("   ✓ Archivos extraídos")
 
 
-def tidy_inegi_data(year_range=(2018, 2024)):
-    print("\n🧹 Limpiando datos INEGI...")
+# Un CSV anual: ruta en disco, o ruta del ZIP más el nombre del miembro
+FuenteAnual = namedtuple("FuenteAnual", ["anio", "ruta", "miembro"])
 
-    pattern = os.path.join(RAW_DIR_INEGI+"/conjunto_de_datos/", "atus_anual_*.csv")
-    files = sorted(glob.glob(pattern))
+PATRON_ANUAL = re.compile(r"atus_anual_(\d{4})\.csv$", re.IGNORECASE)
 
-    if not files:
-        print("⚠️ No hay CSV extraídos.")
-        return None
 
-    dfs = []
+def _anio_de_nombre(nombre):
+    """Infiere el año a partir del nombre atus_anual_<año>.csv (None si no aplica)."""
+    match = PATRON_ANUAL.search(os.path.basename(nombre))
+    return int(match.group(1)) if match else None
+
+
+def _miembros_zip(zip_path):
+    """Mapea año -> miembro del ZIP, sin importar qué tan anidado esté el CSV."""
+    miembros = {}
+    with zipfile.ZipFile(zip_path, "r") as z:
+        for info in z.infolist():
+            if info.is_dir() or "__MACOSX" in info.filename:
+                continue
+            year = _anio_de_nombre(info.filename)
+            if year is not None:
+                miembros.setdefault(year, info.filename)
+    return miembros
+
+
+def _archivos_extraidos():
+    """Mapea año -> CSV ya extraído en RAW_DIR_INEGI (en cualquier subcarpeta)."""
+    pattern = os.path.join(RAW_DIR_INEGI, "**", "atus_anual_*.csv")
+    archivos = {}
+    for file in sorted(glob.glob(pattern, recursive=True)):
+        year = _anio_de_nombre(file)
+        if year is not None:
+            archivos.setdefault(year, file)
+    return archivos
+
+
+def _fuentes_anuales(year_range, zip_path=None):
+    """
+    Lista las fuentes anuales dentro del rango, ordenadas por año.
+
+    Los CSV se leen directo del ZIP; los archivos extraídos a disco se usan
+    cuando no hay ZIP o cuando el ZIP no contiene ese año.
+    """
     ymin, ymax = year_range
+    zip_path = INEGI_ZIP_PATH if zip_path is None else zip_path
 
-    for file in files:
-        filename = os.path.basename(file)
-        try:
-            year = int(filename.split("_")[-1].replace(".csv", ""))
-        except:
-            continue
+    miembros = {}
+    if zip_path and os.path.exists(zip_path):
+        miembros = _miembros_zip(zip_path)
+    extraidos = _archivos_extraidos()
 
+    fuentes = []
+    for year in sorted(set(miembros) | set(extraidos)):
         if year < ymin or year > ymax:
             continue
+        if year in miembros:
+            fuentes.append(FuenteAnual(year, zip_path, miembros[year]))
+        else:
+            fuentes.append(FuenteAnual(year, extraidos[year], None))
+
+    return fuentes
+
+
+@contextmanager
+def _abrir_fuente(fuente):
+    """Abre una fuente anual; los miembros del ZIP se descomprimen al vuelo."""
+    if fuente.miembro is None:
+        yield fuente.ruta
+        return
+    with zipfile.ZipFile(fuente.ruta, "r") as z:
+        with z.open(fuente.miembro) as f:
+            yield f
+
+
+def _nombre_fuente(fuente):
+    return os.path.basename(fuente.miembro or fuente.ruta)
+
+
+def _checksum_fuente(fuente):
+    """
+    Checksum del contenido de una fuente anual. Para miembros del ZIP se usa
+    el CRC-32 y el tamaño que el propio ZIP guarda del archivo descomprimido
+    (no requiere leerlo); para archivos en disco, SHA-256.
+    """
+    if fuente.miembro is not None:
+        with zipfile.ZipFile(fuente.ruta, "r") as z:
+            info = z.getinfo(fuente.miembro)
+        return f"crc32:{info.CRC:08x}:{info.file_size}"
+
+    sha = hashlib.sha256()
+    with open(fuente.ruta, "rb") as f:
+        for bloque in iter(lambda: f.read(1 << 20), b""):
+            sha.update(bloque)
+    return f"sha256:{sha.hexdigest()}"
+
+
+def _encabezado(fuente):
+    """Nombres de columna tal como vienen en el CSV."""
+    with _abrir_fuente(fuente) as f:
+        return list(pd.read_csv(f, encoding="utf-8", nrows=0).columns)
+
+
+def _columnas_salida(fuentes):
+    """
+    Unión ordenada de las columnas de los años a leer, en el mismo orden que
+    daba pd.concat en el modo en memoria (incluidas las que no están en el
+    esquema, que se conservan como texto).
+    """
+    columnas = []
+    for fuente in fuentes:
+        for col in [c.strip().upper() for c in _encabezado(fuente)] + ["AÑO"]:
+            if col not in columnas:
+                columnas.append(col)
+    return columnas
+
+
+def _mascara_filtro(chunk, year_range, entidades=None, municipios=None):
+    """Predicados de año, entidad y municipio evaluados sobre un bloque."""
+    mascara = pd.Series(True, index=chunk.index)
+    ymin, ymax = year_range
 
-        print(f"   📄 Leyendo {filename}...")
-        df = pd.read_csv(file, encoding="utf-8", low_memory=False)
-        df["AÑO"] = year
+    if "ANIO" in chunk.columns:
+        anio = pd.to_numeric(chunk["ANIO"], errors="coerce")
+        mascara &= anio.between(ymin, ymax)
+    if entidades is not None:
+        entidad = pd.to_numeric(chunk["ID_ENTIDAD"], errors="coerce")
+        mascara &= entidad.isin(entidades)
+    if municipios is not None:
+        municipio = pd.to_numeric(chunk["ID_MUNICIPIO"], errors="coerce")
+        mascara &= municipio.isin(municipios)
+
+    return mascara.fillna(False).astype(bool)
+
+
+def _leer_bloques(fuente, plan, chunksize, estricto=True):
+    """
+    Lee una fuente anual por bloques aplicando el plan de tipos a las
+    columnas del esquema; las demás columnas se leen como texto, sin
+    descartarlas.
+
+    En modo estricto los enteros se parsean con el parser nativo como float64
+    (exacto para cualquier entero de hasta 2**53, así que el valor es el
+    mismo que infiere read_csv, y admite vacíos) y luego se reducen al entero
+    nullable declarado; parsear directo a Int8/Int16 pasa por objetos Python
+    y es varias veces más lento. Si el archivo trae texto en una columna
+    numérica se relee con estricto=False, que convierte esas columnas con
+    pd.to_numeric(errors="coerce").
+    """
+    usar = {col: col.strip().upper() for col in _encabezado(fuente)}
+
+    lectura = "float64" if estricto else str
+    dtype = {}
+    for col, nombre in usar.items():
+        if nombre not in plan or plan[nombre] == "category":
+            dtype[col] = plan.get(nombre, str)
+        else:
+            dtype[col] = lectura
+
+    with _abrir_fuente(fuente) as f:
+        lector = pd.read_csv(f, encoding="utf-8", dtype=dtype, chunksize=chunksize)
+        for chunk in lector:
+            chunk = chunk.rename(columns=usar)
+            for nombre in usar.values():
+                if plan.get(nombre, "category") == "category":
+                    continue
+                if estricto:
+                    chunk[nombre] = _a_entero(chunk[nombre], plan[nombre])
+                    continue
+                chunk[nombre] = pd.to_numeric(chunk[nombre], errors="coerce")
+                try:
+                    chunk[nombre] = _a_entero(chunk[nombre], plan[nombre])
+                except ValueError:
+                    # Valor fuera del ancho declarado o con decimales: se conserva como está
+                    pass
+            yield chunk
+
+
+def _a_entero(serie, dtype):
+    """Convierte una serie float (con NaN) al entero nullable `dtype` sin pasar por objetos."""
+    valores = serie.to_numpy(dtype="float64", na_value=np.nan)
+    nulos = np.isnan(valores)
+    if (valores[~nulos] % 1).any():
+        raise ValueError(f"valores no enteros en {serie.name}")
+    destino = pd.api.types.pandas_dtype(dtype).numpy_dtype
+    limites = np.iinfo(destino)
+    if ((valores[~nulos] < limites.min) | (valores[~nulos] > limites.max)).any():
+        raise ValueError(f"valores fuera de rango {dtype} en {serie.name}")
+    enteros = np.where(nulos, 0, valores).astype(destino)
+    return pd.Series(pd.arrays.IntegerArray(enteros, nulos), index=serie.index, name=serie.name)
+
+
+def _procesar_fuente(fuente, columnas, dataset_dir, destino_csv, year_range, chunksize,
+                     entidades, municipios, estricto=True):
+    """
+    Procesa un año completo: lee por bloques, filtra, quita duplicados y
+    escribe las filas sobrevivientes en el dataset Parquet particionado (y en
+    un CSV parcial si destino_csv no es None).
+
+    Se ejecuta en un proceso del pool, por lo que solo recibe y regresa
+    objetos serializables: (año, CSV parcial o None, leídas, escritas, checksum).
+    """
+    plan = plan_lectura()
+    esquema = esquema_arrow(columnas)
+    if destino_csv and os.path.exists(destino_csv):
+        os.remove(destino_csv)
+
+    # Huellas de 64 bits de las filas ya escritas (8 bytes por fila): reemplazan
+    # a drop_duplicates sin tener que mantener el año completo en memoria. No
+    # hace falta compararlas entre años porque la columna AÑO siempre difiere.
+    vistas = HuellasVistas()
+    leidas = 0
+    escritas = 0
+    bloque = 0
+
+    try:
+        for chunk in _leer_bloques(fuente, plan, chunksize, estricto):
+            leidas += len(chunk)
+            chunk["AÑO"] = fuente.anio
+
+            chunk = chunk[_mascara_filtro(chunk, year_range, entidades, municipios)]
+            if chunk.empty:
+                continue
+            chunk = chunk.reindex(columns=columnas)
+
+            chunk = quitar_duplicados(chunk, vistas)
+
+            # Cada bloque de cada año escribe archivos con nombre propio, así
+            # que los procesos del pool nunca escriben sobre el mismo archivo.
+            tabla = pa.Table.from_pandas(chunk, preserve_index=False).cast(esquema)
+            pq.write_to_dataset(tabla, dataset_dir, partition_cols=COLUMNAS_PARTICION,
+                                basename_template=f"{fuente.anio}-{bloque}-{{i}}.parquet",
+                                existing_data_behavior="overwrite_or_ignore",
+                                compression="zstd")
+            if destino_csv:
+                chunk.to_csv(destino_csv, mode="a", header=(escritas == 0), index=False)
+            escritas += len(chunk)
+            bloque += 1
+    except (ValueError, TypeError, pa.ArrowInvalid):
+        if not estricto:
+            raise
+        _borrar_anio(dataset_dir, fuente.anio)
+        return _procesar_fuente(fuente, columnas, dataset_dir, destino_csv, year_range,
+                                chunksize, entidades, municipios, estricto=False)
+
+    return (fuente.anio, (destino_csv if destino_csv and escritas else None), leidas, escritas,
+            _checksum_fuente(fuente))
+
+
+def _procesar_fuente_medida(fuente, *args):
+    """_procesar_fuente registrada como etapa 'tidy_anio' (en el proceso del pool)"""
+    with etapa("tidy_anio", anio=fuente.anio) as medicion:
+        resultado = _procesar_fuente(fuente, *args)
+        medicion.filas(entrada=resultado[2], salida=resultado[3])
+    return resultado
+
+
+def _borrar_anio(dataset_dir, year):
+    """Elimina los archivos que un año ya haya escrito en el dataset."""
+    patron = os.path.join(dataset_dir, "**", f"{year}-*.parquet")
+    for archivo in glob.glob(patron, recursive=True):
+        os.remove(archivo)
+
+
+def _unir_parciales(parciales, output):
+    """Concatena los archivos parciales en orden de año con un solo encabezado."""
+    with open(output, "wb") as salida:
+        encabezado_escrito = False
+        for parcial in parciales:
+            with open(parcial, "rb") as f:
+                encabezado = f.readline()
+                if not encabezado_escrito:
+                    salida.write(encabezado)
+                    encabezado_escrito = True
+                shutil.copyfileobj(f, salida)
+            os.remove(parcial)
+
+
+def _tidy_por_anio(fuentes, dataset_dir, output_csv, year_range, chunksize, entidades,
+                   municipios, workers):
+    """Procesa los años en un pool de procesos y escribe el dataset particionado."""
+    columnas = _columnas_salida(fuentes)
+    if os.path.isdir(dataset_dir):
+        shutil.rmtree(dataset_dir)
+    os.makedirs(dataset_dir)
+
+    tareas = [(fuente, columnas, dataset_dir,
+               f"{output_csv}.{fuente.anio}.part" if output_csv else None,
+               year_range, chunksize, entidades, municipios) for fuente in fuentes]
+
+    print(f"   ⚙️ {len(fuentes)} años, {workers} proceso(s), bloques de {chunksize:,} filas")
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=fijar_ejecucion,
+                                 initargs=(ejecucion(),)) as pool:
+            resultados = list(pool.map(_procesar_fuente_medida, *zip(*tareas)))
+    else:
+        resultados = [_procesar_fuente_medida(*tarea) for tarea in tareas]
+
+    resultados.sort(key=lambda r: r[0])
+    for year, _, leidas, escritas, _ in resultados:
+        print(f"   📄 {year}: {leidas:,} leídos → {escritas:,} conservados")
+
+    # Registro de fuentes para el manifiesto de cargas incrementales del ETL
+    # (el prefijo "_" hace que pyarrow lo ignore al leer el dataset)
+    nombres = {fuente.anio: _nombre_fuente(fuente) for fuente in fuentes}
+    registro = {str(year): {"archivo": nombres[year], "checksum": checksum, "filas": leidas}
+                for year, _, leidas, _, checksum in resultados}
+    with open(os.path.join(dataset_dir, ARCHIVO_FUENTES), "w", encoding="utf-8") as f:
+        json.dump(registro, f, indent=2)
+
+    total = sum(escritas for _, _, _, escritas, _ in resultados)
+    etapa_actual().filas(entrada=sum(leidas for _, _, leidas, _, _ in resultados), salida=total)
+    print(f"   ✓ {total:,} registros escritos en {dataset_dir} (Parquet, {'/'.join(COLUMNAS_PARTICION)})")
+
+    if output_csv:
+        _unir_parciales([parcial for _, parcial, _, _, _ in resultados if parcial], output_csv)
+        print(f"   ✓ Exportado también a {output_csv}")
+
+    return dataset_dir
+
+
+@medida("tidy")
+def tidy_inegi_data(year_range=(2018, 2024), chunksize=None, entidades=None, municipios=None,
+                    zip_path=None, workers=None, exportar_csv=False):
+    """
+    Consolida los CSV anuales de INEGI en data/processed/.
+
+    Los CSV se leen directamente del ZIP descargado (zip_path, por defecto
+    INEGI_ZIP_PATH) sin extraerlos; si no hay ZIP se usan los CSV extraídos.
+
+    Con chunksize=None y workers=None se leen todos los años completos en
+    memoria, infiriendo tipos, se escribe inegi_tidy.csv y se regresa el
+    DataFrame consolidado.
+
+    Con chunksize o workers cada año se procesa por separado (en un pool de
+    `workers` procesos) usando el plan de columnas y tipos del esquema de
+    accidentes_hermosillo: se lee por bloques, se aplican los filtros de
+    año/entidad/municipio a cada bloque y solo las filas que sobreviven se
+    escriben en el dataset Parquet data/processed/inegi_tidy/, particionado
+    por ANIO e ID_ENTIDAD. Con exportar_csv=True se escribe además
+    inegi_tidy.csv en orden de año. En ese modo se regresa la ruta del
+    dataset y la memoria por proceso depende del tamaño del bloque.
+    """
+    print("\n🧹 Limpiando datos INEGI...")
+
+    fuentes = _fuentes_anuales(year_range, zip_path)
+
+    if not fuentes:
+        print("⚠️ No hay CSV en el ZIP ni extraídos.")
+        return None
+
+    os.makedirs(PROCESSED_DIR, exist_ok=True)
+    output = os.path.join(PROCESSED_DIR, "inegi_tidy.csv")
+
+    if chunksize is not None or workers is not None:
+        return _tidy_por_anio(fuentes, TIDY_DATASET_DIR, output if exportar_csv else None,
+                              year_range, chunksize or CHUNKSIZE_TIDY, entidades, municipios,
+                              workers or 1)
+
+    dfs = []
+
+    for fuente in fuentes:
+        print(f"   📄 Leyendo {_nombre_fuente(fuente)}...")
+        with _abrir_fuente(fuente) as f:
+            df = pd.read_csv(f, encoding="utf-8", low_memory=False)
+        df["AÑO"] = fuente.anio
         dfs.append(df)
 
     if not dfs:
@@ -71,10 +565,12 @@ def tidy_inegi_data(year_range=(2018, 2024)):
 
     # Limpieza ligera (CRISP-DM Etapa 2 = NO limpiamos demasiado todavía)
     df_all.columns = df_all.columns.str.strip().str.upper()
+    if entidades is not None or municipios is not None:
+        df_all = df_all[_mascara_filtro(df_all, year_range, entidades, municipios)]
+    # Todo cabe en memoria: duplicados exactos, sin huellas
     df_clean = df_all.drop_duplicates()
+    etapa_actual().filas(entrada=len(df_all), salida=len(df_clean))
 
-    os.makedirs(PROCESSED_DIR, exist_ok=True)
-    output = os.path.join(PROCESSED_DIR, "inegi_tidy.csv")
     df_clean.to_csv(output, index=False)
 
     print(f"   ✓ Datos consolidados en {output}")
@@ -83,5 +579,8 @@ def tidy_inegi_data(year_range=(2018, 2024)):
 
 if __name__ == "__main__":
     zip_path = download_inegi_zip()
-    # extract_inegi_zip(zip_path)
-    tidy_inegi_data()
+    # extract_inegi_zip(zip_path)  # ya no es necesario: los CSV se leen del ZIP
+    # inegi_tidy.csv se sigue escribiendo (mismo contenido que el modo en
+    # memoria) para quien lo lea directamente; el ETL usa el dataset Parquet
+    tidy_inegi_data(chunksize=CHUNKSIZE_TIDY, zip_path=zip_path, workers=WORKERS_TIDY,
+                    exportar_csv=True)
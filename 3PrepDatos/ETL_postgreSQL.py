@@ -3,34 +3,79 @@ PROYECTO: Análisis de Accidentes de Tránsito en Hermosillo, Sonora
 ETAPA 3: COMPRENSIÓN Y CONEXIÓN A LOS DATOS (CRISP-DM)
 """
 
+import os
 import pandas as pd
 import numpy as np
-from sqlalchemy import create_engine, text
+import pyarrow.dataset as ds
+from sqlalchemy import text
 import psycopg2
 from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
 import warnings
 warnings.filterwarnings('ignore')
 
+from esquema_accidentes import ddl_columnas, particionado_arrow, plan_transformacion, dtype_lectura
+from carga_copy import cargar_sin_duplicados
+from esquema_estrella import crear_esquema_estrella, cargar_estrella, TABLA_HECHOS
+from particiones import crear_tabla_particionada, cargar_particionado, reemplazar_particion
+from objetivos import (normalizar_objetivos, entidades_objetivo, firma_objetivos,
+                       nombre_objetivo, mascara_objetivos, conteos_por_objetivo)
+from resumenes import crear_resumenes, refrescar_resumenes, CONSULTAS_VALIDACION
+from metricas import medida, etapa, etapa_actual
+from huellas import huella_accidentes, columnas_huella, primeras_apariciones
+from manifiesto import (crear_tabla_manifiesto, leer_fuentes_tidy, anios_modificados,
+                        fuentes_de_referencia, registrar_anios_cargados, recargar_anio,
+                        versiones_cargadas)
+from reconciliacion import agregados_referencia, referencia_de, reconciliar, imprimir_reporte
+from backends import es_duckdb, leer_sql, ERRORES_BD
+from cubo_accidentes import actualizar_cubo, versiones_cubo, COLUMNAS_CUBO
+
 # =============================================================================
 # CONFIGURACIÓN
 # =============================================================================
 
-# Configuración de PostgreSQL
-DB_CONFIG = {
-    'host': 'localhost',
-    'port': 5432,
-    'user': 'postgres',
-    'password': 'mario1',  # CAMBIAR por tu contraseña
-    'database': 'accidentes_hermosillo'
-}
+# Conexión y backend (DB_CONFIG, BACKEND_BD, DUCKDB_PATH) en configuracion_bd.py,
+# que pipeline.py lee sin importar este módulo
+from configuracion_bd import DB_CONFIG, BACKEND_BD, DUCKDB_PATH, url_base_datos
+from configuracion_bd import crear_motor as motor_configurado
+
+# Dataset Parquet particionado que escribe connect_inegi.py (formato principal)
+PARQUET_PATH = os.path.join('data', 'processed', 'inegi_tidy')
+
+# Cubo de accidentes precalculado (ver cubo_accidentes.py): opcional, la carga
+# solo lo actualiza con ACCIDENTES_CUBO_ACTIVO=1
+CUBO_ACTIVO = os.environ.get('ACCIDENTES_CUBO_ACTIVO', '0') not in ('', '0')
+CUBO_PATH = os.environ.get('ACCIDENTES_CUBO', os.path.join('data', 'processed', 'cubo_accidentes'))
+
+# Ruta del archivo CSV (solo se usa si no existe el dataset Parquet)
+CSV_PATH = os.environ.get('ACCIDENTES_CSV', os.path.join('data', 'processed', 'inegi_tidy.csv'))
 
-# Ruta del archivo CSV
-CSV_PATH = 'data\processed\inegi_tidy.csv'  # CAMBIAR por tu ruta
+# Años a cargar
+RANGO_ANIOS = (2018, 2024)
+
+# Método de carga: 'copy' (COPY FROM STDIN, recomendado) o 'to_sql' (INSERT por lotes)
+METODO_CARGA = 'copy'
+
+# Modo del ETL: 'incremental' (solo años cuyo archivo fuente cambió, sin preguntas)
+# o 'completo' (carga todo; pregunta si se debe recrear la base de datos).
+# Sin el registro de fuentes del dataset Parquet (p. ej. solo con el CSV) el
+# modo incremental no tiene con qué comparar y se hace la carga completa.
+MODO_ETL = 'incremental'
+
+# Diseño de la base: 'plano' (tabla única accidentes_hermosillo), 'estrella'
+# (tabla de hechos con SMALLINT + dimensiones, y vista accidentes_hermosillo)
+# o 'particionado' (accidentes_hermosillo con una partición por año)
+ESQUEMA_BD = 'plano'
 
 # Códigos para filtrar Hermosillo, Sonora
 ID_ENTIDAD_SONORA = 26
 ID_MUNICIPIO_HERMOSILLO = 30  # Hermosillo
 
+# Objetivos geográficos a cargar: lista de (id_entidad, id_municipio), con
+# id_municipio = None para la entidad completa, o 'todos'. Todos se resuelven
+# con una sola lectura del dataset intermedio.
+# Ej.: [(ID_ENTIDAD_SONORA, None), (2, None), (25, 6)]
+OBJETIVOS = [(ID_ENTIDAD_SONORA, None)]
+
 # =============================================================================
 # 2.1 DESCRIPCIÓN DE LA FUENTE DE DATOS
 # =============================================================================
@@ -85,51 +130,52 @@ def exploracion_inicial(df):
     print("\n" + "="*80 + "\n")
 
 # =============================================================================
-# FILTRADO DE HERMOSILLO
+# FILTRADO GEOGRÁFICO (OBJETIVOS)
 # =============================================================================
 
-def filtrar_hermosillo(df):
-    """Filtra solo los registros de Hermosillo, Sonora"""
+@medida('filtro')
+def filtrar_objetivos(df, objetivos=None):
+    """
+    Conserva los registros de los objetivos (por defecto OBJETIVOS) y reporta
+    la distribución por año de cada uno. El filtro y los conteos se calculan
+    en una sola pasada, sin importar cuántos objetivos haya.
+    """
+    objetivos = normalizar_objetivos(OBJETIVOS if objetivos is None else objetivos)
     print("="*80)
-    print("FILTRADO GEOGRÁFICO: HERMOSILLO, SONORA")
+    print(f"FILTRADO GEOGRÁFICO: {firma_objetivos(objetivos).upper()}")
     print("="*80)
     
     print(f"\n🔍 Registros antes del filtro: {len(df):,}")
     
-    # Convertir columnas a numérico si no lo están
-    df['ID_ENTIDAD'] = pd.to_numeric(df['ID_ENTIDAD'], errors='coerce')
-    df['ID_MUNICIPIO'] = pd.to_numeric(df['ID_MUNICIPIO'], errors='coerce')
+    df_objetivos = df[mascara_objetivos(df, objetivos)].copy()
+    etapa_actual().filas(entrada=len(df), salida=len(df_objetivos))
     
-    # Filtrar por Sonora y Hermosillo
-    df_hermosillo = df[
-        (df['ID_ENTIDAD'] == ID_ENTIDAD_SONORA) 
-        # (df['ID_MUNICIPIO'] == ID_MUNICIPIO_HERMOSILLO)
-    ].copy()
+    print(f"✓ Registros después del filtro: {len(df_objetivos):,}")
+    print(f"📉 Reducción: {len(df) - len(df_objetivos):,} registros")
     
-    print(f"✓ Registros después del filtro: {len(df_hermosillo):,}")
-    print(f"📉 Reducción: {len(df) - len(df_hermosillo):,} registros")
-    
-    if len(df_hermosillo) > 0:
-        print(f"📊 Porcentaje retenido: {(len(df_hermosillo)/len(df)*100):.2f}%")
+    if len(df_objetivos) > 0:
+        print(f"📊 Porcentaje retenido: {(len(df_objetivos)/len(df)*100):.2f}%")
         
-        print(f"\n📅 DISTRIBUCIÓN POR AÑO EN HERMOSILLO:")
-        distribucion = df_hermosillo['ANIO'].value_counts().sort_index()
-        for anio, cantidad in distribucion.items():
-            print(f"   {int(anio)}: {cantidad:,} accidentes")
+        for objetivo, distribucion in conteos_por_objetivo(df_objetivos, objetivos).items():
+            print(f"\n📅 DISTRIBUCIÓN POR AÑO EN {nombre_objetivo(objetivo).upper()}:")
+            if distribucion.empty:
+                print("   ⚠️  Sin registros")
+            for anio, cantidad in distribucion.sort_index().items():
+                print(f"   {int(anio)}: {cantidad:,} accidentes")
     else:
-        print("⚠️  No se encontraron registros para Hermosillo, Sonora")
-        print(f"   Verifica los códigos: ID_ENTIDAD={ID_ENTIDAD_SONORA}")
+        print("⚠️  No se encontraron registros para los objetivos")
+        print(f"   Verifica los códigos: OBJETIVOS={firma_objetivos(objetivos)}")
     
     print("\n" + "="*80 + "\n")
     
-    return df_hermosillo
+    return df_objetivos
 
 # =============================================================================
 # 2.3 DISEÑO DE LA BASE DE DATOS
 # =============================================================================
 
-def crear_base_datos():
-    """Crea la base de datos PostgreSQL"""
+def crear_base_datos(interactivo=True):
+    """Crea la base de datos PostgreSQL (sin interactivo, reutiliza la existente)"""
     print("="*80)
     print("2.3 DISEÑO Y CREACIÓN DE LA BASE DE DATOS")
     print("="*80)
@@ -152,7 +198,7 @@ def crear_base_datos():
         
         if exists:
             print(f"\n⚠️  La base de datos '{DB_CONFIG['database']}' ya existe")
-            respuesta = input("¿Deseas eliminarla y crearla de nuevo? (s/n): ")
+            respuesta = input("¿Deseas eliminarla y crearla de nuevo? (s/n): ") if interactivo else 'n'
             if respuesta.lower() == 's':
                 cursor.execute(f"DROP DATABASE {DB_CONFIG['database']}")
                 print(f"✓ Base de datos eliminada")
@@ -180,67 +226,45 @@ def crear_base_datos():
         print(f"\n❌ Error al crear la base de datos: {e}")
         raise
 
+def crear_base_duckdb(interactivo=True):
+    """Prepara el archivo DuckDB (sin interactivo, reutiliza el existente)"""
+    print("="*80)
+    print("2.3 DISEÑO Y CREACIÓN DE LA BASE DE DATOS (DuckDB)")
+    print("="*80)
+    
+    if os.path.exists(DUCKDB_PATH):
+        print(f"\n⚠️  La base de datos '{DUCKDB_PATH}' ya existe")
+        respuesta = input("¿Deseas eliminarla y crearla de nuevo? (s/n): ") if interactivo else 'n'
+        if respuesta.lower() != 's':
+            print("✓ Usando base de datos existente")
+            return
+        for ruta in [DUCKDB_PATH, DUCKDB_PATH + '.wal']:
+            if os.path.exists(ruta):
+                os.remove(ruta)
+        print("✓ Base de datos eliminada")
+    
+    print(f"\n✓ Base de datos '{DUCKDB_PATH}' (se crea al conectar)")
+    print("\n" + "="*80 + "\n")
+
 def crear_tabla_accidentes(engine):
     """Crea la tabla de accidentes con el esquema adecuado"""
     print("="*80)
     print("CREACIÓN DE TABLA: accidentes_hermosillo")
     print("="*80)
     
-    create_table_sql = """
+    create_table_sql = f"""
     CREATE TABLE IF NOT EXISTS accidentes_hermosillo (
-        id SERIAL PRIMARY KEY,
-        cobertura VARCHAR(50),
-        id_entidad INTEGER,
-        id_municipio INTEGER,
-        anio INTEGER,
-        mes INTEGER,
-        id_hora INTEGER,
-        id_minuto INTEGER,
-        id_dia INTEGER,
-        diasemana VARCHAR(20),
-        urbana VARCHAR(100),
-        suburbana VARCHAR(100),
-        tipaccid VARCHAR(100),
-        automovil INTEGER,
-        campasaj INTEGER,
-        microbus INTEGER,
-        pascamion INTEGER,
-        omnibus INTEGER,
-        tranvia INTEGER,
-        camioneta INTEGER,
-        camion INTEGER,
-        tractor INTEGER,
-        ferrocarri INTEGER,
-        motociclet INTEGER,
-        bicicleta INTEGER,
-        otrovehic INTEGER,
-        causaacci VARCHAR(200),
-        caparod VARCHAR(100),
-        sexo VARCHAR(20),
-        aliento VARCHAR(20),
-        cinturon VARCHAR(20),
-        id_edad INTEGER,
-        condmuerto INTEGER,
-        condherido INTEGER,
-        pasamuerto INTEGER,
-        pasaherido INTEGER,
-        peatmuerto INTEGER,
-        peatherido INTEGER,
-        ciclmuerto INTEGER,
-        ciclherido INTEGER,
-        otromuerto INTEGER,
-        otroherido INTEGER,
-        nemuerto INTEGER,
-        neherido INTEGER,
-        clasacc VARCHAR(50),
-        estatus VARCHAR(50),
-        año VARCHAR(10)
+        {ddl_columnas()}
     );
     
-    CREATE INDEX idx_anio ON accidentes_hermosillo(anio);
-    CREATE INDEX idx_mes ON accidentes_hermosillo(mes);
-    CREATE INDEX idx_tipaccid ON accidentes_hermosillo(tipaccid);
-    CREATE INDEX idx_causaacci ON accidentes_hermosillo(causaacci);
+    CREATE INDEX IF NOT EXISTS idx_anio ON accidentes_hermosillo(anio);
+    CREATE INDEX IF NOT EXISTS idx_mes ON accidentes_hermosillo(mes);
+    CREATE INDEX IF NOT EXISTS idx_tipaccid ON accidentes_hermosillo(tipaccid);
+    CREATE INDEX IF NOT EXISTS idx_causaacci ON accidentes_hermosillo(causaacci);
+    
+    -- Tablas creadas antes de la columna huella
+    ALTER TABLE accidentes_hermosillo ADD COLUMN IF NOT EXISTS huella BIGINT;
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_huella ON accidentes_hermosillo(huella);
     """
     
     try:
@@ -258,21 +282,46 @@ def crear_tabla_accidentes(engine):
 # 2.4 ETL (EXTRACT, TRANSFORM, LOAD)
 # =============================================================================
 
-def proceso_etl_completo():
-    """Ejecuta el proceso ETL completo"""
-    print("\n" + "="*80)
-    print("2.4 PROCESO ETL (EXTRACT, TRANSFORM, LOAD)")
-    print("="*80 + "\n")
-    
-    # EXTRACT
+def leer_tidy_parquet(ruta, rango_anios, entidades, columnas=None, anios=None):
+    """
+    Lee el dataset Parquet intermedio con proyección de columnas y filtros
+    empujados al escaneo: las particiones ANIO/ID_ENTIDAD fuera del filtro
+    ni siquiera se abren. Con `anios` se leen solo esos años del rango y con
+    entidades=None se leen todas las entidades.
+    """
+    dataset = ds.dataset(ruta, format='parquet', partitioning=particionado_arrow())
+    ymin, ymax = rango_anios
+    filtro = (ds.field('ANIO') >= ymin) & (ds.field('ANIO') <= ymax)
+    if entidades is not None:
+        filtro = filtro & ds.field('ID_ENTIDAD').isin(list(entidades))
+    if anios is not None:
+        filtro = filtro & ds.field('ANIO').isin(list(anios))
+    if columnas is None:
+        columnas = dataset.schema.names
+    tabla = dataset.to_table(columns=list(columnas), filter=filtro)
+    return tabla.to_pandas()
+
+@medida('extraccion')
+def extraer_datos(anios=None):
+    """FASE 1: lee el dataset intermedio (o el CSV) y normaliza columnas"""
     print("🔄 FASE 1: EXTRACCIÓN (Extract)")
     print("-" * 80)
     try:
-        # Leer CSV con manejo especial de columnas
-        df = pd.read_csv(CSV_PATH, encoding='utf-8', low_memory=False)
+        if os.path.isdir(PARQUET_PATH):
+            # Solo se leen las particiones de las entidades objetivo dentro del
+            # rango de años (una sola lectura para todos los objetivos)
+            origen = PARQUET_PATH
+            df = leer_tidy_parquet(PARQUET_PATH, RANGO_ANIOS, entidades_objetivo(OBJETIVOS),
+                                   anios=anios)
+        else:
+            # Leer CSV con manejo especial de columnas
+            origen = CSV_PATH
+            df = pd.read_csv(CSV_PATH, encoding='utf-8', low_memory=False)
+        
+        etapa_actual().filas(salida=len(df))
         
         # Verificar si hay problemas con las columnas
-        print(f"✓ Datos cargados desde: {CSV_PATH}")
+        print(f"✓ Datos cargados desde: {origen}")
         print(f"✓ Registros extraídos: {len(df):,}")
         print(f"✓ Columnas detectadas: {len(df.columns)}")
         
@@ -293,38 +342,84 @@ def proceso_etl_completo():
     except FileNotFoundError:
         print(f"❌ Error: No se encontró el archivo '{CSV_PATH}'")
         print(f"   Verifica que la ruta sea correcta")
-        return None, None
+        return None
     except Exception as e:
         print(f"❌ Error al leer el archivo: {e}")
         print(f"   Tipo de error: {type(e).__name__}")
-        return None, None
+        return None
     
-    # Exploración inicial
-    exploracion_inicial(df)
+    return df
+
+def memoria_mb(df):
+    """Memoria real del DataFrame en MB (incluye el contenido de los strings)"""
+    return df.memory_usage(deep=True).sum() / 1e6
+
+@medida('conversion_tipos')
+def aplicar_plan_tipos(df, plan):
+    """
+    Convierte las columnas según el plan {columna: dtype} y arma el
+    DataFrame resultante de una sola vez, en lugar de reasignar columna por
+    columna (cada reasignación dejaba una copia completa de la columna).
     
-    # TRANSFORM
+    Enteros: a número, nulos a 0 y al ancho del plan; si algún valor no cabe
+    se conserva int64, como antes. Texto: category; los nulos siguen siendo
+    nulos (antes astype(str) los convertía en el texto 'nan').
+    """
+    columnas = {}
+    for col in df.columns:
+        serie = df[col]
+        dtype = plan.get(col)
+        if dtype is None:
+            columnas[col] = serie
+        elif dtype == 'category':
+            if not (pd.api.types.is_object_dtype(serie) or isinstance(serie.dtype, pd.CategoricalDtype)):
+                # Números (p. ej. 'año' leído del CSV) con el mismo texto que daba astype(str)
+                serie = serie.astype(str).where(serie.notna())
+            columnas[col] = serie.astype('category')
+        else:
+            try:
+                valores = pd.to_numeric(serie, errors='coerce')
+                valores = valores.to_numpy(dtype='float64', na_value=0)
+                enteros = valores.astype('int64')
+                limites = np.iinfo(dtype)
+                if len(enteros) and (enteros.min() < limites.min or enteros.max() > limites.max):
+                    print(f"   ⚠️  '{col}' no cabe en {dtype}, se conserva int64")
+                    columnas[col] = enteros
+                else:
+                    columnas[col] = enteros.astype(dtype)
+            except Exception as e:
+                print(f"   ⚠️  Error al convertir columna '{col}': {e}")
+                columnas[col] = serie
+    etapa_actual().filas(entrada=len(df), salida=len(df))
+    return pd.DataFrame(columnas, index=df.index)
+
+@medida('transformacion')
+def transformar_datos(df):
+    """FASE 2: filtra años y Sonora, normaliza columnas y convierte tipos"""
+    etapa_actual().filas(entrada=len(df))
     print("\n🔄 FASE 2: TRANSFORMACIÓN (Transform)")
     print("-" * 80)
     
-    # PRIMERO: Filtrar años válidos (2018-2024)
-    print("📅 Filtrando años válidos (2018-2024)...")
+    # PRIMERO: Filtrar años válidos (RANGO_ANIOS)
+    ymin, ymax = RANGO_ANIOS
+    print(f"📅 Filtrando años válidos ({ymin}-{ymax})...")
     print(f"   Registros antes del filtro de años: {len(df):,}")
     
     # Convertir año a numérico
     df['ANIO'] = pd.to_numeric(df['ANIO'], errors='coerce')
     
-    # Filtrar solo años 2018-2024
-    df = df[(df['ANIO'] >= 2018) & (df['ANIO'] <= 2024)]
+    # Filtrar solo años del rango
+    df = df[(df['ANIO'] >= ymin) & (df['ANIO'] <= ymax)]
     
     print(f"   Registros después del filtro de años: {len(df):,}")
-    print(f"   Registros eliminados: {len(df[df['ANIO'] < 2018]):,}")
+    print(f"   Registros eliminados: {len(df[df['ANIO'] < ymin]):,}")
     
     # Verificar años únicos
     años_unicos = sorted(df['ANIO'].unique())
     print(f"   Años únicos en el dataset: {años_unicos}")
     
-    # Filtrar Hermosillo
-    df_hermosillo = filtrar_hermosillo(df)
+    # Filtrar los objetivos geográficos
+    df_hermosillo = filtrar_objetivos(df)
     
     # Limpieza adicional
     print("🧹 Limpieza de datos:")
@@ -337,69 +432,80 @@ def proceso_etl_completo():
     # IMPORTANTE: Convertir tipos de datos para evitar errores
     print("\n🔧 Conversión de tipos de datos:")
     
-    # Columnas numéricas que deben ser enteros
-    columnas_entero = ['id_entidad', 'id_municipio', 'anio', 'mes', 'id_hora', 
-                       'id_minuto', 'id_dia', 'automovil', 'campasaj', 'microbus', 
-                       'pascamion', 'omnibus', 'tranvia', 'camioneta', 'camion', 
-                       'tractor', 'ferrocarri', 'motociclet', 'bicicleta', 'otrovehic',
-                       'id_edad', 'condmuerto', 'condherido', 'pasamuerto', 'pasaherido',
-                       'peatmuerto', 'peatherido', 'ciclmuerto', 'ciclherido', 
-                       'otromuerto', 'otroherido', 'nemuerto', 'neherido']
-    
-    for col in columnas_entero:
-        if col in df_hermosillo.columns:
-            try:
-                # Convertir a numérico, forzando errores a NaN
-                df_hermosillo[col] = pd.to_numeric(df_hermosillo[col], errors='coerce')
-                # Rellenar NaN con 0
-                df_hermosillo[col] = df_hermosillo[col].fillna(0).astype(int)
-            except Exception as e:
-                print(f"   ⚠️  Error al convertir columna '{col}': {e}")
+    memoria_antes = memoria_mb(df_hermosillo)
+    df_hermosillo = aplicar_plan_tipos(df_hermosillo, plan_transformacion())
+    
+    # Duplicados exactos sobre los valores que se cargan (ya con los nulos
+    # enteros en 0) y huella de 64 bits de cada registro sobre esos mismos
+    # valores (columna con índice único en la tabla)
+    con_duplicados = len(df_hermosillo)
+    df_hermosillo = df_hermosillo.drop_duplicates(subset=columnas_huella(df_hermosillo))
+    if len(df_hermosillo) < con_duplicados:
+        print(f"   ⚠️  Eliminados {con_duplicados - len(df_hermosillo):,} registros duplicados")
+    df_hermosillo['huella'] = huella_accidentes(df_hermosillo)
+    colisiones = (~primeras_apariciones(df_hermosillo['huella'].to_numpy())).sum()
+    if colisiones:
+        print(f"   ⚠️  {colisiones:,} registros distintos comparten huella con otro "
+              "y se omitirán al cargar")
     
     # Verificación adicional: eliminar registros con año inválido
     registros_antes = len(df_hermosillo)
-    df_hermosillo = df_hermosillo[df_hermosillo['anio'] >= 2018]
+    df_hermosillo = df_hermosillo[df_hermosillo['anio'] >= ymin]
     registros_despues = len(df_hermosillo)
     
     if registros_antes != registros_despues:
-        print(f"   ⚠️  Eliminados {registros_antes - registros_despues:,} registros con año < 2018")
+        print(f"   ⚠️  Eliminados {registros_antes - registros_despues:,} registros con año < {ymin}")
     
     print("   ✓ Tipos de datos convertidos correctamente")
     
-    # Columnas de texto
-    columnas_texto = ['cobertura', 'diasemana', 'urbana', 'suburbana', 'tipaccid',
-                      'causaacci', 'caparod', 'sexo', 'aliento', 'cinturon', 
-                      'clasacc', 'estatus', 'año']
+    print(f"   • Valores nulos después: {df_hermosillo.isnull().sum().sum()}")
     
-    for col in columnas_texto:
-        if col in df_hermosillo.columns:
-            df_hermosillo[col] = df_hermosillo[col].astype(str).fillna('')
+    memoria_despues = memoria_mb(df_hermosillo)
+    print(f"\n💾 Memoria antes de convertir tipos: {memoria_antes:,.1f} MB")
+    print(f"💾 Memoria después:                  {memoria_despues:,.1f} MB")
     
-    print(f"   • Valores nulos después: {df_hermosillo.isnull().sum().sum()}")
+    # Agregados por año con los que validar_carga concilia lo que quedó en
+    # la base (se guardan en el manifiesto junto con la carga de cada año)
+    df_hermosillo.attrs['referencia'] = agregados_referencia(df_hermosillo)
+    print(f"   ✓ Agregados de referencia calculados para {len(df_hermosillo.attrs['referencia'])} años")
+    
+    etapa_actual().filas(salida=len(df_hermosillo))
     
     # Verificar tipos de datos finales
     print("\n📋 Tipos de datos finales (muestra):")
     print(df_hermosillo.dtypes.head(10))
     
-    # LOAD
-    print("\n🔄 FASE 3: CARGA (Load)")
-    print("-" * 80)
+    return df_hermosillo
+
+def crear_motor():
+    """
+    Engine del backend de este módulo: usa BACKEND_BD y DUCKDB_PATH de aquí,
+    que pipeline.py y los benchmarks pueden cambiar antes de la carga
+    """
+    return motor_configurado(BACKEND_BD, DUCKDB_PATH)
+
+@medida('creacion_bd')
+def conectar_base_datos(interactivo=True):
+    """Crea (si hace falta) la base de datos y la tabla; regresa el engine o None"""
+    if BACKEND_BD == 'duckdb' and ESQUEMA_BD != 'plano':
+        print(f"❌ El backend DuckDB solo admite ESQUEMA_BD = 'plano' (es '{ESQUEMA_BD}')")
+        return None
     
     # Crear base de datos
     try:
-        crear_base_datos()
+        if BACKEND_BD == 'duckdb':
+            crear_base_duckdb(interactivo=interactivo)
+        else:
+            crear_base_datos(interactivo=interactivo)
     except Exception as e:
         print(f"❌ Error al crear base de datos: {e}")
         print("   Verifica que PostgreSQL esté instalado y corriendo")
         print("   Verifica usuario y contraseña en DB_CONFIG")
-        return None, None
+        return None
     
-    # Crear engine para SQLAlchemy
+    # Crear engine (SQLAlchemy, o su equivalente sobre DuckDB)
     try:
-        engine = create_engine(
-            f"postgresql://{DB_CONFIG['user']}:{DB_CONFIG['password']}@"
-            f"{DB_CONFIG['host']}:{DB_CONFIG['port']}/{DB_CONFIG['database']}"
-        )
+        engine = crear_motor()
         # Probar conexión
         with engine.connect() as conn:
             conn.execute(text("SELECT 1"))
@@ -410,29 +516,209 @@ def proceso_etl_completo():
         print("   1. Verifica que PostgreSQL esté corriendo")
         print("   2. Verifica usuario y contraseña en DB_CONFIG")
         print("   3. Verifica que el puerto 5432 esté disponible")
-        return None, None
+        return None
     
-    # Crear tabla
+    # Crear tablas
     try:
-        crear_tabla_accidentes(engine)
+        if ESQUEMA_BD == 'estrella':
+            crear_esquema_estrella(engine)
+        elif ESQUEMA_BD == 'particionado':
+            crear_tabla_particionada(engine)
+        else:
+            crear_tabla_accidentes(engine)
+        crear_tabla_manifiesto(engine)
+        crear_resumenes(engine, OBJETIVOS)
     except Exception as e:
         print(f"❌ Error al crear tabla: {e}")
-        return None, None
+        return None
     
-    # Cargar datos
+    return engine
+
+@medida('carga')
+def cargar_datos(df_hermosillo, engine):
+    """FASE 3: carga todos los registros transformados en accidentes_hermosillo"""
+    etapa_actual().filas(entrada=len(df_hermosillo))
     print("📤 Cargando datos a PostgreSQL...")
     try:
-        df_hermosillo.to_sql(
-            'accidentes_hermosillo',
-            engine,
-            if_exists='append',
-            index=False,
-            chunksize=1000
-        )
+        # Los registros que ya estén en la tabla (misma huella) se omiten; con
+        # particiones cada año se reemplaza completo
+        if ESQUEMA_BD == 'estrella':
+            cargar_estrella(df_hermosillo, engine, omitir_duplicados=True)
+        elif ESQUEMA_BD == 'particionado':
+            cargar_particionado(df_hermosillo, engine)
+        elif METODO_CARGA == 'copy' or es_duckdb(engine):
+            cargar_sin_duplicados(df_hermosillo, engine, 'accidentes_hermosillo')
+        else:
+            df_hermosillo.to_sql(
+                'accidentes_hermosillo',
+                engine,
+                if_exists='append',
+                index=False,
+                chunksize=1000
+            )
         print(f"✓ {len(df_hermosillo):,} registros cargados exitosamente")
     except Exception as e:
         print(f"❌ Error al cargar datos: {e}")
         print(f"   Tipo de error: {type(e).__name__}")
+        return False
+    
+    # Registrar en el manifiesto los años cargados, para que una ejecución
+    # incremental posterior sepa que ya están al día. Sin registro de fuentes
+    # (carga desde el CSV) cada año se registra con la huella de sus agregados:
+    # la versión de la tabla (caché del pipeline y de la libreta) sale de aquí
+    referencias = referencia_de(df_hermosillo)
+    fuentes = fuentes_objetivo() or fuentes_de_referencia(
+        df_hermosillo, referencias, os.path.basename(CSV_PATH), firma_objetivos(OBJETIVOS))
+    registrar_anios_cargados(engine, df_hermosillo, fuentes, referencias)
+    
+    refrescar_resumenes(engine, objetivos=OBJETIVOS)
+    actualizar_cubo_accidentes(engine, df_hermosillo)
+    
+    return True
+
+def registros_cubo(engine, anios):
+    """Columnas que lee el cubo, tomadas de la base, para los años indicados"""
+    with engine.connect() as conn:
+        df = leer_sql(conn, f"SELECT {', '.join(COLUMNAS_CUBO)} FROM accidentes_hermosillo "
+                            "WHERE anio = ANY(:anios)", {'anios': [int(anio) for anio in anios]})
+    return df.astype({col: dtype_lectura(col) for col in COLUMNAS_CUBO})
+
+def actualizar_cubo_accidentes(engine, df_hermosillo=None, anios=None):
+    """
+    Pone el cubo (CUBO_PATH) al día con el manifiesto si CUBO_ACTIVO: los
+    años de `anios` (por defecto, los de df_hermosillo) salen de
+    df_hermosillo, y cualquier otro año cuya versión no coincide (p. ej.
+    porque falló una actualización anterior del cubo) se lee de la base. Si
+    falla (incluso por falta de memoria), la carga sigue siendo válida.
+    """
+    if not CUBO_ACTIVO:
+        return
+    try:
+        versiones = versiones_cargadas(engine)
+        if df_hermosillo is not None:
+            if anios is None:
+                anios = sorted(int(anio) for anio in df_hermosillo['anio'].dropna().unique())
+            actualizar_cubo(df_hermosillo, CUBO_PATH, anios, versiones)
+        guardadas = versiones_cubo(CUBO_PATH)
+        desfasados = sorted(anio for anio, version in versiones.items() if guardadas.get(anio) != version)
+        if desfasados:
+            print(f"   Años del cubo desfasados respecto a la base: {desfasados}")
+            actualizar_cubo(registros_cubo(engine, desfasados), CUBO_PATH, desfasados, versiones)
+    except (OSError, ValueError, MemoryError, *ERRORES_BD) as e:
+        print(f"⚠️  No se pudo actualizar el cubo de accidentes en '{CUBO_PATH}': "
+              f"{type(e).__name__}: {e}")
+
+@medida('etl')
+def proceso_etl_completo(modo=None):
+    """Ejecuta el proceso ETL completo ('completo') o solo los años modificados ('incremental')"""
+    modo = modo or MODO_ETL
+    if modo == 'incremental':
+        if fuentes_objetivo():
+            return proceso_etl_incremental()
+        print(f"⚠️  Sin registro de fuentes en '{PARQUET_PATH}' para {RANGO_ANIOS}: "
+              "se hace la carga completa")
+    
+    print("\n" + "="*80)
+    print("2.4 PROCESO ETL (EXTRACT, TRANSFORM, LOAD)")
+    print("="*80 + "\n")
+    
+    # EXTRACT
+    df = extraer_datos()
+    if df is None:
+        return None, None
+    
+    # Exploración inicial
+    exploracion_inicial(df)
+    
+    # TRANSFORM
+    df_hermosillo = transformar_datos(df)
+    
+    # LOAD
+    print("\n🔄 FASE 3: CARGA (Load)")
+    print("-" * 80)
+    
+    engine = conectar_base_datos()
+    if engine is None:
+        return None, None
+    
+    if not cargar_datos(df_hermosillo, engine):
+        return None, None
+    
+    print("\n" + "="*80 + "\n")
+    
+    return engine, df_hermosillo
+
+def fuentes_objetivo():
+    """
+    Registro de fuentes del dataset intermedio (PARQUET_PATH) para los años
+    de RANGO_ANIOS. Cambiar OBJETIVOS también obliga a recargar: la firma de
+    los objetivos va en el manifiesto junto con el checksum del archivo.
+    """
+    ymin, ymax = RANGO_ANIOS
+    return {anio: dict(f, objetivos=firma_objetivos(OBJETIVOS))
+            for anio, f in leer_fuentes_tidy(PARQUET_PATH).items() if ymin <= anio <= ymax}
+
+def recargar_anios(engine, df_hermosillo, anios, fuentes):
+    """Reemplaza cada año de `anios` (uno por transacción) y refresca los resúmenes y el cubo"""
+    referencias = referencia_de(df_hermosillo)
+    for anio in anios:
+        df_anio = df_hermosillo[df_hermosillo['anio'] == anio]
+        referencia = referencias.get(str(int(anio)))
+        with etapa('carga', filas_entrada=len(df_anio), anio=int(anio)):
+            if ESQUEMA_BD == 'estrella':
+                recargar_anio(engine, anio, df_anio, fuentes[anio],
+                              tabla=TABLA_HECHOS, cargar=cargar_estrella, referencia=referencia)
+            elif ESQUEMA_BD == 'particionado':
+                reemplazar_particion(engine, anio, df_anio, fuentes[anio], referencia=referencia)
+            else:
+                recargar_anio(engine, anio, df_anio, fuentes[anio], referencia=referencia)
+    refrescar_resumenes(engine, anios, OBJETIVOS)
+    actualizar_cubo_accidentes(engine, df_hermosillo, anios)
+
+def proceso_etl_incremental():
+    """
+    Recarga únicamente los años cuyo archivo fuente cambió desde la última
+    carga, según el manifiesto. Cada año se reemplaza en su propia
+    transacción (DELETE del año + COPY, o intercambio de la partición del
+    año con ESQUEMA_BD = 'particionado') y no se hace ninguna pregunta.
+    """
+    print("\n" + "="*80)
+    print("2.4 PROCESO ETL INCREMENTAL (por año, según manifiesto)")
+    print("="*80 + "\n")
+    
+    fuentes = fuentes_objetivo()
+    if not fuentes:
+        print(f"❌ No se encontró el registro de fuentes en '{PARQUET_PATH}'")
+        print("   Ejecuta connect_inegi.py en modo por año (Parquet) antes de la carga incremental")
+        return None, None
+    
+    engine = conectar_base_datos(interactivo=False)
+    if engine is None:
+        return None, None
+    
+    pendientes = anios_modificados(engine, fuentes)
+    for anio in sorted(set(fuentes) - set(pendientes)):
+        print(f"   ✓ {anio}: sin cambios ({fuentes[anio]['checksum'][:16]}…), se omite")
+    
+    if not pendientes:
+        actualizar_cubo_accidentes(engine)
+        print("\n✅ Todos los años están al día, no hay nada que cargar")
+        print("\n" + "="*80 + "\n")
+        return engine, pd.DataFrame()
+    
+    print(f"\n🔁 Años a recargar: {pendientes}")
+    df = extraer_datos(anios=pendientes)
+    if df is None:
+        return None, None
+    df_hermosillo = transformar_datos(df)
+    
+    print("\n🔄 FASE 3: CARGA INCREMENTAL (Load)")
+    print("-" * 80)
+    try:
+        recargar_anios(engine, df_hermosillo, pendientes, fuentes)
+    except Exception as e:
+        print(f"❌ Error al recargar año: {e}")
+        print(f"   Tipo de error: {type(e).__name__}")
         return None, None
     
     print("\n" + "="*80 + "\n")
@@ -443,48 +729,42 @@ def proceso_etl_completo():
 # 2.5 VALIDACIÓN DE LA CARGA
 # =============================================================================
 
+@medida('validacion')
 def validar_carga(engine):
-    """Valida que los datos se hayan cargado correctamente"""
+    """
+    Valida la carga: muestra los resúmenes y concilia cada año contra los
+    agregados de la transformación (conteos, sumas de víctimas, códigos
+    distintos, nulos y rangos). Regresa el reporte de la conciliación, o
+    None si no se pudo validar.
+    """
     print("="*80)
     print("2.5 VALIDACIÓN DE LA CARGA")
     print("="*80)
     
-    queries_validacion = {
-        "Total de registros": "SELECT COUNT(*) as total FROM accidentes_hermosillo",
-        "Distribución por año": """
-            SELECT anio, COUNT(*) as cantidad 
-            FROM accidentes_hermosillo 
-            GROUP BY anio 
-            ORDER BY anio
-        """,
-        "Top 5 tipos de accidente": """
-            SELECT tipaccid, COUNT(*) as cantidad 
-            FROM accidentes_hermosillo 
-            GROUP BY tipaccid 
-            ORDER BY cantidad DESC 
-            LIMIT 5
-        """,
-        "Top 5 causas de accidente": """
-            SELECT causaacci, COUNT(*) as cantidad 
-            FROM accidentes_hermosillo 
-            GROUP BY causaacci 
-            ORDER BY cantidad DESC 
-            LIMIT 5
-        """
-    }
+    # Las consultas de resumen leen de las tablas que se actualizan en cada
+    # carga (ver resumenes.py); corren en el mismo pool de conexiones que la
+    # conciliación (ver reconciliacion.py)
+    queries_validacion = {nombre: sql_resumen
+                          for nombre, (sql_resumen, _) in CONSULTAS_VALIDACION.items()}
     
     try:
-        with engine.connect() as conn:
-            for nombre, query in queries_validacion.items():
-                print(f"\n📊 {nombre.upper()}:")
-                resultado = pd.read_sql(query, conn)
-                print(resultado.to_string(index=False))
+        reporte, resultados, segundos = reconciliar(engine, queries_validacion)
+        for nombre, resultado in resultados.items():
+            print(f"\n📊 {nombre.upper()}:")
+            print(resultado.to_string(index=False))
         
-        print("\n✅ VALIDACIÓN COMPLETADA EXITOSAMENTE")
+        imprimir_reporte(reporte, segundos)
+        etapa_actual().filas(salida=len(reporte))
+        if len(reporte) and (reporte['estado'] == 'falla').any():
+            print("\n❌ VALIDACIÓN CON FALLAS")
+        else:
+            print("\n✅ VALIDACIÓN COMPLETADA EXITOSAMENTE")
         print("="*80 + "\n")
+        return reporte
         
     except Exception as e:
         print(f"\n❌ Error en validación: {e}")
+        return None
 
 # =============================================================================
 # FUNCIÓN PRINCIPAL
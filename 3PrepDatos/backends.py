@@ -0,0 +1,327 @@
+"""
+PROYECTO: Análisis de Accidentes de Tránsito en Hermosillo, Sonora
+Backends de almacenamiento: PostgreSQL o DuckDB embebido
+
+La carga y la validación (DDL, manifiesto, COPY, resúmenes, conciliación)
+están escritas contra la interfaz de un engine de SQLAlchemy:
+engine.connect() / engine.begin() con text(), y engine.raw_connection() con
+un cursor DBAPI para la carga masiva y el manifiesto. MotorDuckDB ofrece esa
+misma interfaz sobre un archivo DuckDB (base columnar dentro del proceso,
+sin servidor), así que el mismo SQL corre en los dos backends. Las pocas
+diferencias de dialecto se traducen al ejecutar:
+
+    id SERIAL          secuencia <tabla>_id_seq + DEFAULT nextval (lo que hace PostgreSQL)
+    JSONB              JSON
+    :nombre / %s       $nombre / ? (solo con parámetros y fuera de literales,
+                       comentarios e identificadores entre comillas)
+    to_regclass('t')   macro con el mismo resultado sobre el catálogo de DuckDB
+    COPY FROM STDIN    INSERT ... SELECT directo del DataFrame (vía Arrow, sin CSV)
+    DELETE + COPY      reemplazar_dataframe (DuckDB no reinserta en la misma
+                       transacción una llave única borrada)
+
+DuckDB solo admite el esquema 'plano': guarda por columnas con mínimo y
+máximo por bloque, así que no necesita particiones ni dimensiones para leer
+poco.
+"""
+
+import os
+import re
+import itertools
+import threading
+from contextlib import contextmanager
+
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+BACKENDS = ['postgres', 'duckdb']
+
+# Errores de base de datos de cualquiera de los dos backends
+ERRORES_BD = (SQLAlchemyError,) if duckdb is None else (SQLAlchemyError, duckdb.Error)
+
+_SERIAL = re.compile(r'CREATE TABLE (IF NOT EXISTS )?(\w+) \(\s*(\w+) SERIAL', re.IGNORECASE)
+_PARAMETRO = re.compile(r'(?<![:\w]):(\w+)')
+# Literales ('...', E'...', $etiqueta$...$etiqueta$), identificadores "..." y
+# comentarios: su contenido no se traduce
+_LITERAL = re.compile(r"(?<!\w)[Ee]'(?:[^'\\]|\\.|'')*'"      # E'...' (con escapes \)
+                      r"|'(?:[^']|'')*'"                        # '...'
+                      r'|"(?:[^"]|"")*"'                        # "identificador"
+                      r'|\$(?P<etiqueta>[A-Za-z_]\w*|)\$.*?\$(?P=etiqueta)\$'
+                      r'|--[^\n]*|/\*.*?\*/', re.DOTALL)
+_DML = re.compile(r'^\s*(INSERT|UPDATE|DELETE)\b', re.IGNORECASE)
+_TO_REGCLASS = """
+CREATE OR REPLACE TEMP MACRO to_regclass(nombre) AS (
+    SELECT MAX(n) FROM (SELECT table_name AS n FROM duckdb_tables()
+                        UNION ALL SELECT view_name FROM duckdb_views())
+    WHERE n = nombre
+)
+"""
+_registros = itertools.count(1)
+
+
+# =============================================================================
+# DIALECTO
+# =============================================================================
+
+def _fuera_de_literales(sql, funcion):
+    """Aplica funcion a los tramos de sql que no son literales ni comentarios"""
+    partes, inicio = [], 0
+    for literal in _LITERAL.finditer(sql):
+        partes += [funcion(sql[inicio:literal.start()]), literal.group()]
+        inicio = literal.end()
+    partes.append(funcion(sql[inicio:]))
+    return ''.join(partes)
+
+
+def traducir(sql, parametros=None):
+    """
+    SQL de PostgreSQL del proyecto → SQL de DuckDB. Los marcadores solo se
+    traducen si la sentencia lleva parámetros y según su estilo: :nombre con
+    un diccionario (text() de SQLAlchemy), %s con una secuencia (cursor de
+    psycopg2, donde %% es un % literal también dentro de los textos). Un
+    '%s' dentro de un LIKE o un ':nombre' dentro de un texto no se tocan.
+    """
+    nombrados = isinstance(parametros, dict)
+
+    def traducir_tramo(tramo):
+        tramo = _SERIAL.sub(lambda m: (f"CREATE SEQUENCE IF NOT EXISTS {m[2]}_{m[3]}_seq; "
+                                       f"CREATE TABLE {m[1] or ''}{m[2]} ("
+                                       f"{m[3]} INTEGER DEFAULT nextval('{m[2]}_{m[3]}_seq')"), tramo)
+        tramo = re.sub(r'\bJSONB\b', 'JSON', tramo, flags=re.IGNORECASE)
+        if parametros and nombrados:
+            tramo = _PARAMETRO.sub(r'$\1', tramo)
+        elif parametros:
+            tramo = re.sub(r'(?<!%)((?:%%)*)%s', r'\1?', tramo)
+        return tramo
+
+    sql = _fuera_de_literales(sql, traducir_tramo)
+    return sql.replace('%%', '%') if parametros and not nombrados else sql
+
+
+def _valor(valor):
+    """Escalares de numpy → Python (DuckDB no los convierte solo)"""
+    if isinstance(valor, (list, tuple)):
+        return [_valor(v) for v in valor]
+    return valor.item() if hasattr(valor, 'item') else valor
+
+
+def _parametros(parametros):
+    if isinstance(parametros, dict):
+        return {nombre: _valor(valor) for nombre, valor in parametros.items()}
+    return [_valor(valor) for valor in parametros]
+
+
+# =============================================================================
+# DUCKDB CON LA INTERFAZ DE SQLALCHEMY
+# =============================================================================
+
+class CursorDuckDB:
+    """
+    Cursor DBAPI y a la vez Result de SQLAlchemy (fetchone, fetchall,
+    scalar, keys, iteración) sobre una conexión DuckDB.
+    """
+
+    def __init__(self, conexion):
+        self._conexion = conexion
+        self._con = conexion._con
+        self.rowcount = -1
+        self.description = None
+
+    def execute(self, sql, parametros=None):
+        self._conexion._iniciar()
+        sql = traducir(str(sql), parametros)
+        if parametros:
+            self._con.execute(sql, _parametros(parametros))
+        else:
+            self._con.execute(sql)
+        self.description = self._con.description
+        # DuckDB regresa el número de filas afectadas como resultado del DML
+        self.rowcount = self._con.fetchone()[0] if _DML.match(sql) else -1
+        return self
+
+    def insertar_dataframe(self, df, tabla):
+        """INSERT de las filas de df en `tabla` (columnas de df, en su orden)"""
+        self._conexion._iniciar()
+        nombre = f'df_carga_{next(_registros)}'
+        columnas = ', '.join(f'"{col}"' for col in df.columns)
+        self._con.register(nombre, df)
+        try:
+            self._con.execute(f'INSERT INTO {tabla} ({columnas}) SELECT {columnas} FROM {nombre}')
+            self.rowcount = self._con.fetchone()[0]
+        finally:
+            self._con.unregister(nombre)
+
+    def reemplazar_dataframe(self, df, tabla, columna, valor, llave='huella'):
+        """
+        Reemplaza las filas de `tabla` con columna = valor por las de df.
+        DuckDB no deja volver a insertar en la misma transacción una llave
+        única que se borró, así que solo se borran las filas cuya llave no
+        viene en df; las demás (misma huella, mismo registro) se conservan.
+        Regresa el número de filas que había.
+        """
+        self._conexion._iniciar()
+        nombre = f'df_carga_{next(_registros)}'
+        columnas = ', '.join(f'"{col}"' for col in df.columns)
+        self._con.register(nombre, df)
+        try:
+            antes = self._con.execute(f'SELECT COUNT(*) FROM {tabla} WHERE {columna} = ?',
+                                      [_valor(valor)]).fetchone()[0]
+            self._con.execute(f'DELETE FROM {tabla} WHERE {columna} = ? '
+                              f'AND {llave} NOT IN (SELECT {llave} FROM {nombre})', [_valor(valor)])
+            self._con.execute(f'INSERT INTO {tabla} ({columnas}) SELECT {columnas} FROM {nombre} '
+                              f'ON CONFLICT ({llave}) DO NOTHING')
+            self.rowcount = antes
+        finally:
+            self._con.unregister(nombre)
+        return antes
+
+    def fetchone(self):
+        return self._con.fetchone()
+
+    def fetchall(self):
+        return self._con.fetchall()
+
+    def scalar(self):
+        fila = self._con.fetchone()
+        return None if fila is None else fila[0]
+
+    def keys(self):
+        return [columna[0] for columna in self.description or []]
+
+    def df(self):
+        return self._con.df()
+
+    def df_por_lotes(self, lote):
+        """El resultado en DataFrames de ~`lote` filas (vectores de 2048); al menos uno"""
+        vectores = max(1, lote // 2048)
+        primero = True
+        while True:
+            parte = self._con.fetch_df_chunk(vectores)
+            if len(parte) == 0 and not primero:
+                return
+            yield parte
+            if len(parte) == 0:
+                return
+            primero = False
+
+    def __iter__(self):
+        return iter(self._con.fetchall())
+
+    def close(self):
+        pass
+
+
+class ConexionDuckDB:
+    """
+    Conexión de SQLAlchemy (execute con text() y parámetros :nombre) y
+    conexión DBAPI (cursor() con parámetros %s). Como en los dos, la
+    transacción empieza con la primera sentencia y termina con commit() o
+    rollback(); close() descarta lo que no se confirmó.
+    """
+
+    def __init__(self, con):
+        self._con = con
+        self._en_transaccion = False
+        con.execute(_TO_REGCLASS)
+
+    def _iniciar(self):
+        if not self._en_transaccion:
+            self._con.execute("BEGIN TRANSACTION")
+            self._en_transaccion = True
+
+    def execute(self, sql, parametros=None):
+        return CursorDuckDB(self).execute(sql, parametros)
+
+    def cursor(self):
+        return CursorDuckDB(self)
+
+    def commit(self):
+        if self._en_transaccion:
+            self._con.execute("COMMIT")
+            self._en_transaccion = False
+
+    def rollback(self):
+        if self._en_transaccion:
+            self._con.execute("ROLLBACK")
+            self._en_transaccion = False
+
+    def close(self):
+        self.rollback()
+        self._con.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class MotorDuckDB:
+    """
+    Engine sobre un archivo DuckDB. Cada connect() es una conexión propia a
+    la misma base (DuckDB permite usarlas desde hilos distintos), así que
+    también sirve de pool para las consultas concurrentes de la validación.
+    """
+
+    def __init__(self, ruta):
+        if duckdb is None:
+            raise ImportError("El backend 'duckdb' requiere el paquete duckdb (pip install duckdb)")
+        directorio = os.path.dirname(ruta)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        self.ruta = ruta
+        self.url = f'duckdb:///{ruta}'
+        self._base = None
+        self._candado = threading.Lock()
+
+    def connect(self):
+        with self._candado:
+            if self._base is None:
+                self._base = duckdb.connect(self.ruta)
+            return ConexionDuckDB(self._base.cursor())
+
+    raw_connection = connect
+
+    @contextmanager
+    def begin(self):
+        conn = self.connect()
+        try:
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    def dispose(self):
+        """Cierra el archivo (se vuelve a abrir con el siguiente connect)"""
+        with self._candado:
+            if self._base is not None:
+                self._base.close()
+                self._base = None
+
+
+def es_duckdb(engine):
+    return isinstance(engine, MotorDuckDB)
+
+
+def leer_sql(conn, sql, parametros=None):
+    """pd.read_sql(text(sql), conn) para una conexión de cualquiera de los dos backends"""
+    if isinstance(conn, ConexionDuckDB):
+        return conn.execute(sql, parametros).df()
+    return pd.read_sql(text(sql), conn, params=parametros)
+
+
+def leer_sql_por_lotes(conn, sql, parametros=None, lote=100_000):
+    """
+    Como leer_sql, pero entrega DataFrames de hasta `lote` filas: en
+    PostgreSQL con un cursor del lado del servidor, en DuckDB por vectores.
+    """
+    if isinstance(conn, ConexionDuckDB):
+        yield from conn.execute(sql, parametros).df_por_lotes(lote)
+        return
+    conn = conn.execution_options(stream_results=True, max_row_buffer=lote)
+    yield from pd.read_sql(text(sql), conn, params=parametros or {}, chunksize=lote)
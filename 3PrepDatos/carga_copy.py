@@ -0,0 +1,164 @@
+"""
+PROYECTO: Análisis de Accidentes de Tránsito en Hermosillo, Sonora
+Carga masiva a PostgreSQL con COPY ... FROM STDIN
+
+El DataFrame se serializa a CSV por tramos de filas_por_buffer registros;
+psycopg2 va pidiendo bytes y solo existe en memoria el tramo actual, nunca
+el CSV completo. Con el backend DuckDB (ver backends.py) el DataFrame se
+inserta directamente, sin CSV.
+"""
+
+import io
+import time
+
+import pandas as pd
+
+from esquema_accidentes import COLUMNAS_CARGA
+from backends import es_duckdb
+
+# Registros serializados por tramo y bytes por lectura de psycopg2
+FILAS_POR_BUFFER = 50_000
+BYTES_POR_LECTURA = 1 << 20
+
+# Marcador de nulo del COPY: así un campo vacío se carga como '' y no como NULL
+MARCADOR_NULO = '\\N'
+
+
+class LectorCSVPorTramos(io.TextIOBase):
+    """
+    Archivo de solo lectura que genera el CSV de un DataFrame tramo por
+    tramo. Los nulos se escriben como MARCADOR_NULO y el texto vacío como
+    campo vacío, para que el COPY los distinga.
+    """
+
+    def __init__(self, df, filas_por_buffer=FILAS_POR_BUFFER):
+        self._df = df
+        self._filas = filas_por_buffer
+        self._inicio = 0
+        self._tramo = io.StringIO()
+
+    def readable(self):
+        return True
+
+    def _siguiente_tramo(self):
+        fin = self._inicio + self._filas
+        tramo = self._df.iloc[self._inicio:fin]
+        texto = tramo.to_csv(header=False, index=False, na_rep=MARCADOR_NULO)
+        self._inicio = fin
+        self._tramo = io.StringIO(texto)
+
+    def read(self, size=-1):
+        partes = []
+        pendiente = size
+        while pendiente != 0:
+            parte = self._tramo.read(pendiente)
+            if not parte:
+                if self._inicio >= len(self._df):
+                    break
+                self._siguiente_tramo()
+                continue
+            partes.append(parte)
+            if pendiente > 0:
+                pendiente -= len(parte)
+        return ''.join(partes)
+
+
+def columnas_copy(df, columnas=COLUMNAS_CARGA):
+    """Columnas del DataFrame en el orden del DDL (sin el id SERIAL)."""
+    return [nombre for nombre, _ in columnas if nombre in df.columns]
+
+
+def preparar_para_copy(df, columnas=COLUMNAS_CARGA):
+    """
+    Ordena las columnas como el DDL y asegura que las columnas enteras se
+    escriban como enteros (un float como '1.0' haría fallar el COPY).
+    """
+    tipos = dict(columnas)
+    nombres = columnas_copy(df, columnas)
+    df = df[nombres]
+    for col in nombres:
+        if not tipos[col].startswith('VARCHAR') and pd.api.types.is_float_dtype(df[col]):
+            df = df.assign(**{col: df[col].astype('Int64')})
+    return df
+
+
+def cargar_copy(df, engine, tabla='accidentes_hermosillo', filas_por_buffer=FILAS_POR_BUFFER,
+                conexion=None, columnas=COLUMNAS_CARGA):
+    """
+    Carga df en `tabla` con un solo COPY FROM STDIN.
+
+    Sin `conexion` se usa una conexión propia y se hace commit al terminar.
+    Con una conexión DBAPI abierta, el COPY queda dentro de la transacción
+    de quien llama, que decide cuándo hacer commit. `columnas` es la lista
+    (nombre, tipo SQL) de la tabla destino. El id SERIAL no se envía, así que
+    PostgreSQL lo asigna. Regresa (registros cargados, segundos).
+    """
+    df = preparar_para_copy(df, columnas)
+    lista_columnas = ', '.join(f'"{col}"' for col in df.columns)
+    sql = (f"COPY {tabla} ({lista_columnas}) FROM STDIN "
+           f"WITH (FORMAT csv, NULL '{MARCADOR_NULO}')")
+
+    inicio = time.perf_counter()
+    conn = conexion if conexion is not None else engine.raw_connection()
+    try:
+        cursor = conn.cursor()
+        if es_duckdb(engine):
+            cursor.insertar_dataframe(df, tabla)
+        else:
+            cursor.copy_expert(sql, LectorCSVPorTramos(df, filas_por_buffer), size=BYTES_POR_LECTURA)
+        cursor.close()
+        if conexion is None:
+            conn.commit()
+    except Exception:
+        if conexion is None:
+            conn.rollback()
+        raise
+    finally:
+        if conexion is None:
+            conn.close()
+    segundos = time.perf_counter() - inicio
+
+    velocidad = len(df) / segundos if segundos > 0 else float('inf')
+    print(f"✓ COPY: {len(df):,} registros en {segundos:.2f} s ({velocidad:,.0f} registros/s)")
+    return len(df), segundos
+
+
+def cargar_sin_duplicados(df, engine, tabla='accidentes_hermosillo', llave='huella',
+                          conexion=None, columnas=COLUMNAS_CARGA):
+    """
+    Carga df en `tabla` omitiendo los registros cuya `llave` (la huella, con
+    índice único) ya está en la tabla. Si la tabla está vacía no hay con qué
+    chocar y se hace el COPY directo; si no, el COPY va a una tabla temporal
+    y de ahí INSERT ... ON CONFLICT DO NOTHING. `conexion` funciona igual
+    que en cargar_copy. Regresa (registros insertados, registros omitidos).
+    """
+    conn = conexion if conexion is not None else engine.raw_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT EXISTS (SELECT 1 FROM {tabla})")
+        if not cursor.fetchone()[0]:
+            insertados, _ = cargar_copy(df, engine, tabla, conexion=conn, columnas=columnas)
+        else:
+            nombres = ', '.join(f'"{col}"' for col in columnas_copy(df, columnas))
+            # Sin restricciones (la de NOT NULL del id rechazaría el COPY)
+            cursor.execute("DROP TABLE IF EXISTS carga_temporal")
+            cursor.execute(f"CREATE TEMP TABLE carga_temporal AS "
+                           f"SELECT {nombres} FROM {tabla} WITH NO DATA")
+            cargar_copy(df, engine, 'carga_temporal', conexion=conn, columnas=columnas)
+            cursor.execute(f"INSERT INTO {tabla} ({nombres}) SELECT {nombres} FROM carga_temporal "
+                           f"ON CONFLICT ({llave}) DO NOTHING")
+            insertados = cursor.rowcount
+            cursor.execute("DROP TABLE carga_temporal")
+            print(f"✓ {insertados:,} registros nuevos, {len(df) - insertados:,} ya estaban "
+                  f"cargados (omitidos)")
+        cursor.close()
+        if conexion is None:
+            conn.commit()
+    except Exception:
+        if conexion is None:
+            conn.rollback()
+        raise
+    finally:
+        if conexion is None:
+            conn.close()
+    return insertados, len(df) - insertados
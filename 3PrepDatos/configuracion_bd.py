@@ -0,0 +1,119 @@
+"""
+PROYECTO: Análisis de Accidentes de Tránsito en Hermosillo, Sonora
+Configuración de la base de datos y versión de la tabla
+
+Conexión (variables de entorno ACCIDENTES_DB_*, ACCIDENTES_BACKEND y
+ACCIDENTES_DUCKDB), engine del backend configurado y versión de
+accidentes_hermosillo según el manifiesto de cargas. SQLAlchemy solo se
+importa al crear un engine: pipeline.py usa la versión para decidir si una
+etapa está en caché sin pagar la importación del ETL.
+
+Toda carga del ETL (completa, incremental, por partición o en estrella)
+escribe en carga_manifiesto el checksum, los objetivos y la fecha de cada año
+en la misma transacción que los datos, así que la versión sale de esa tabla
+de unas cuantas filas, sin recorrer accidentes_hermosillo.
+"""
+
+import os
+import hashlib
+
+# Configuración de PostgreSQL (las variables de entorno ACCIDENTES_DB_* tienen prioridad)
+DB_CONFIG = {
+    'host': os.environ.get('ACCIDENTES_DB_HOST', 'localhost'),
+    'port': int(os.environ.get('ACCIDENTES_DB_PORT', 5432)),
+    'user': os.environ.get('ACCIDENTES_DB_USER', 'postgres'),
+    'password': os.environ.get('ACCIDENTES_DB_PASSWORD', 'mario1'),  # CAMBIAR por tu contraseña
+    'database': os.environ.get('ACCIDENTES_DB_NAME', 'accidentes_hermosillo')
+}
+
+# Backend de almacenamiento: 'postgres' (servidor de DB_CONFIG) o 'duckdb'
+# (archivo DUCKDB_PATH dentro del proceso, sin servidor; ver backends.py)
+BACKEND_BD = os.environ.get('ACCIDENTES_BACKEND', 'postgres')
+DUCKDB_PATH = os.environ.get('ACCIDENTES_DUCKDB', os.path.join('data', 'accidentes.duckdb'))
+
+TABLA = 'accidentes_hermosillo'
+
+# Una fila por año cargado: cualquier carga cambia al menos la fecha
+SQL_VERSION_MANIFIESTO = """
+    SELECT string_agg(CAST(anio AS VARCHAR) || ':' || checksum || ':'
+                      || COALESCE(objetivos, '') || ':' || CAST(cargado_en AS VARCHAR),
+                      ',' ORDER BY anio)
+    FROM carga_manifiesto
+"""
+
+
+def url_base_datos(db_config=None):
+    """
+    URL de SQLAlchemy a partir de DB_CONFIG. Con URL.create la contraseña no
+    necesita escaparse y 'host' también puede ser el directorio del socket
+    de un servidor local (p. ej. el PostgreSQL embebido de los benchmarks).
+    """
+    from sqlalchemy.engine import URL
+
+    db_config = db_config or DB_CONFIG
+    return URL.create('postgresql+psycopg2', username=db_config['user'],
+                      password=db_config['password'], host=db_config['host'],
+                      port=db_config['port'], database=db_config['database'])
+
+
+def crear_motor(backend=None, duckdb_path=None, db_config=None):
+    """Engine del backend configurado: PostgreSQL (DB_CONFIG) o el archivo DuckDB"""
+    backend = backend or BACKEND_BD
+    if backend == 'duckdb':
+        from backends import MotorDuckDB
+        return MotorDuckDB(duckdb_path or DUCKDB_PATH)
+    from sqlalchemy import create_engine
+    return create_engine(url_base_datos(db_config))
+
+
+def huella_manifiesto(manifiesto, tabla=TABLA):
+    """Huella corta de `tabla` a partir del texto de SQL_VERSION_MANIFIESTO"""
+    return hashlib.sha1(f"{tabla}|{manifiesto}".encode('utf-8')).hexdigest()[:16]
+
+
+def version_manifiesto(cursor, tabla=TABLA):
+    """
+    Huella de la versión de `tabla` según carga_manifiesto (cursor DBAPI de
+    cualquiera de los dos backends); None si el manifiesto está vacío. Si la
+    tabla del manifiesto no existe, el error del backend se propaga.
+    """
+    cursor.execute(SQL_VERSION_MANIFIESTO)
+    fila = cursor.fetchone()
+    if fila is None or fila[0] is None:
+        return None
+    return huella_manifiesto(fila[0], tabla)
+
+
+def version_bd(backend=None, db_config=None, duckdb_path=None, tabla=TABLA):
+    """
+    Versión de `tabla` leída con una conexión DBAPI directa (psycopg2 o
+    duckdb en solo lectura). None si la base, el archivo o el manifiesto no
+    existen.
+    """
+    backend = backend or BACKEND_BD
+    if backend == 'duckdb':
+        import duckdb
+        ruta = duckdb_path or DUCKDB_PATH
+        if not os.path.exists(ruta):
+            return None
+        errores = duckdb.Error
+        try:
+            conn = duckdb.connect(ruta, read_only=True)
+        except errores:
+            return None
+    else:
+        import psycopg2
+        db_config = db_config or DB_CONFIG
+        errores = psycopg2.Error
+        try:
+            conn = psycopg2.connect(host=db_config['host'], port=db_config['port'],
+                                    user=db_config['user'], password=db_config['password'],
+                                    dbname=db_config['database'])
+        except errores:
+            return None
+    try:
+        return version_manifiesto(conn.cursor(), tabla)
+    except errores:
+        return None
+    finally:
+        conn.close()
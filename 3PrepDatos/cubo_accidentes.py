@@ -0,0 +1,322 @@
+"""
+PROYECTO: Análisis de Accidentes de Tránsito en Hermosillo, Sonora
+Cubo de accidentes precalculado (celdas observadas en Parquet, por entidad y año)
+
+Los cortes del EDA (por año, mes, día de la semana y hora, cruzados con tipo
+de vehículo, causaacci y tipaccid) volvían a agrupar los registros cada vez.
+El cubo guarda el número de accidentes, muertos, heridos y accidentes
+fatales de cada combinación de esas dimensiones, pero solo de las
+combinaciones que aparecen en los datos (un cubo denso con todas las
+combinaciones ocupaba cientos de MB aunque casi todas sus celdas fueran
+cero). Hay un archivo por entidad y año:
+
+    <ruta>/rebanada-<entidad>-<año>-<n>.parquet
+                               una fila por celda observada: vehiculo, mes,
+                               diasemana, id_hora, causaacci, tipaccid y MEDIDAS
+    <ruta>/indice.json         archivo vigente de cada entidad y año y la
+                               versión de cada año
+
+Las entidades no se mezclan: una consulta sin filtro de entidad suma las que
+haya, como groupby sobre toda la tabla, e id_entidad=26 solo lee los
+archivos de ese estado (igual con anio). Un objetivo municipal cuenta en su
+entidad (no hay dimensión de municipio).
+
+La dimensión vehiculo no reparte los accidentes: uno cuenta para cada
+vehículo involucrado (columna > 0), como en resumen_vehiculo. El valor
+'todos' cuenta cada accidente una sola vez y es el que se usa cuando la
+consulta no agrupa ni filtra por vehículo. Un nulo en diasemana, causaacci o
+tipaccid es su propia celda: cuenta en los totales pero no aparece como
+grupo, igual que en groupby.
+
+Al recargar un año solo se escriben los archivos de ese año (uno nuevo por
+entidad); los de los demás años no se tocan. Los archivos nuevos se
+publican reemplazando indice.json de una sola vez, así que un lector ve el
+cubo anterior o el nuevo completo. indice.json guarda además la versión de
+cada año según el manifiesto de cargas (checksum, objetivos y fecha);
+abrir(versiones=...) rechaza un cubo que no corresponde a la base.
+
+El cubo es opcional: la carga solo lo actualiza con ACCIDENTES_CUBO_ACTIVO=1
+(ver ETL_postgreSQL.actualizar_cubo_accidentes).
+
+Uso:
+    from cubo_accidentes import CuboAccidentes
+    cubo = CuboAccidentes.abrir()
+    cubo.consultar(['id_hora'], id_entidad=26, anio=2023, vehiculo='motociclet')
+    cubo.consultar(['vehiculo', 'causaacci'], medidas=['muertos', 'heridos'])
+"""
+
+import os
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+from esquema_accidentes import COLUMNAS_VEHICULOS, COLUMNAS_MUERTOS, COLUMNAS_HERIDOS
+
+CUBO_PATH = os.path.join('data', 'processed', 'cubo_accidentes')
+
+DIMENSIONES = ['vehiculo', 'id_entidad', 'anio', 'mes', 'diasemana', 'id_hora', 'causaacci', 'tipaccid']
+MEDIDAS = ['accidentes', 'muertos', 'heridos', 'accidentes_fatales']
+
+# Dimensiones que se guardan dentro de cada archivo (entidad y año van en el índice)
+DIMENSIONES_CELDA = [dim for dim in DIMENSIONES if dim not in ('id_entidad', 'anio')]
+
+TODOS = 'todos'
+
+# Columnas de un registro que lee el cubo
+COLUMNAS_CUBO = DIMENSIONES[1:] + COLUMNAS_VEHICULOS + COLUMNAS_MUERTOS + COLUMNAS_HERIDOS
+
+FORMATO = 'celdas-observadas'
+ARCHIVO_INDICE = 'indice.json'
+
+
+# =============================================================================
+# CONSTRUCCIÓN
+# =============================================================================
+
+def _dimension(serie):
+    """Valores de la dimensión para agrupar (una categoría se agrupa por su valor)"""
+    return serie.astype(object) if isinstance(serie.dtype, pd.CategoricalDtype) else serie
+
+
+def celdas_de(df):
+    """
+    Celdas observadas de los registros de df: una fila por combinación de
+    DIMENSIONES con al menos un accidente y una columna por medida
+    """
+    muertos = df[COLUMNAS_MUERTOS].to_numpy(dtype='float64', na_value=0).sum(axis=1)
+    heridos = df[COLUMNAS_HERIDOS].to_numpy(dtype='float64', na_value=0).sum(axis=1)
+    base = pd.DataFrame({dim: _dimension(df[dim]).to_numpy() for dim in DIMENSIONES[1:]})
+    base['accidentes'] = 1
+    base['muertos'] = muertos
+    base['heridos'] = heridos
+    base['accidentes_fatales'] = muertos > 0
+
+    # Cada accidente va una vez a 'todos' y una vez a cada vehículo involucrado
+    fila, vehiculo = np.nonzero(df[COLUMNAS_VEHICULOS].to_numpy(dtype='float64', na_value=0) > 0)
+    registros = pd.concat([base.assign(vehiculo=TODOS),
+                           base.iloc[fila].assign(vehiculo=np.take(COLUMNAS_VEHICULOS, vehiculo))],
+                          ignore_index=True)
+    del base
+    celdas = registros.groupby(DIMENSIONES, dropna=False, sort=False)[MEDIDAS].sum()
+    return celdas.astype('int64').reset_index()
+
+
+def _publicar(ruta, rebanadas, versiones):
+    """Hace vigentes los archivos de `rebanadas` reemplazando indice.json (os.replace es atómico)"""
+    meta = {'formato': FORMATO, 'dimensiones': DIMENSIONES, 'medidas': MEDIDAS,
+            'rebanadas': sorted(rebanadas, key=lambda r: (r['anio'], r['id_entidad'])),
+            'versiones': {str(anio): v for anio, v in sorted(versiones.items())}}
+    destino = os.path.join(ruta, ARCHIVO_INDICE)
+    with open(destino + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(destino + '.tmp', destino)
+
+
+def _limpiar(ruta, vigentes):
+    """Borra los archivos de datos que ya no están en el índice (y los de un cubo denso anterior)"""
+    for archivo in os.listdir(ruta):
+        anterior = archivo.startswith('cubo-') and archivo.endswith('.npy')
+        reemplazado = archivo.startswith('rebanada-') and archivo not in vigentes
+        if anterior or reemplazado or archivo == 'coordenadas.json':
+            os.remove(os.path.join(ruta, archivo))
+
+
+def versiones_cubo(ruta=CUBO_PATH):
+    """Versión guardada de cada año del cubo de `ruta` ({} si no hay un cubo que se pueda usar)"""
+    try:
+        return CuboAccidentes.abrir(ruta).versiones
+    except (OSError, ValueError):
+        return {}
+
+
+def actualizar_cubo(df, ruta=CUBO_PATH, anios=None, versiones=None):
+    """
+    Reemplaza en el cubo de `ruta` los archivos de cada año de `anios` (por
+    defecto, los años presentes en df) con los registros de df, un año a la
+    vez; los archivos de los demás años no se tocan. Lo crea si no existe o
+    si es de otro formato. Un año de `anios` sin registros queda vacío.
+    `versiones` ({anio: versión}) se guarda para los años reemplazados.
+    Regresa el CuboAccidentes actualizado.
+    """
+    inicio = time.perf_counter()
+    anios = sorted({int(anio) for anio in df['anio'].dropna().unique()} | {int(anio) for anio in anios or []})
+    versiones = versiones or {}
+
+    try:
+        actual = CuboAccidentes.abrir(ruta)
+        rebanadas, sellos = actual.rebanadas, actual.versiones
+    except (OSError, ValueError):
+        rebanadas, sellos = [], {}
+    os.makedirs(ruta, exist_ok=True)
+
+    # La versión de un año reemplazado sin versión conocida se descarta
+    rebanadas = [r for r in rebanadas if r['anio'] not in anios]
+    sellos = {anio: v for anio, v in sellos.items() if anio not in anios}
+    for anio in anios:
+        if versiones.get(anio):
+            sellos[anio] = versiones[anio]
+        celdas = celdas_de(df[df['anio'] == anio])
+        for entidad, celdas_entidad in celdas.groupby('id_entidad', sort=True):
+            archivo = f"rebanada-{int(entidad)}-{anio}-{time.time_ns()}.parquet"
+            celdas_entidad[DIMENSIONES_CELDA + MEDIDAS].to_parquet(os.path.join(ruta, archivo), index=False)
+            rebanadas.append({'id_entidad': int(entidad), 'anio': anio, 'archivo': archivo,
+                              'celdas': len(celdas_entidad)})
+        del celdas
+
+    _publicar(ruta, rebanadas, sellos)
+    _limpiar(ruta, {r['archivo'] for r in rebanadas})
+
+    cubo = CuboAccidentes.abrir(ruta)
+    print(f"✓ Cubo de accidentes actualizado para {anios} ({cubo.celdas:,} celdas, "
+          f"{cubo.bytes_en_disco() / 1024 ** 2:,.1f} MB) en {time.perf_counter() - inicio:.2f} s")
+    return cubo
+
+
+# =============================================================================
+# CONSULTAS
+# =============================================================================
+
+def _lista(valores):
+    return list(valores) if isinstance(valores, (list, tuple, set, range)) else [valores]
+
+
+class CuboAccidentes:
+    """
+    Índice del cubo; los archivos de cada entidad y año se leen la primera
+    vez que una consulta los necesita y se conservan en memoria.
+    consultar() da el mismo resultado que df.groupby(por) sobre los
+    registros que cumplen los filtros.
+    """
+
+    def __init__(self, ruta, rebanadas, versiones=None):
+        self.ruta = ruta
+        self.rebanadas = rebanadas
+        self.versiones = versiones or {}
+        self._leidas = {}
+        self._unidas = {}
+        self._marginales = {}
+
+    @classmethod
+    def abrir(cls, ruta=CUBO_PATH, versiones=None):
+        """
+        Abre el cubo vigente de `ruta`. Con `versiones` ({anio: versión}, ver
+        manifiesto.versiones_cargadas) se verifica que cada año corresponda a
+        la base; si no, ValueError con los años desfasados.
+        """
+        with open(os.path.join(ruta, ARCHIVO_INDICE), encoding='utf-8') as f:
+            meta = json.load(f)
+        if (meta.get('formato') != FORMATO or meta['dimensiones'] != DIMENSIONES
+                or meta['medidas'] != MEDIDAS):
+            raise ValueError(f"El cubo de '{ruta}' tiene otro formato, dimensiones o medidas; "
+                             f"hay que reconstruirlo")
+        guardadas = {int(anio): v for anio, v in meta['versiones'].items()}
+        if versiones is not None:
+            desfasados = sorted(anio for anio, v in versiones.items() if guardadas.get(int(anio)) != v)
+            if desfasados:
+                raise ValueError(f"El cubo de '{ruta}' no corresponde a la base en {desfasados}; "
+                                 f"hay que actualizarlo (lo hace la siguiente carga)")
+        return cls(ruta, meta['rebanadas'], guardadas)
+
+    @property
+    def celdas(self):
+        """Número de celdas observadas guardadas"""
+        return sum(r['celdas'] for r in self.rebanadas)
+
+    def bytes_en_disco(self):
+        return sum(os.path.getsize(os.path.join(self.ruta, r['archivo'])) for r in self.rebanadas)
+
+    def _leer(self, rebanada):
+        archivo = rebanada['archivo']
+        if archivo not in self._leidas:
+            try:
+                celdas = pd.read_parquet(os.path.join(self.ruta, archivo))
+            except FileNotFoundError:
+                raise ValueError(f"El cubo de '{self.ruta}' se actualizó mientras se leía; "
+                                 f"hay que volver a abrirlo")
+            self._leidas[archivo] = celdas.assign(id_entidad=rebanada['id_entidad'],
+                                                  anio=rebanada['anio'])
+        return self._leidas[archivo]
+
+    def _celdas(self, filtros):
+        """
+        Celdas de las entidades y años que piden los filtros (solo se leen
+        esos archivos), con las dimensiones de texto como categorías
+        """
+        entidades = set(_lista(filtros['id_entidad'])) if 'id_entidad' in filtros else None
+        anios = set(_lista(filtros['anio'])) if 'anio' in filtros else None
+        elegidas = tuple(r['archivo'] for r in self.rebanadas
+                         if (entidades is None or r['id_entidad'] in entidades)
+                         and (anios is None or r['anio'] in anios))
+        if elegidas not in self._unidas:
+            por_archivo = {r['archivo']: r for r in self.rebanadas}
+            partes = [self._leer(por_archivo[archivo]) for archivo in elegidas]
+            celdas = (pd.concat(partes, ignore_index=True) if partes else
+                      pd.DataFrame({col: pd.Series(dtype=object) for col in DIMENSIONES + MEDIDAS}))
+            for dim in DIMENSIONES:
+                if celdas[dim].dtype == object:
+                    celdas[dim] = celdas[dim].astype('category')
+            self._unidas[elegidas] = celdas
+        return elegidas, self._unidas[elegidas]
+
+    def _marginal(self, ejes, filtros):
+        """
+        Celdas sumadas sobre las dimensiones que no están en `ejes`; cada
+        marginal se guarda en memoria y las consultas siguientes sobre los
+        mismos ejes y archivos parten de él
+        """
+        elegidas, celdas = self._celdas(filtros)
+        clave = (elegidas, ejes, 'vehiculo' in filtros)
+        if clave not in self._marginales:
+            if 'vehiculo' not in filtros:
+                # Sin vehículo se toma 'todos' (sumar los vehículos contaría de más)
+                todos = celdas['vehiculo'] == TODOS
+                celdas = celdas[~todos if 'vehiculo' in ejes else todos]
+            self._marginales[clave] = (celdas.groupby(list(ejes), observed=True, dropna=False,
+                                                      sort=False)[MEDIDAS].sum().reset_index())
+        return self._marginales[clave]
+
+    def consultar(self, por=(), medidas=None, dropna=True, **filtros):
+        """
+        Marginal o tabla cruzada: una fila por combinación de `por` con al
+        menos un accidente y una columna por medida. Los filtros son
+        dimension=valor o dimension=[valores]; filtrar varios vehículos sin
+        agrupar por vehículo suma los accidentes de cada uno. Sin `por`
+        regresa los totales (Series).
+        """
+        por = list(por)
+        medidas = list(medidas or MEDIDAS)
+        desconocidas = (set(por) | set(filtros)) - set(DIMENSIONES)
+        if desconocidas:
+            raise ValueError(f"Dimensiones desconocidas: {sorted(desconocidas)} (el cubo tiene {DIMENSIONES})")
+
+        celdas = self._marginal(tuple(dim for dim in DIMENSIONES if dim in por or dim in filtros), filtros)
+        for dim, valores in filtros.items():
+            celdas = celdas[celdas[dim].isin(_lista(valores))]
+        if not por:
+            return pd.Series([int(celdas[m].sum()) for m in medidas], index=medidas, dtype='int64')
+        resultado = celdas.groupby(por, observed=True, sort=True, dropna=dropna)[medidas].sum()
+        # Etiquetas como valores (no categorías), igual que groupby sobre la tabla
+        niveles = [np.asarray(resultado.index.get_level_values(i)) for i in range(len(por))]
+        resultado.index = (pd.Index(niveles[0], name=por[0]) if len(por) == 1 else
+                           pd.MultiIndex.from_arrays(niveles, names=por))
+        return resultado.astype('int64')
+
+    def rebanada(self, por=(), medidas=None, dropna=True, **filtros):
+        """
+        Arreglo de la consulta (un eje por dimensión de `por`, en ese orden,
+        y uno de medidas) y las etiquetas de cada eje: los valores de esa
+        dimensión con al menos un accidente en la consulta.
+        """
+        medidas = list(medidas or MEDIDAS)
+        resultado = self.consultar(por, medidas, dropna, **filtros)
+        if not list(por):
+            return resultado.to_numpy(), []
+        niveles = [resultado.index.get_level_values(i) for i in range(len(por))]
+        factorizados = [pd.factorize(nivel, sort=True, use_na_sentinel=False) for nivel in niveles]
+        arreglo = np.zeros(tuple(len(etq) for _, etq in factorizados) + (len(medidas),), dtype='int64')
+        arreglo[tuple(codigos for codigos, _ in factorizados)] = resultado.to_numpy()
+        return arreglo, [list(etq) for _, etq in factorizados]
@@ -0,0 +1,199 @@
+"""
+PROYECTO: Análisis de Accidentes de Tránsito en Hermosillo, Sonora
+Esquema de la tabla accidentes_hermosillo
+
+Fuente única de las columnas de la tabla: crear_tabla_accidentes genera el
+DDL a partir de COLUMNAS_ACCIDENTES y la lectura de los CSV de INEGI usa el
+mismo esquema para decidir qué columnas leer y con qué tipo.
+"""
+
+# =============================================================================
+# COLUMNAS DE LA TABLA (en el orden del DDL, sin el id SERIAL)
+# =============================================================================
+
+COLUMNAS_ACCIDENTES = [
+    ('cobertura', 'VARCHAR(50)'),
+    ('id_entidad', 'INTEGER'),
+    ('id_municipio', 'INTEGER'),
+    ('anio', 'INTEGER'),
+    ('mes', 'INTEGER'),
+    ('id_hora', 'INTEGER'),
+    ('id_minuto', 'INTEGER'),
+    ('id_dia', 'INTEGER'),
+    ('diasemana', 'VARCHAR(20)'),
+    ('urbana', 'VARCHAR(100)'),
+    ('suburbana', 'VARCHAR(100)'),
+    ('tipaccid', 'VARCHAR(100)'),
+    ('automovil', 'INTEGER'),
+    ('campasaj', 'INTEGER'),
+    ('microbus', 'INTEGER'),
+    ('pascamion', 'INTEGER'),
+    ('omnibus', 'INTEGER'),
+    ('tranvia', 'INTEGER'),
+    ('camioneta', 'INTEGER'),
+    ('camion', 'INTEGER'),
+    ('tractor', 'INTEGER'),
+    ('ferrocarri', 'INTEGER'),
+    ('motociclet', 'INTEGER'),
+    ('bicicleta', 'INTEGER'),
+    ('otrovehic', 'INTEGER'),
+    ('causaacci', 'VARCHAR(200)'),
+    ('caparod', 'VARCHAR(100)'),
+    ('sexo', 'VARCHAR(20)'),
+    ('aliento', 'VARCHAR(20)'),
+    ('cinturon', 'VARCHAR(20)'),
+    ('id_edad', 'INTEGER'),
+    ('condmuerto', 'INTEGER'),
+    ('condherido', 'INTEGER'),
+    ('pasamuerto', 'INTEGER'),
+    ('pasaherido', 'INTEGER'),
+    ('peatmuerto', 'INTEGER'),
+    ('peatherido', 'INTEGER'),
+    ('ciclmuerto', 'INTEGER'),
+    ('ciclherido', 'INTEGER'),
+    ('otromuerto', 'INTEGER'),
+    ('otroherido', 'INTEGER'),
+    ('nemuerto', 'INTEGER'),
+    ('neherido', 'INTEGER'),
+    ('clasacc', 'VARCHAR(50)'),
+    ('estatus', 'VARCHAR(50)'),
+    ('año', 'VARCHAR(10)'),
+]
+
+# Huella de 64 bits del registro (ver huellas.py), con índice único: una
+# recarga no puede repetir un accidente que ya está en la tabla. No viene en
+# los CSV, se calcula en la transformación.
+COLUMNA_HUELLA = ('huella', 'BIGINT')
+
+# Columnas que se envían en el COPY (todas menos el id SERIAL)
+COLUMNAS_CARGA = COLUMNAS_ACCIDENTES + [COLUMNA_HUELLA]
+
+# Ancho entero declarado para la lectura de los CSV. Los contadores de
+# víctimas usan 16 bits porque un solo accidente de autobús puede rebasar
+# 127 heridos; el resto cabe en 8 bits salvo municipio y año.
+ANCHO_ENTERO = {
+    'id_entidad': 'Int8',
+    'id_municipio': 'Int16',
+    'anio': 'Int16',
+    'mes': 'Int8',
+    'id_hora': 'Int8',
+    'id_minuto': 'Int8',
+    'id_dia': 'Int8',
+    'id_edad': 'Int8',
+}
+ANCHO_VEHICULOS = 'Int8'
+ANCHO_VICTIMAS = 'Int16'
+
+COLUMNAS_VEHICULOS = ['automovil', 'campasaj', 'microbus', 'pascamion', 'omnibus',
+                      'tranvia', 'camioneta', 'camion', 'tractor', 'ferrocarri',
+                      'motociclet', 'bicicleta', 'otrovehic']
+COLUMNAS_VICTIMAS = ['condmuerto', 'condherido', 'pasamuerto', 'pasaherido',
+                     'peatmuerto', 'peatherido', 'ciclmuerto', 'ciclherido',
+                     'otromuerto', 'otroherido', 'nemuerto', 'neherido']
+
+# Columnas que se suman como muertos / heridos de un accidente (igual que en
+# el EDA: conductor, pasajero, peatón, ciclista y otro; sin "no especificado")
+COLUMNAS_MUERTOS = ['condmuerto', 'pasamuerto', 'peatmuerto', 'ciclmuerto', 'otromuerto']
+COLUMNAS_HERIDOS = ['condherido', 'pasaherido', 'peatherido', 'ciclherido', 'otroherido']
+
+
+def columnas_tabla():
+    """Nombres de columna de la tabla en el orden del DDL."""
+    return [nombre for nombre, _ in COLUMNAS_ACCIDENTES]
+
+
+def ddl_columnas(particionada=False):
+    """
+    Definiciones de columna para el CREATE TABLE (id SERIAL incluido).
+
+    En una tabla particionada la llave primaria debe incluir la columna de
+    partición, así que pasa a ser (id, anio).
+    """
+    definiciones = ['id SERIAL' if particionada else 'id SERIAL PRIMARY KEY']
+    definiciones += [f'{nombre} {tipo}' for nombre, tipo in COLUMNAS_CARGA]
+    if particionada:
+        definiciones.append('PRIMARY KEY (id, anio)')
+    return ',\n        '.join(definiciones)
+
+
+def dtype_lectura(nombre):
+    """dtype de pandas para leer una columna del CSV según su tipo SQL."""
+    tipo = dict(COLUMNAS_ACCIDENTES)[nombre]
+    if tipo != 'INTEGER':
+        return 'category'
+    if nombre in COLUMNAS_VEHICULOS:
+        return ANCHO_VEHICULOS
+    if nombre in COLUMNAS_VICTIMAS:
+        return ANCHO_VICTIMAS
+    return ANCHO_ENTERO[nombre]
+
+
+def plan_lectura():
+    """
+    Plan de lectura de los CSV de INEGI: {COLUMNA_EN_MAYUSCULAS: dtype}.
+
+    'año' no viene en los CSV (se agrega a partir del nombre del archivo),
+    por lo que no forma parte del plan.
+    """
+    return {nombre.upper(): dtype_lectura(nombre)
+            for nombre, _ in COLUMNAS_ACCIDENTES if nombre != 'año'}
+
+
+def plan_transformacion():
+    """
+    Plan de tipos de la fase de transformación del ETL: {columna: dtype}.
+
+    Después de rellenar los nulos con 0 los enteros ya no necesitan el tipo
+    nullable, así que se usa el entero de numpy del mismo ancho (int8 para
+    contadores, int16 para año y municipio). El texto codificado queda como
+    category, que conserva los nulos como NaN.
+    """
+    plan = {}
+    for nombre, tipo in COLUMNAS_ACCIDENTES:
+        if nombre != 'año' and tipo == 'INTEGER':
+            plan[nombre] = dtype_lectura(nombre).lower()
+        else:
+            plan[nombre] = 'category'
+    return plan
+
+
+# =============================================================================
+# DATASET PARQUET INTERMEDIO (data/processed/inegi_tidy/)
+# =============================================================================
+
+# Columnas de partición (estilo Hive: ANIO=2020/ID_ENTIDAD=26/...)
+COLUMNAS_PARTICION = ['ANIO', 'ID_ENTIDAD']
+
+_TIPOS_ARROW = {
+    'Int8': 'int8',
+    'Int16': 'int16',
+    'category': 'string',
+}
+
+# Columnas del dataset que no vienen en los CSV: AÑO se toma del nombre del
+# archivo y se guarda como entero, igual que en el modo en memoria
+_TIPOS_ARROW_EXTRA = {
+    'AÑO': 'int16',
+}
+
+
+def esquema_arrow(columnas):
+    """Esquema de pyarrow para las columnas (en mayúsculas) del dataset intermedio."""
+    import pyarrow as pa
+
+    plan = plan_lectura()
+    campos = []
+    for col in columnas:
+        if col in plan:
+            tipo = _TIPOS_ARROW[plan[col]]
+        else:
+            tipo = _TIPOS_ARROW_EXTRA.get(col, 'string')
+        campos.append(pa.field(col, getattr(pa, tipo)()))
+    return pa.schema(campos)
+
+
+def particionado_arrow():
+    """Particionado Hive tipado que comparten la escritura y la lectura del dataset."""
+    import pyarrow.dataset as ds
+
+    return ds.partitioning(esquema_arrow(COLUMNAS_PARTICION), flavor='hive')
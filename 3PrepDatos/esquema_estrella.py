@@ -0,0 +1,199 @@
+"""
+PROYECTO: Análisis de Accidentes de Tránsito en Hermosillo, Sonora
+Esquema en estrella (opcional) para accidentes_hermosillo
+
+En lugar de repetir en cada registro textos como la causa o el tipo de
+accidente, la tabla de hechos accidentes_hechos guarda un SMALLINT que apunta
+a una tabla de dimensión dim_<columna> (id, valor). Los contadores también
+pasan a SMALLINT. La vista accidentes_hermosillo reconstruye las columnas
+originales, así que SELECT * FROM accidentes_hermosillo sigue funcionando
+igual para la validación y la libreta.
+"""
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+from esquema_accidentes import COLUMNAS_ACCIDENTES, COLUMNA_HUELLA
+from carga_copy import cargar_copy, cargar_sin_duplicados
+
+# Columnas de texto de baja cardinalidad que se vuelven dimensiones
+COLUMNAS_DIMENSION = ['cobertura', 'diasemana', 'urbana', 'suburbana', 'tipaccid',
+                      'causaacci', 'caparod', 'sexo', 'aliento', 'cinturon',
+                      'clasacc', 'estatus']
+
+TABLA_HECHOS = 'accidentes_hechos'
+
+
+def columnas_hechos():
+    """(nombre, tipo SQL) de la tabla de hechos, en el orden del DDL original"""
+    columnas = []
+    for nombre, _ in COLUMNAS_ACCIDENTES:
+        if nombre in COLUMNAS_DIMENSION:
+            columnas.append((f'{nombre}_id', 'SMALLINT'))
+        else:
+            columnas.append((nombre, 'SMALLINT'))
+    return columnas + [COLUMNA_HUELLA]
+
+
+def crear_esquema_estrella(engine, esquema='public'):
+    """Crea dimensiones, tabla de hechos, índices y la vista de compatibilidad"""
+    print("="*80)
+    print(f"CREACIÓN DE ESQUEMA EN ESTRELLA: {esquema}.{TABLA_HECHOS}")
+    print("="*80)
+
+    with engine.connect() as conn:
+        existe_tabla = conn.execute(text("""
+            SELECT 1 FROM information_schema.tables
+            WHERE table_schema = :esquema AND table_name = 'accidentes_hermosillo'
+              AND table_type = 'BASE TABLE'
+        """), {'esquema': esquema}).fetchone()
+    if existe_tabla:
+        raise RuntimeError(
+            f"{esquema}.accidentes_hermosillo ya existe como tabla plana; "
+            "elimínala o usa otro esquema antes de crear el esquema en estrella"
+        )
+
+    sentencias = [f"CREATE SCHEMA IF NOT EXISTS {esquema}"]
+    for col in COLUMNAS_DIMENSION:
+        sentencias.append(f"""
+            CREATE TABLE IF NOT EXISTS {esquema}.dim_{col} (
+                id SMALLSERIAL PRIMARY KEY,
+                valor VARCHAR(200) NOT NULL UNIQUE
+            )""")
+
+    definiciones = ['id SERIAL PRIMARY KEY']
+    for nombre, tipo in columnas_hechos():
+        if nombre.endswith('_id') and nombre[:-3] in COLUMNAS_DIMENSION:
+            definiciones.append(f'{nombre} {tipo} REFERENCES {esquema}.dim_{nombre[:-3]}(id)')
+        else:
+            definiciones.append(f'{nombre} {tipo}')
+    sentencias.append(f"""
+        CREATE TABLE IF NOT EXISTS {esquema}.{TABLA_HECHOS} (
+            {', '.join(definiciones)}
+        )""")
+    for col in ['anio', 'mes', 'tipaccid_id', 'causaacci_id']:
+        sentencias.append(f"CREATE INDEX IF NOT EXISTS idx_hechos_{col} "
+                          f"ON {esquema}.{TABLA_HECHOS}({col})")
+    sentencias.append(f"ALTER TABLE {esquema}.{TABLA_HECHOS} ADD COLUMN IF NOT EXISTS huella BIGINT")
+    sentencias.append(f"CREATE UNIQUE INDEX IF NOT EXISTS idx_hechos_huella "
+                      f"ON {esquema}.{TABLA_HECHOS}(huella)")
+
+    # Vista con los mismos nombres, tipos y orden de columnas que la tabla plana
+    seleccion = ['h.id']
+    uniones = []
+    for nombre, tipo in COLUMNAS_ACCIDENTES:
+        if nombre in COLUMNAS_DIMENSION:
+            seleccion.append(f'd_{nombre}.valor::{tipo} AS {nombre}')
+            uniones.append(f'LEFT JOIN {esquema}.dim_{nombre} d_{nombre} '
+                           f'ON d_{nombre}.id = h.{nombre}_id')
+        else:
+            seleccion.append(f'h.{nombre}::{tipo} AS {nombre}')
+    seleccion.append('h.huella')
+    sentencias.append(f"""
+        CREATE OR REPLACE VIEW {esquema}.accidentes_hermosillo AS
+        SELECT {', '.join(seleccion)}
+        FROM {esquema}.{TABLA_HECHOS} h
+        {' '.join(uniones)}""")
+
+    with engine.begin() as conn:
+        for sql in sentencias:
+            conn.execute(text(sql))
+
+    print(f"\n✓ {len(COLUMNAS_DIMENSION)} dimensiones y tabla de hechos '{TABLA_HECHOS}' creadas")
+    print("✓ Vista de compatibilidad 'accidentes_hermosillo' creada")
+    print("\n" + "="*80 + "\n")
+
+
+def _ids_dimension(cursor, esquema, col, valores):
+    """Inserta los valores nuevos de una dimensión y regresa {valor: id}"""
+    tabla = f'{esquema}.dim_{col}'
+    valores = [str(v) for v in valores]
+    cursor.execute(f"SELECT valor, id FROM {tabla} WHERE valor = ANY(%s)", (valores,))
+    mapa = dict(cursor.fetchall())
+
+    # Solo se insertan los faltantes: un INSERT ... ON CONFLICT sobre todos
+    # consumiría valores del SMALLSERIAL en cada carga.
+    faltantes = [v for v in valores if v not in mapa]
+    if faltantes:
+        cursor.execute(
+            f"INSERT INTO {tabla} (valor) SELECT unnest(%s::varchar[]) "
+            f"ON CONFLICT (valor) DO NOTHING",
+            (faltantes,)
+        )
+        cursor.execute(f"SELECT valor, id FROM {tabla} WHERE valor = ANY(%s)", (faltantes,))
+        mapa.update(cursor.fetchall())
+    return mapa
+
+
+def preparar_hechos(df, conexion, esquema='public'):
+    """
+    Convierte el DataFrame transformado al formato de la tabla de hechos:
+    cada columna de dimensión se reemplaza por su id (poblando la dimensión
+    con los valores nuevos) y los enteros se reducen a int16.
+    """
+    cursor = conexion.cursor()
+    hechos = {}
+    for nombre, _ in COLUMNAS_ACCIDENTES:
+        if nombre not in df.columns:
+            continue
+        if nombre in COLUMNAS_DIMENSION:
+            categorias = pd.Categorical(df[nombre]).remove_unused_categories()
+            codigos = categorias.codes
+            nulos = codigos < 0
+            if len(categorias.categories):
+                mapa = _ids_dimension(cursor, esquema, nombre, categorias.categories)
+                ids = np.array([mapa[str(v)] for v in categorias.categories], dtype='int16')
+                valores = ids[np.where(nulos, 0, codigos)]
+            else:
+                valores = np.zeros(len(df), dtype='int16')
+            hechos[f'{nombre}_id'] = pd.arrays.IntegerArray(valores, nulos)
+        else:
+            hechos[nombre] = pd.to_numeric(df[nombre], errors='coerce').astype('Int16').array
+    if 'huella' in df.columns:
+        hechos['huella'] = df['huella'].to_numpy()
+    cursor.close()
+    return pd.DataFrame(hechos, index=df.index)
+
+
+def cargar_estrella(df, engine, conexion=None, esquema='public', omitir_duplicados=False):
+    """
+    Puebla las dimensiones y carga los hechos con COPY en una sola
+    transacción. Con omitir_duplicados=True los hechos cuya huella ya está
+    cargada se omiten (ver cargar_sin_duplicados).
+    """
+    conn = conexion if conexion is not None else engine.raw_connection()
+    try:
+        hechos = preparar_hechos(df, conn, esquema)
+        cargar = cargar_sin_duplicados if omitir_duplicados else cargar_copy
+        resultado = cargar(hechos, engine, f'{esquema}.{TABLA_HECHOS}',
+                           conexion=conn, columnas=columnas_hechos())
+        if conexion is None:
+            conn.commit()
+    except Exception:
+        if conexion is None:
+            conn.rollback()
+        raise
+    finally:
+        if conexion is None:
+            conn.close()
+    return resultado
+
+
+def reporte_tamanos(engine, esquema_plano='public', esquema_estrella='estrella'):
+    """Tamaño en disco (heap + índices) de la tabla plana vs hechos + dimensiones"""
+    with engine.connect() as conn:
+        plano = conn.execute(text(
+            f"SELECT pg_total_relation_size('{esquema_plano}.accidentes_hermosillo')"
+        )).scalar()
+        estrella = conn.execute(text(
+            f"SELECT pg_total_relation_size('{esquema_estrella}.{TABLA_HECHOS}')"
+        )).scalar()
+        for col in COLUMNAS_DIMENSION:
+            estrella += conn.execute(text(
+                f"SELECT pg_total_relation_size('{esquema_estrella}.dim_{col}')"
+            )).scalar()
+
+    print(f"📦 Tabla plana:         {plano / 1e6:10.2f} MB")
+    print(f"📦 Hechos + dimensiones: {estrella / 1e6:10.2f} MB  ({estrella / plano * 100:.1f}% del original)")
+    return plano, estrella
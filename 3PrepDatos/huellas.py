@@ -0,0 +1,177 @@
+"""
+PROYECTO: Análisis de Accidentes de Tránsito en Hermosillo, Sonora
+Huellas de 64 bits por registro y eliminación de duplicados por bloques
+
+La huella de una fila combina un hash por columna calculado de forma
+vectorizada, así que dos filas iguales (con NaN igual a NaN, como en
+drop_duplicates) siempre tienen la misma huella. El hash no depende del
+ancho del tipo: Int8, int64 o float con el mismo valor dan la misma huella,
+y una columna de texto da lo mismo como object que como category.
+
+HuellasVistas guarda las huellas ya vistas en arreglos uint64 ordenados
+(8 bytes por fila, contra ~100 de un set de Python), de modo que los
+duplicados se detectan entre bloques y entre archivos sin tener todas las
+filas en memoria. Dos filas distintas con la misma huella tienen una
+probabilidad del orden de n² / 2⁶⁵ (~10⁻⁶ para los ~4 millones de registros
+nacionales).
+"""
+
+import numpy as np
+import pandas as pd
+
+from esquema_accidentes import COLUMNAS_ACCIDENTES
+
+# Hash de un valor nulo (el mismo que usa pandas para los nulos de texto) y
+# constantes de la combinación de columnas (FNV-1a sobre palabras de 64 bits)
+HASH_NULO = np.uint64(np.iinfo(np.uint64).max)
+SEMILLA = np.uint64(0xCBF29CE484222325)
+PRIMO = np.uint64(0x100000001B3)
+
+# Tramos de huellas sin fusionar antes de ordenarlos en un solo arreglo
+MAX_TRAMOS = 16
+
+
+# =============================================================================
+# HUELLAS
+# =============================================================================
+
+def _hash_columna(serie):
+    """Hash uint64 de cada valor de la serie (nulos → HASH_NULO)"""
+    if pd.api.types.is_numeric_dtype(serie) and not isinstance(serie.dtype, pd.CategoricalDtype):
+        valores = serie.to_numpy(dtype='float64', na_value=np.nan) + 0.0  # -0.0 → 0.0
+        nulos = np.isnan(valores)
+        hashes = pd.util.hash_array(np.where(nulos, 0.0, valores))
+        hashes[nulos] = HASH_NULO
+        return hashes
+    # Texto (object o category): pandas hashea cada categoría una sola vez
+    return pd.util.hash_pandas_object(serie, index=False, categorize=True).to_numpy()
+
+
+def _combinar(hashes_columnas, filas):
+    huella = np.full(filas, SEMILLA, dtype='uint64')
+    for hashes in hashes_columnas:
+        huella ^= hashes
+        huella *= PRIMO
+    return huella
+
+
+def huella_filas(df, columnas=None):
+    """
+    Huella uint64 de cada fila de df sobre `columnas` (por defecto todas, en
+    su orden). Una columna que no está en df cuenta como nula.
+    """
+    columnas = list(df.columns) if columnas is None else columnas
+    return _combinar(((_hash_columna(df[col]) if col in df.columns
+                       else np.full(len(df), HASH_NULO, dtype='uint64'))
+                      for col in columnas), len(df))
+
+
+def _valores_canonicos(df):
+    """Columnas de la tabla con el tipo del esquema, sin importar cómo se leyeron"""
+    for nombre, tipo in COLUMNAS_ACCIDENTES:
+        if nombre not in df.columns:
+            yield None
+            continue
+        serie = df[nombre]
+        if tipo == 'INTEGER':
+            if not pd.api.types.is_numeric_dtype(serie):
+                serie = pd.to_numeric(serie, errors='coerce')
+        elif pd.api.types.is_numeric_dtype(serie) and not isinstance(serie.dtype, pd.CategoricalDtype):
+            # Igual que aplicar_plan_tipos: 'año' leído del CSV como número
+            serie = serie.astype(str).where(serie.notna())
+        yield serie
+
+
+def columnas_huella(df):
+    """Columnas del esquema presentes en df: las que cubre huella_accidentes"""
+    return [nombre for nombre, _ in COLUMNAS_ACCIDENTES if nombre in df.columns]
+
+
+def huella_accidentes(df):
+    """
+    Huella de cada registro de accidentes_hermosillo (columna `huella`,
+    BIGINT con índice único). Se calcula sobre las columnas del esquema en
+    el orden del DDL, con el tipo del esquema, para que el mismo accidente
+    tenga la misma huella venga del dataset Parquet o del CSV. Se calcula
+    sobre los valores que se cargan (después de aplicar_plan_tipos), así que
+    un entero vacío y un 0 dan la misma huella, como en la tabla.
+    """
+    hashes = (np.full(len(df), HASH_NULO, dtype='uint64') if serie is None else _hash_columna(serie)
+              for serie in _valores_canonicos(df))
+    return _combinar(hashes, len(df)).view('int64')
+
+
+# =============================================================================
+# DUPLICADOS
+# =============================================================================
+
+def primeras_apariciones(huellas):
+    """Máscara de la primera aparición de cada huella (como keep='first')"""
+    _, primeras = np.unique(huellas, return_index=True)
+    mascara = np.zeros(len(huellas), dtype=bool)
+    mascara[primeras] = True
+    return mascara
+
+
+def _contenidas(ordenadas, valores):
+    """Máscara de los valores presentes en el arreglo ordenado"""
+    if not len(ordenadas):
+        return np.zeros(len(valores), dtype=bool)
+    posiciones = np.searchsorted(ordenadas, valores)
+    posiciones[posiciones == len(ordenadas)] = 0
+    return ordenadas[posiciones] == valores
+
+
+class HuellasVistas:
+    """
+    Conjunto de huellas ya vistas entre bloques y archivos. Las huellas
+    nuevas de cada bloque se guardan como un tramo ordenado; cuando los
+    tramos pendientes igualan al arreglo principal (o son demasiados) se
+    fusionan con él, así que cada huella se copia un número logarítmico de
+    veces.
+    """
+
+    def __init__(self):
+        self._principal = np.empty(0, dtype='uint64')
+        self._tramos = []
+        self._pendientes = 0
+
+    def __len__(self):
+        return len(self._principal) + self._pendientes
+
+    def nuevas(self, huellas):
+        """
+        Máscara de las filas cuya huella no se había visto (la primera de
+        cada grupo dentro del bloque) y las registra como vistas. Aplicada
+        bloque por bloque da las mismas filas que drop_duplicates().
+        """
+        huellas = np.asarray(huellas).view('uint64')
+        mascara = primeras_apariciones(huellas)
+        for ordenadas in [self._principal] + self._tramos:
+            candidatas = np.flatnonzero(mascara)
+            mascara[candidatas[_contenidas(ordenadas, huellas[candidatas])]] = False
+
+        nuevas = np.sort(huellas[mascara])
+        if len(nuevas):
+            self._tramos.append(nuevas)
+            self._pendientes += len(nuevas)
+        if self._pendientes >= len(self._principal) or len(self._tramos) > MAX_TRAMOS:
+            self._fusionar()
+        return mascara
+
+    def _fusionar(self):
+        if self._tramos:
+            # Concatenar tramos ya ordenados: el ordenamiento estable (timsort)
+            # solo tiene que mezclarlos
+            self._principal = np.sort(np.concatenate([self._principal] + self._tramos), kind='stable')
+            self._tramos = []
+            self._pendientes = 0
+
+
+def quitar_duplicados(df, vistas=None, columnas=None):
+    """
+    Equivalente a df.drop_duplicates() (o subset=columnas) usando huellas.
+    Con `vistas` también se descartan las filas vistas en bloques anteriores.
+    """
+    vistas = HuellasVistas() if vistas is None else vistas
+    return df[vistas.nuevas(huella_filas(df, columnas))]
@@ -0,0 +1,171 @@
+"""
+PROYECTO: Análisis de Accidentes de Tránsito en Hermosillo, Sonora
+Manifiesto de cargas por año
+
+connect_inegi.py deja en el dataset intermedio un archivo _fuentes.json con
+el checksum y el número de registros de cada CSV anual de INEGI. La tabla
+carga_manifiesto guarda lo que se cargó por última vez para cada año, de modo
+que una ejecución incremental solo recarga los años cuyo archivo cambió
+(por ejemplo, cuando INEGI pasa un año de cifras preliminares a definitivas)
+o cuya lista de objetivos geográficos es distinta a la de la última carga.
+Cada entrada guarda además los agregados de referencia del año calculados en
+la transformación (ver reconciliacion.py), con los que se valida la carga.
+"""
+
+import os
+import json
+import hashlib
+
+from sqlalchemy import text
+
+from carga_copy import cargar_copy, preparar_para_copy
+from backends import es_duckdb
+
+ARCHIVO_FUENTES = '_fuentes.json'
+
+
+def crear_tabla_manifiesto(engine):
+    """Crea la tabla carga_manifiesto si no existe"""
+    create_table_sql = """
+    CREATE TABLE IF NOT EXISTS carga_manifiesto (
+        anio INTEGER PRIMARY KEY,
+        archivo VARCHAR(200),
+        checksum VARCHAR(80) NOT NULL,
+        filas_fuente INTEGER,
+        filas_cargadas INTEGER,
+        cargado_en TIMESTAMP NOT NULL DEFAULT now(),
+        objetivos TEXT,
+        referencia JSONB
+    );
+    ALTER TABLE carga_manifiesto ADD COLUMN IF NOT EXISTS objetivos TEXT;
+    ALTER TABLE carga_manifiesto ADD COLUMN IF NOT EXISTS referencia JSONB;
+    """
+    with engine.begin() as conn:
+        conn.execute(text(create_table_sql))
+
+
+def leer_fuentes_tidy(dataset_dir):
+    """Lee _fuentes.json del dataset intermedio: {año: {archivo, checksum, filas}}"""
+    ruta = os.path.join(dataset_dir, ARCHIVO_FUENTES)
+    if not os.path.exists(ruta):
+        return {}
+    with open(ruta, encoding='utf-8') as f:
+        return {int(anio): fuente for anio, fuente in json.load(f).items()}
+
+
+def fuentes_de_referencia(df, referencias, archivo, objetivos=None):
+    """
+    Entradas del manifiesto para una carga sin _fuentes.json (p. ej. desde
+    el CSV): el checksum de cada año es la huella de sus agregados de
+    referencia, así que la versión de la tabla cambia con cada carga.
+    """
+    conteos = df['anio'].value_counts() if len(df) else {}
+    fuentes = {}
+    for anio, referencia in referencias.items():
+        contenido = json.dumps(referencia, sort_keys=True, default=str).encode('utf-8')
+        fuentes[int(anio)] = {'archivo': archivo,
+                              'checksum': f"ref:{hashlib.sha256(contenido).hexdigest()}",
+                              'filas': int(conteos.get(int(anio), 0)),
+                              'objetivos': objetivos}
+    return fuentes
+
+
+def leer_manifiesto(engine):
+    """(checksum, objetivos) registrados por año en la última carga"""
+    with engine.connect() as conn:
+        filas = conn.execute(text("SELECT anio, checksum, objetivos FROM carga_manifiesto"))
+        return {anio: (checksum, objetivos) for anio, checksum, objetivos in filas}
+
+
+def versiones_cargadas(engine):
+    """
+    Versión de cada año cargado (checksum, objetivos y fecha de la carga):
+    cambia con cada recarga del año, aunque el archivo sea el mismo. Es la
+    que guarda el cubo de accidentes para saber si está al día.
+    """
+    with engine.connect() as conn:
+        filas = conn.execute(text("SELECT anio, checksum, objetivos, cargado_en FROM carga_manifiesto"))
+        return {int(anio): f"{checksum}|{objetivos}|{cargado_en}"
+                for anio, checksum, objetivos, cargado_en in filas}
+
+
+def anios_modificados(engine, fuentes):
+    """Años cuyo checksum de origen u objetivos no coinciden con el manifiesto"""
+    manifiesto = leer_manifiesto(engine)
+    return sorted(anio for anio, fuente in fuentes.items()
+                  if manifiesto.get(anio) != (fuente['checksum'], fuente.get('objetivos')))
+
+
+def registrar_carga(cursor, anio, fuente, filas_cargadas, referencia=None):
+    """Inserta o actualiza la entrada del manifiesto de un año (cursor DBAPI)"""
+    cursor.execute(
+        """
+        INSERT INTO carga_manifiesto (anio, archivo, checksum, filas_fuente, filas_cargadas,
+                                      cargado_en, objetivos, referencia)
+        VALUES (%s, %s, %s, %s, %s, now(), %s, %s)
+        ON CONFLICT (anio) DO UPDATE SET
+            archivo = EXCLUDED.archivo,
+            checksum = EXCLUDED.checksum,
+            filas_fuente = EXCLUDED.filas_fuente,
+            filas_cargadas = EXCLUDED.filas_cargadas,
+            cargado_en = EXCLUDED.cargado_en,
+            objetivos = EXCLUDED.objetivos,
+            referencia = EXCLUDED.referencia
+        """,
+        (anio, fuente['archivo'], fuente['checksum'], fuente['filas'], filas_cargadas,
+         fuente.get('objetivos'), None if referencia is None else json.dumps(referencia))
+    )
+
+
+def registrar_anios_cargados(engine, df, fuentes, referencias=None):
+    """
+    Registra en el manifiesto todos los años presentes en df tras una carga
+    completa (`referencias`: {'2023': agregados} de reconciliacion.py)
+    """
+    conteos = df['anio'].value_counts() if len(df) else {}
+    referencias = referencias or {}
+    conn = engine.raw_connection()
+    try:
+        cursor = conn.cursor()
+        for anio, fuente in fuentes.items():
+            registrar_carga(cursor, anio, fuente, int(conteos.get(anio, 0)),
+                            referencias.get(str(anio)))
+        cursor.close()
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def recargar_anio(engine, anio, df_anio, fuente, tabla='accidentes_hermosillo', cargar=None,
+                  referencia=None):
+    """
+    Reemplaza un año completo en una sola transacción: DELETE del año, COPY
+    de los registros nuevos y actualización del manifiesto. Si algo falla,
+    el año queda exactamente como estaba.
+
+    `cargar(df, engine, conexion=...)` hace la inserción dentro de esa
+    transacción; por defecto es un COPY directo a `tabla`. `referencia` son
+    los agregados del año que se guardan en el manifiesto.
+    """
+    if cargar is None:
+        def cargar(df, engine, conexion):
+            return cargar_copy(df, engine, tabla, conexion=conexion)
+
+    conn = engine.raw_connection()
+    try:
+        cursor = conn.cursor()
+        if es_duckdb(engine):
+            borrados = cursor.reemplazar_dataframe(preparar_para_copy(df_anio), tabla, 'anio', anio)
+        else:
+            cursor.execute(f"DELETE FROM {tabla} WHERE anio = %s", (anio,))
+            borrados = cursor.rowcount
+            cargar(df_anio, engine, conexion=conn)
+        registrar_carga(cursor, anio, fuente, len(df_anio), referencia)
+        cursor.close()
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    print(f"   ✓ {anio}: {borrados:,} registros reemplazados por {len(df_anio):,}")
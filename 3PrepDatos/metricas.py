@@ -0,0 +1,273 @@
+"""
+PROYECTO: Análisis de Accidentes de Tránsito en Hermosillo, Sonora
+Métricas por etapa del pipeline (JSON)
+
+Cada etapa (descarga, tidy, extracción, filtro, conversión de tipos,
+creación de la base, carga, validación) se envuelve en `with etapa(...)` y
+al terminar se agrega una línea JSON con tiempo de pared, tiempo de CPU,
+filas de entrada/salida, filas por segundo y memoria máxima (RSS) al
+archivo de métricas. Los banners con print siguen igual.
+
+Variables de entorno:
+    ACCIDENTES_METRICAS   archivo JSONL de salida (por defecto
+                          data/metricas/etapas.jsonl); '0' desactiva el registro
+    ACCIDENTES_METRICAS_MAX_MB
+                          tamaño máximo del archivo (10 MB por defecto): al
+                          llenarse pasa a <archivo>.1 y se empieza uno nuevo,
+                          así que nunca ocupa más del doble
+    ACCIDENTES_PERFIL     'cprofile', 'tracemalloc' y/o 'rss' separados por
+                          coma: los dos primeros guardan un perfil por etapa en
+                          data/metricas/perfiles/; 'rss' reinicia el pico de
+                          RSS al entrar a cada etapa (escribe en
+                          /proc/self/clear_refs, que también limpia los bits de
+                          acceso de las páginas del proceso). Sin la variable no
+                          se perfila nada, el pico de RSS es el del proceso y el
+                          costo por etapa son unas cuantas lecturas de reloj.
+    ACCIDENTES_EJECUCION  identificador de la ejecución (por defecto uno
+                          aleatorio, generado con la primera etapa), para
+                          agrupar las etapas; el pool del tidy lo recibe con
+                          fijar_ejecucion
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import cProfile
+import functools
+import itertools
+import tracemalloc
+from datetime import datetime
+from contextlib import contextmanager
+
+DIR_METRICAS = os.path.join('data', 'metricas')
+ARCHIVO_METRICAS = os.environ.get('ACCIDENTES_METRICAS', os.path.join(DIR_METRICAS, 'etapas.jsonl'))
+PERFILES = {p.strip() for p in os.environ.get('ACCIDENTES_PERFIL', '').lower().split(',') if p.strip()}
+MAX_BYTES_METRICAS = float(os.environ.get('ACCIDENTES_METRICAS_MAX_MB', 10)) * 1e6
+
+# Etapas abiertas (las etapas se pueden anidar: 'transformacion' contiene 'filtro')
+_activas = []
+_perfiles_escritos = itertools.count(1)
+_ejecucion = None
+
+
+def ejecucion():
+    """Identificador de la ejecución (ACCIDENTES_EJECUCION o uno aleatorio al primer uso)"""
+    global _ejecucion
+    if _ejecucion is None:
+        _ejecucion = os.environ.get('ACCIDENTES_EJECUCION') or uuid.uuid4().hex[:12]
+    return _ejecucion
+
+
+def fijar_ejecucion(identificador):
+    """Usa el identificador de otro proceso (initializer de los pools de procesos)"""
+    global _ejecucion
+    _ejecucion = identificador
+
+
+# =============================================================================
+# MEMORIA
+# =============================================================================
+
+def _pico_rss_mb():
+    """Pico de RSS del proceso en MB (None si la plataforma no lo reporta)"""
+    try:
+        with open('/proc/self/status') as f:
+            for linea in f:
+                if linea.startswith('VmHWM:'):
+                    return int(linea.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux lo reporta en KB y macOS en bytes
+    return pico / 1e6 if sys.platform == 'darwin' else pico / 1024
+
+
+def _reiniciar_pico_rss():
+    """
+    Reinicia el pico de RSS para medir solo la etapa (Linux, solo con
+    ACCIDENTES_PERFIL=rss). Si no, el pico reportado es el máximo del
+    proceso hasta ese momento.
+    """
+    if 'rss' not in PERFILES:
+        return False
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+# =============================================================================
+# ETAPAS
+# =============================================================================
+
+class Etapa:
+    """Mediciones de una etapa; filas_entrada / filas_salida las llena quien la usa"""
+
+    def __init__(self, nombre, filas_entrada=None, **extra):
+        self.nombre = nombre
+        self.filas_entrada = filas_entrada
+        self.filas_salida = None
+        self.extra = extra
+        self.pico_rss = None
+        self.pico_tracemalloc = None
+
+    def filas(self, entrada=None, salida=None):
+        if entrada is not None:
+            self.filas_entrada = int(entrada)
+        if salida is not None:
+            self.filas_salida = int(salida)
+
+    def _registro(self, segundos, cpu, perfil):
+        filas = self.filas_salida if self.filas_salida is not None else self.filas_entrada
+        registro = {
+            'ejecucion': ejecucion(),
+            'etapa': self.nombre,
+            'padre': _activas[-1].nombre if _activas else None,
+            'inicio': self.inicio,
+            'segundos': round(segundos, 4),
+            'cpu_segundos': round(cpu, 4),
+            'filas_entrada': self.filas_entrada,
+            'filas_salida': self.filas_salida,
+            'filas_por_segundo': round(filas / segundos, 1) if filas is not None and segundos > 0 else None,
+            'pico_rss_mb': None if self.pico_rss is None else round(self.pico_rss, 1),
+            'pico_rss_de_etapa': self.rss_por_etapa,
+            'pico_tracemalloc_mb': (None if self.pico_tracemalloc is None
+                                    else round(self.pico_tracemalloc / 1e6, 1)),
+            'perfil': perfil,
+        }
+        registro.update(self.extra)
+        return registro
+
+
+def _escribir(registro):
+    if ARCHIVO_METRICAS == '0':
+        return
+    directorio = os.path.dirname(ARCHIVO_METRICAS)
+    if directorio:
+        os.makedirs(directorio, exist_ok=True)
+    try:
+        if os.path.getsize(ARCHIVO_METRICAS) >= MAX_BYTES_METRICAS:
+            os.replace(ARCHIVO_METRICAS, ARCHIVO_METRICAS + '.1')
+    except OSError:
+        pass
+    with open(ARCHIVO_METRICAS, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(registro, ensure_ascii=False, default=str) + '\n')
+
+
+def _ruta_perfil(nombre, extension):
+    directorio = os.path.join(os.path.dirname(ARCHIVO_METRICAS) or DIR_METRICAS, 'perfiles')
+    os.makedirs(directorio, exist_ok=True)
+    return os.path.join(directorio, f'{ejecucion()}_{os.getpid()}_{next(_perfiles_escritos):03d}_{nombre}.{extension}')
+
+
+@contextmanager
+def etapa(nombre, filas_entrada=None, **extra):
+    """
+    Mide el bloque como la etapa `nombre`:
+
+        with etapa('extraccion') as m:
+            df = leer(...)
+            m.filas(salida=len(df))
+
+    El registro se escribe aunque el bloque falle (con 'error').
+    """
+    medicion = Etapa(nombre, filas_entrada, **extra)
+    medicion.inicio = datetime.now().isoformat(timespec='milliseconds')
+
+    # El pico de la etapa que contiene a esta no debe perderse al reiniciarlo
+    if _activas:
+        padre = _activas[-1]
+        padre.pico_rss = max(filter(None, [padre.pico_rss, _pico_rss_mb()]), default=None)
+    medicion.rss_por_etapa = _reiniciar_pico_rss()
+
+    perfilador = None
+    if 'cprofile' in PERFILES and not any(getattr(e, 'perfilador', None) for e in _activas):
+        perfilador = cProfile.Profile()
+    medicion.perfilador = perfilador
+    if 'tracemalloc' in PERFILES:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        if _activas:
+            padre = _activas[-1]
+            padre.pico_tracemalloc = max(padre.pico_tracemalloc or 0, tracemalloc.get_traced_memory()[1])
+        tracemalloc.reset_peak()
+
+    _activas.append(medicion)
+    error = None
+    cpu = time.process_time()
+    inicio = time.perf_counter()
+    if perfilador is not None:
+        perfilador.enable()
+    try:
+        yield medicion
+    except BaseException as e:
+        error = f'{type(e).__name__}: {e}'
+        raise
+    finally:
+        if perfilador is not None:
+            perfilador.disable()
+        segundos = time.perf_counter() - inicio
+        cpu = time.process_time() - cpu
+        _activas.pop()
+
+        medicion.pico_rss = max(filter(None, [medicion.pico_rss, _pico_rss_mb()]), default=None)
+        perfil = {}
+        if perfilador is not None:
+            perfil['cprofile'] = _ruta_perfil(nombre, 'prof')
+            perfilador.dump_stats(perfil['cprofile'])
+        if 'tracemalloc' in PERFILES:
+            medicion.pico_tracemalloc = max(medicion.pico_tracemalloc or 0,
+                                            tracemalloc.get_traced_memory()[1])
+            perfil['tracemalloc'] = _ruta_perfil(nombre, 'txt')
+            with open(perfil['tracemalloc'], 'w', encoding='utf-8') as f:
+                for estadistica in tracemalloc.take_snapshot().statistics('lineno')[:25]:
+                    f.write(f'{estadistica}\n')
+
+        registro = medicion._registro(segundos, cpu, perfil or None)
+        if error is not None:
+            registro['error'] = error
+        _escribir(registro)
+
+        # La etapa que contiene a esta hereda su pico
+        if _activas:
+            padre = _activas[-1]
+            padre.pico_rss = max(filter(None, [padre.pico_rss, medicion.pico_rss]), default=None)
+            if medicion.pico_tracemalloc is not None:
+                padre.pico_tracemalloc = max(padre.pico_tracemalloc or 0, medicion.pico_tracemalloc)
+
+
+def medida(nombre):
+    """Decorador: cada llamada a la función es una etapa `nombre`"""
+    def decorador(funcion):
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            with etapa(nombre):
+                return funcion(*args, **kwargs)
+        return envoltura
+    return decorador
+
+
+def etapa_actual():
+    """Etapa abierta más interna (para registrar filas desde la función medida)"""
+    return _activas[-1] if _activas else Etapa(None)
+
+
+def leer_metricas(archivo=None, ejecucion=None):
+    """Registros del archivo de métricas y su respaldo .1 (de una ejecución o de todas)"""
+    archivo = archivo or ARCHIVO_METRICAS
+    registros = []
+    for ruta in [archivo + '.1', archivo]:
+        if os.path.exists(ruta):
+            with open(ruta, encoding='utf-8') as f:
+                registros += [json.loads(linea) for linea in f if linea.strip()]
+    if ejecucion is not None:
+        registros = [r for r in registros if r['ejecucion'] == ejecucion]
+    return registros
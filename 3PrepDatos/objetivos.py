@@ -0,0 +1,117 @@
+"""
+PROYECTO: Análisis de Accidentes de Tránsito en Hermosillo, Sonora
+Objetivos geográficos del ETL (entidades y municipios)
+
+Un objetivo es una pareja (id_entidad, id_municipio); id_municipio = None
+significa la entidad completa. La lista de objetivos (o 'todos') reemplaza al
+filtro fijo de Sonora: el dataset intermedio se lee una sola vez para la unión
+de entidades de todos los objetivos y cada registro se asigna a sus objetivos
+con una sola pasada vectorizada.
+"""
+
+import numpy as np
+import pandas as pd
+
+TODOS = 'todos'
+
+# Códigos INEGI de las entidades federativas (para los reportes)
+NOMBRES_ENTIDADES = {
+    1: 'Aguascalientes', 2: 'Baja California', 3: 'Baja California Sur',
+    4: 'Campeche', 5: 'Coahuila', 6: 'Colima', 7: 'Chiapas', 8: 'Chihuahua',
+    9: 'Ciudad de México', 10: 'Durango', 11: 'Guanajuato', 12: 'Guerrero',
+    13: 'Hidalgo', 14: 'Jalisco', 15: 'México', 16: 'Michoacán', 17: 'Morelos',
+    18: 'Nayarit', 19: 'Nuevo León', 20: 'Oaxaca', 21: 'Puebla', 22: 'Querétaro',
+    23: 'Quintana Roo', 24: 'San Luis Potosí', 25: 'Sinaloa', 26: 'Sonora',
+    27: 'Tabasco', 28: 'Tamaulipas', 29: 'Tlaxcala', 30: 'Veracruz',
+    31: 'Yucatán', 32: 'Zacatecas',
+}
+
+# Llave combinada entidad * FACTOR + municipio (los municipios INEGI son < 1000)
+FACTOR_MUNICIPIO = 1000
+
+
+def normalizar_objetivos(objetivos):
+    """
+    Lista ordenada de (entidad, municipio|None), o None para 'todos'.
+    Acepta enteros sueltos como entidades completas.
+    """
+    if objetivos is None or objetivos == TODOS:
+        return None
+    normalizados = set()
+    for objetivo in objetivos:
+        if isinstance(objetivo, (tuple, list)):
+            entidad, municipio = objetivo
+        else:
+            entidad, municipio = objetivo, None
+        normalizados.add((int(entidad), None if municipio is None else int(municipio)))
+    return sorted(normalizados, key=lambda o: (o[0], -1 if o[1] is None else o[1]))
+
+
+def entidades_objetivo(objetivos):
+    """Entidades que hay que leer del dataset intermedio (None = todas)"""
+    objetivos = normalizar_objetivos(objetivos)
+    if objetivos is None:
+        return None
+    return sorted({entidad for entidad, _ in objetivos})
+
+
+def firma_objetivos(objetivos):
+    """Texto estable que identifica la lista de objetivos (se guarda en el manifiesto)"""
+    objetivos = normalizar_objetivos(objetivos)
+    if objetivos is None:
+        return TODOS
+    return ','.join(f'{e}' if m is None else f'{e}:{m}' for e, m in objetivos)
+
+
+def nombre_objetivo(objetivo):
+    entidad, municipio = objetivo
+    nombre = NOMBRES_ENTIDADES.get(entidad, f'entidad {entidad}')
+    return nombre if municipio is None else f'{nombre}, municipio {municipio}'
+
+
+def _codigos(serie):
+    """Códigos enteros de una columna (-1 donde falta el dato)"""
+    valores = pd.to_numeric(serie, errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+    return np.where(np.isnan(valores), -1, valores).astype('int64')
+
+
+def mascara_objetivos(df, objetivos, col_entidad='ID_ENTIDAD', col_municipio='ID_MUNICIPIO'):
+    """Registros que pertenecen a al menos uno de los objetivos"""
+    objetivos = normalizar_objetivos(objetivos)
+    if objetivos is None:
+        return np.ones(len(df), dtype=bool)
+    entidad = _codigos(df[col_entidad])
+    municipio = _codigos(df[col_municipio])
+    llave = np.where(municipio >= 0, entidad * FACTOR_MUNICIPIO + municipio, -1)
+    completas = [e for e, m in objetivos if m is None]
+    municipios = [e * FACTOR_MUNICIPIO + m for e, m in objetivos if m is not None]
+    return np.isin(entidad, completas) | np.isin(llave, municipios)
+
+
+def conteos_por_objetivo(df, objetivos, col_anio='ANIO', col_entidad='ID_ENTIDAD',
+                         col_municipio='ID_MUNICIPIO'):
+    """
+    Registros por objetivo y año: {objetivo: Series(año -> registros)}.
+
+    Se agrupa una sola vez por (entidad, municipio, año) y cada objetivo
+    suma sus grupos, así que el costo no crece con el número de objetivos.
+    Con 'todos' se reporta cada entidad presente.
+    """
+    grupos = pd.DataFrame({
+        'entidad': _codigos(df[col_entidad]),
+        'municipio': _codigos(df[col_municipio]),
+        'anio': _codigos(df[col_anio]),
+    }).value_counts()
+
+    objetivos = normalizar_objetivos(objetivos)
+    if objetivos is None:
+        entidades = grupos.index.get_level_values('entidad')
+        objetivos = [(int(e), None) for e in sorted(set(entidades)) if e >= 0]
+
+    conteos = {}
+    for entidad, municipio in objetivos:
+        seleccion = grupos.index.get_level_values('entidad') == entidad
+        if municipio is not None:
+            seleccion &= grupos.index.get_level_values('municipio') == municipio
+        conteos[(entidad, municipio)] = grupos[seleccion].groupby(level='anio').sum()
+    return conteos
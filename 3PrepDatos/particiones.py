@@ -0,0 +1,163 @@
+"""
+PROYECTO: Análisis de Accidentes de Tránsito en Hermosillo, Sonora
+accidentes_hermosillo particionada por año (opcional)
+
+Con ESQUEMA_BD = 'particionado' la tabla se declara PARTITION BY RANGE (anio)
+y cada año vive en su propia partición accidentes_hermosillo_<año>. Un año
+nunca se carga sobre una tabla con índices: se copia a una tabla nueva, se
+construyen ahí los índices (ya con los datos), y en una sola transacción se
+retira la partición anterior y se adjunta la nueva. Las consultas filtradas
+por año solo leen la partición de ese año.
+"""
+
+import time
+
+from sqlalchemy import text
+
+from esquema_accidentes import ddl_columnas
+from carga_copy import cargar_copy
+from manifiesto import registrar_carga
+
+TABLA_PARTICIONADA = 'accidentes_hermosillo'
+
+# Índices de la tabla (se declaran en la tabla padre y cada partición trae
+# los suyos ya construidos). Dentro de una partición el año es constante, así
+# que no hace falta índice por anio. Los registros se cargan ordenados por
+# fecha, por lo que un BRIN sobre (mes, id_dia) ocupa unos cuantos KB y
+# descarta casi todos los bloques en los filtros por mes.
+INDICES = [
+    ('mes_brin', 'USING brin (mes, id_dia)'),
+    ('tipaccid', '(tipaccid)'),
+    ('causaacci', '(causaacci)'),
+    ('huella', '(huella, anio)'),
+]
+
+# Índices únicos de INDICES. En una tabla particionada un índice único debe
+# incluir la columna de partición; la huella ya depende del año.
+UNICOS = {'huella'}
+
+
+def _crear_indice(sufijo):
+    return 'CREATE UNIQUE INDEX' if sufijo in UNICOS else 'CREATE INDEX'
+
+
+ORDEN_CARGA = ['mes', 'id_dia', 'id_hora', 'id_minuto']
+
+
+def nombre_particion(anio, tabla=TABLA_PARTICIONADA):
+    return f'{tabla}_{int(anio)}'
+
+
+def crear_tabla_particionada(engine, tabla=TABLA_PARTICIONADA):
+    """Crea accidentes_hermosillo particionada por anio, sin particiones todavía"""
+    print("="*80)
+    print(f"CREACIÓN DE TABLA PARTICIONADA: {tabla}")
+    print("="*80)
+
+    with engine.connect() as conn:
+        tipo = conn.execute(text(
+            "SELECT relkind FROM pg_class WHERE oid = to_regclass(:tabla)"
+        ), {'tabla': tabla}).scalar()
+    if tipo is not None and tipo != 'p':
+        raise RuntimeError(
+            f"{tabla} ya existe y no está particionada; "
+            "elimínala antes de usar ESQUEMA_BD = 'particionado'"
+        )
+
+    sentencias = [f"""
+        CREATE TABLE IF NOT EXISTS {tabla} (
+            {ddl_columnas(particionada=True)}
+        ) PARTITION BY RANGE (anio)""",
+        # Tablas creadas antes de la columna huella (se propaga a las particiones)
+        f"ALTER TABLE {tabla} ADD COLUMN IF NOT EXISTS huella BIGINT"]
+    # En la tabla padre (sin filas) los índices no cuestan nada; al adjuntar
+    # una partición PostgreSQL reutiliza los índices equivalentes que ya trae
+    for sufijo, definicion in INDICES:
+        sentencias.append(f"{_crear_indice(sufijo)} IF NOT EXISTS idx_{tabla}_{sufijo} "
+                          f"ON {tabla} {definicion}")
+
+    with engine.begin() as conn:
+        for sql in sentencias:
+            conn.execute(text(sql))
+
+    print(f"\n✓ Tabla '{tabla}' creada (PARTITION BY RANGE (anio))")
+    print("✓ Las particiones se crean al cargar cada año, con sus índices ya construidos")
+    print("\n" + "="*80 + "\n")
+
+
+def reemplazar_particion(engine, anio, df_anio, fuente=None, tabla=TABLA_PARTICIONADA,
+                         referencia=None):
+    """
+    Carga un año completo en una partición nueva y la intercambia por la
+    anterior en una sola transacción:
+
+    1. CREATE TABLE ..._nueva (LIKE padre) con un CHECK del año, para que el
+       ATTACH no tenga que recorrer la tabla para validarla.
+    2. COPY de los registros, ordenados por fecha (lo aprovecha el BRIN).
+    3. Llave primaria e índices construidos sobre los datos ya cargados.
+    4. DETACH + DROP de la partición anterior, RENAME y ATTACH de la nueva.
+
+    Con `fuente` también se actualiza el manifiesto del año (con los agregados
+    de `referencia`) en la misma transacción. Si algo falla, el año queda exactamente como estaba.
+    """
+    anio = int(anio)
+    particion = nombre_particion(anio, tabla)
+    nueva = f'{particion}_nueva'
+    rango = f'FROM ({anio}) TO ({anio + 1})'
+    columnas_orden = [col for col in ORDEN_CARGA if col in df_anio.columns]
+    df_anio = df_anio.sort_values(columnas_orden, kind='stable')
+
+    inicio = time.perf_counter()
+    conn = engine.raw_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(f"DROP TABLE IF EXISTS {nueva}")
+        cursor.execute(f"CREATE TABLE {nueva} (LIKE {tabla} INCLUDING DEFAULTS)")
+        cursor.execute(f"ALTER TABLE {nueva} ADD CONSTRAINT {nueva}_anio "
+                       f"CHECK (anio IS NOT NULL AND anio >= {anio} AND anio < {anio + 1})")
+        cargar_copy(df_anio, engine, nueva, conexion=conn)
+
+        t_indices = time.perf_counter()
+        cursor.execute(f"ALTER TABLE {nueva} ADD CONSTRAINT {nueva}_pkey PRIMARY KEY (id, anio)")
+        for sufijo, definicion in INDICES:
+            cursor.execute(f"{_crear_indice(sufijo)} {nueva}_{sufijo} ON {nueva} {definicion}")
+        t_indices = time.perf_counter() - t_indices
+
+        cursor.execute("SELECT to_regclass(%s) IS NOT NULL", (particion,))
+        existia = cursor.fetchone()[0]
+        borrados = 0
+        if existia:
+            cursor.execute(f"SELECT COUNT(*) FROM {particion}")
+            borrados = cursor.fetchone()[0]
+            cursor.execute(f"ALTER TABLE {tabla} DETACH PARTITION {particion}")
+            cursor.execute(f"DROP TABLE {particion}")
+
+        cursor.execute(f"ALTER TABLE {nueva} RENAME TO {particion}")
+        cursor.execute(f"ALTER TABLE {particion} RENAME CONSTRAINT {nueva}_pkey TO {particion}_pkey")
+        for sufijo, _ in INDICES:
+            cursor.execute(f"ALTER INDEX {nueva}_{sufijo} RENAME TO {particion}_{sufijo}")
+        cursor.execute(f"ALTER TABLE {tabla} ATTACH PARTITION {particion} "
+                       f"FOR VALUES {rango}")
+        # El CHECK solo servía para que el ATTACH no revisara fila por fila
+        cursor.execute(f"ALTER TABLE {particion} DROP CONSTRAINT {nueva}_anio")
+        cursor.execute(f"ANALYZE {particion}")
+
+        if fuente is not None:
+            registrar_carga(cursor, anio, fuente, len(df_anio), referencia)
+        cursor.close()
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    accion = f"{borrados:,} registros reemplazados por" if existia else "partición nueva con"
+    print(f"   ✓ {anio}: {accion} {len(df_anio):,} "
+          f"(índices en {t_indices:.2f} s, total {time.perf_counter() - inicio:.2f} s)")
+
+
+def cargar_particionado(df, engine, tabla=TABLA_PARTICIONADA):
+    """Carga df completo, un año (una partición) a la vez"""
+    for anio in sorted(df['anio'].unique()):
+        reemplazar_particion(engine, anio, df[df['anio'] == anio], tabla=tabla)
@@ -0,0 +1,265 @@
+"""
+PROYECTO: Análisis de Accidentes de Tránsito en Hermosillo, Sonora
+Conciliación de la carga contra la transformación
+
+Durante la transformación se calculan, por año, agregados de referencia del
+DataFrame que se va a cargar: número de registros, suma de cada contador de
+víctimas, nulos y valores fuera de rango de las columnas codificadas y los
+códigos distintos de cada una. La carga guarda la referencia de cada año en
+carga_manifiesto (en la misma transacción que los datos) y la validación
+calcula lo mismo en PostgreSQL y compara.
+
+Las consultas de la validación se reparten en un pool de conexiones: por
+cada año una consulta con todos los agregados y otra con los códigos
+distintos, más las consultas de resumen, todas al mismo tiempo.
+"""
+
+import os
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine, text
+
+from esquema_accidentes import COLUMNAS_VICTIMAS, COLUMNAS_VEHICULOS
+from backends import es_duckdb, leer_sql
+
+TABLA = 'accidentes_hermosillo'
+
+# Conexiones simultáneas de la validación
+HILOS_VALIDACION = min(8, os.cpu_count() or 1)
+
+# Columnas codificadas (catálogos de INEGI): se revisan nulos y códigos distintos
+COLUMNAS_CODIGOS = ['cobertura', 'id_entidad', 'id_municipio', 'mes', 'id_hora', 'id_minuto',
+                    'id_dia', 'diasemana', 'urbana', 'suburbana', 'tipaccid', 'causaacci',
+                    'caparod', 'sexo', 'aliento', 'cinturon', 'id_edad', 'clasacc', 'estatus']
+
+# Rango válido de cada columna numérica (None = sin límite). INEGI usa 99
+# para "no especificado" en hora, minuto, día y edad.
+RANGOS = {
+    'id_entidad': (1, 32),
+    'id_municipio': (1, 999),
+    'mes': (1, 12),
+    'id_hora': (0, 23),
+    'id_minuto': (0, 59),
+    'id_dia': (1, 31),
+    'id_edad': (0, 99),
+}
+RANGOS.update({col: (0, None) for col in COLUMNAS_VEHICULOS + COLUMNAS_VICTIMAS})
+NO_ESPECIFICADO = 99
+
+
+# =============================================================================
+# REFERENCIA (en la transformación)
+# =============================================================================
+
+def _fuera_de_rango(serie, minimo, maximo):
+    fuera = pd.Series(False, index=serie.index)
+    if minimo is not None:
+        fuera |= serie < minimo
+    if maximo is not None:
+        fuera |= serie > maximo
+    return fuera & (serie != NO_ESPECIFICADO)
+
+
+def _distintos_por_anio(indices, anios, serie):
+    """Valores distintos no nulos de la serie en cada año (ordenados)"""
+    codigos, valores = pd.factorize(serie, sort=True)
+    valores = np.asarray(valores)
+    presentes = np.zeros((len(anios), len(valores)), dtype=bool)
+    validos = codigos >= 0
+    presentes[indices[validos], codigos[validos]] = True
+    return {anio: valores[presentes[i]].tolist() for i, anio in enumerate(anios)}
+
+
+def agregados_referencia(df):
+    """
+    Agregados de referencia por año del DataFrame transformado:
+    {'2023': {'filas', 'sumas', 'nulos', 'fuera_de_rango', 'codigos'}}.
+    Todo se calcula con groupby vectorizados sobre el DataFrame en memoria.
+    """
+    anio = df['anio']
+    victimas = [c for c in COLUMNAS_VICTIMAS if c in df.columns]
+    codigos = [c for c in COLUMNAS_CODIGOS if c in df.columns]
+    rangos = {c: r for c, r in RANGOS.items() if c in df.columns}
+
+    filas = anio.value_counts()
+    sumas = df[victimas].groupby(anio).sum()
+    nulos = df[codigos].isna().groupby(anio).sum()
+    fuera = pd.DataFrame({col: _fuera_de_rango(df[col], *r) for col, r in rangos.items()},
+                         index=df.index).groupby(anio).sum()
+    indices, anios = pd.factorize(anio, sort=True)
+    distintos = {col: _distintos_por_anio(indices, anios, df[col]) for col in codigos}
+
+    referencia = {}
+    for a in sorted(filas.index):
+        referencia[str(int(a))] = {
+            'filas': int(filas[a]),
+            'sumas': {col: int(sumas.at[a, col]) for col in victimas},
+            'nulos': {col: int(nulos.at[a, col]) for col in codigos},
+            'fuera_de_rango': {col: int(fuera.at[a, col]) for col in rangos},
+            'codigos': {col: distintos[col][a] for col in codigos},
+        }
+    return referencia
+
+
+def referencia_de(df):
+    """La referencia que dejó transformar_datos en df.attrs, o calculada en el momento"""
+    return df.attrs.get('referencia') or agregados_referencia(df)
+
+
+# =============================================================================
+# CONSULTAS EN POSTGRESQL
+# =============================================================================
+
+def _condicion_rango(col, minimo, maximo):
+    partes = []
+    if minimo is not None:
+        partes.append(f'{col} < {minimo}')
+    if maximo is not None:
+        partes.append(f'{col} > {maximo}')
+    return f"({' OR '.join(partes)}) AND {col} <> {NO_ESPECIFICADO}"
+
+
+def _sql_agregados(columnas, tabla):
+    """Una sola lectura del año: filas, sumas, nulos y fuera de rango"""
+    expresiones = ['COUNT(*) AS filas']
+    expresiones += [f'COALESCE(SUM({c}), 0) AS "sumas:{c}"' for c in COLUMNAS_VICTIMAS if c in columnas]
+    expresiones += [f'COUNT(*) FILTER (WHERE {c} IS NULL) AS "nulos:{c}"'
+                    for c in COLUMNAS_CODIGOS if c in columnas]
+    expresiones += [f'COUNT(*) FILTER (WHERE {_condicion_rango(c, *r)}) AS "fuera_de_rango:{c}"'
+                    for c, r in RANGOS.items() if c in columnas]
+    return f"SELECT {', '.join(expresiones)} FROM {tabla} WHERE anio = :anio"
+
+
+def _sql_codigos(columnas, tabla):
+    """
+    Códigos distintos de todas las columnas en una sola lectura del año: con
+    GROUPING SETS PostgreSQL agrupa cada columna en su propia tabla hash (un
+    array_agg(DISTINCT) por columna ordenaría el año una vez por columna).
+    En cada fila solo la columna agrupada tiene valor.
+    """
+    codigos = [c for c in COLUMNAS_CODIGOS if c in columnas]
+    return (f"SELECT {', '.join(codigos)} FROM {tabla} WHERE anio = :anio "
+            f"GROUP BY GROUPING SETS ({', '.join(f'({c})' for c in codigos)})")
+
+
+def _consultar(engine, sql, parametros=None):
+    with engine.connect() as conn:
+        return leer_sql(conn, sql, parametros)
+
+
+def _valores(serie):
+    """Valores no nulos de una columna de _sql_codigos (los NULL de las otras
+    agrupaciones convierten los enteros a float)"""
+    serie = serie.dropna()
+    if pd.api.types.is_float_dtype(serie):
+        serie = serie.astype('int64')
+    return serie.tolist()
+
+
+def leer_referencias(engine):
+    """Referencias guardadas en el manifiesto: {año: referencia}"""
+    with engine.connect() as conn:
+        filas = conn.execute(text(
+            "SELECT anio, referencia FROM carga_manifiesto WHERE referencia IS NOT NULL"
+        ))
+        # psycopg2 ya decodifica el JSONB; DuckDB regresa el texto
+        return {int(anio): json.loads(referencia) if isinstance(referencia, str) else referencia
+                for anio, referencia in filas}
+
+
+# =============================================================================
+# CONCILIACIÓN
+# =============================================================================
+
+def _comparar(anio, referencia, agregados, codigos):
+    """Filas del reporte para un año (estado: ok, aviso o falla)"""
+    filas = []
+
+    def agregar(chequeo, columna, esperado, obtenido, estado=None):
+        if estado is None:
+            estado = 'ok' if esperado == obtenido else 'falla'
+        filas.append({'anio': anio, 'chequeo': chequeo, 'columna': columna,
+                      'esperado': esperado, 'obtenido': obtenido, 'estado': estado})
+
+    agregar('filas', None, referencia['filas'], int(agregados['filas']))
+    for chequeo in ['sumas', 'nulos']:
+        for col, esperado in referencia[chequeo].items():
+            agregar(chequeo, col, esperado, int(agregados[f'{chequeo}:{col}']))
+    for col, esperado in referencia['fuera_de_rango'].items():
+        obtenido = int(agregados[f'fuera_de_rango:{col}'])
+        # Valores fuera de rango que ya venían en la fuente: se reportan sin fallar
+        estado = 'falla' if obtenido != esperado else ('aviso' if obtenido else 'ok')
+        agregar('fuera_de_rango', col, esperado, obtenido, estado)
+    for col, esperados in referencia['codigos'].items():
+        obtenidos = codigos[col]
+        faltan = sorted(set(map(str, esperados)) - set(map(str, obtenidos)))
+        sobran = sorted(set(map(str, obtenidos)) - set(map(str, esperados)))
+        agregar('codigos', col, len(esperados), len(obtenidos),
+                'ok' if not faltan and not sobran else 'falla')
+        if faltan or sobran:
+            filas[-1]['detalle'] = f'faltan {faltan[:5]}, sobran {sobran[:5]}'
+    return filas
+
+
+def reconciliar(engine, consultas=None, tabla=TABLA, hilos=HILOS_VALIDACION):
+    """
+    Compara la tabla contra las referencias del manifiesto, con todas las
+    consultas (las de cada año y las de `consultas`, {nombre: sql}) repartidas
+    en un pool de `hilos` conexiones. Regresa (reporte, resultados de
+    `consultas`, segundos).
+    """
+    inicio = time.perf_counter()
+    referencias = leer_referencias(engine)
+    with engine.connect() as conn:
+        columnas = set(conn.execute(text(f"SELECT * FROM {tabla} LIMIT 0")).keys())
+
+    # Con DuckDB cada connect() ya es una conexión independiente a la misma base
+    pool = engine if es_duckdb(engine) else create_engine(engine.url, pool_size=hilos, max_overflow=0)
+    try:
+        with ThreadPoolExecutor(max_workers=hilos) as ejecutor:
+            anios_tabla = ejecutor.submit(_consultar, pool, f"SELECT DISTINCT anio FROM {tabla}")
+            tareas = {anio: (ejecutor.submit(_consultar, pool, _sql_agregados(columnas, tabla), {'anio': anio}),
+                             ejecutor.submit(_consultar, pool, _sql_codigos(columnas, tabla), {'anio': anio}))
+                      for anio in sorted(referencias)}
+            otras = {nombre: ejecutor.submit(_consultar, pool, sql)
+                     for nombre, sql in (consultas or {}).items()}
+
+            filas = []
+            for anio, (agregados, codigos) in tareas.items():
+                codigos = codigos.result()
+                filas += _comparar(anio, referencias[anio], agregados.result().iloc[0],
+                                   {col: _valores(codigos[col]) for col in codigos.columns})
+            for anio in sorted(set(anios_tabla.result()['anio'].dropna().astype(int)) - set(referencias)):
+                filas.append({'anio': anio, 'chequeo': 'referencia', 'columna': None,
+                              'esperado': None, 'obtenido': None, 'estado': 'aviso',
+                              'detalle': 'año cargado sin referencia en el manifiesto'})
+            resultados = {nombre: tarea.result() for nombre, tarea in otras.items()}
+    finally:
+        if pool is not engine:
+            pool.dispose()
+
+    return pd.DataFrame(filas), resultados, time.perf_counter() - inicio
+
+
+def imprimir_reporte(reporte, segundos):
+    """Resumen del reporte: chequeos por estado y detalle de fallas y avisos"""
+    conteo = reporte['estado'].value_counts() if len(reporte) else pd.Series(dtype='int64')
+    anios = reporte['anio'].nunique() if len(reporte) else 0
+    print(f"\n🔎 CONCILIACIÓN CONTRA LA TRANSFORMACIÓN ({anios} años, {len(reporte):,} chequeos, "
+          f"{segundos:.2f} s)")
+    print(f"   ✓ {conteo.get('ok', 0):,} ok   ⚠️ {conteo.get('aviso', 0):,} avisos   "
+          f"❌ {conteo.get('falla', 0):,} fallas")
+    for _, fila in reporte[reporte['estado'] != 'ok'].iterrows():
+        icono = '❌' if fila['estado'] == 'falla' else '⚠️ '
+        columna = f" {fila['columna']}" if fila['columna'] else ''
+        detalle = fila.get('detalle')
+        if pd.isna(fila['esperado']):
+            print(f"   {icono} {fila['anio']} {fila['chequeo']}{columna}: {detalle}")
+            continue
+        detalle = f" ({detalle})" if isinstance(detalle, str) else ''
+        print(f"   {icono} {fila['anio']} {fila['chequeo']}{columna}: esperado {fila['esperado']}, "
+              f"obtenido {fila['obtenido']}{detalle}")
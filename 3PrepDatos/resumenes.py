@@ -0,0 +1,222 @@
+"""
+PROYECTO: Análisis de Accidentes de Tránsito en Hermosillo, Sonora
+Tablas de resumen precalculadas
+
+La validación de la carga y la libreta recalculaban en cada ejecución los
+mismos agregados sobre toda la tabla. Estas tablas guardan esos agregados
+por año; después de cada carga solo se recalculan los años que se tocaron
+(DELETE de esos años + INSERT ... SELECT ... GROUP BY), algo que una vista
+materializada no permite porque REFRESH siempre recalcula todo.
+
+Con varios objetivos en la misma tabla, cada fila del resumen lleva su
+id_entidad e id_municipio (el municipio solo para los objetivos municipales;
+NULL en el resto de la entidad), así que nunca se suman estados distintos:
+una entidad completa es la suma de sus filas y un objetivo municipal, las de
+su municipio.
+"""
+
+import time
+
+import pandas as pd
+from sqlalchemy import text
+
+from esquema_accidentes import COLUMNAS_VEHICULOS, COLUMNAS_MUERTOS, COLUMNAS_HERIDOS
+from objetivos import normalizar_objetivos, FACTOR_MUNICIPIO
+from backends import leer_sql
+
+TABLA_BASE = 'accidentes_hermosillo'
+
+_MUERTOS = ' + '.join(COLUMNAS_MUERTOS)
+_HERIDOS = ' + '.join(COLUMNAS_HERIDOS)
+_VEHICULOS = ', '.join(f"('{col}', a.{col})" for col in COLUMNAS_VEHICULOS)
+
+# Registros de los años :anios con el municipio solo si es un objetivo
+# municipal (:municipios = entidad * FACTOR_MUNICIPIO + municipio)
+_REGISTROS = f"""(
+            SELECT *, {_MUERTOS} AS muertos, {_HERIDOS} AS heridos,
+                   CASE WHEN id_entidad * {FACTOR_MUNICIPIO} + id_municipio = ANY(:municipios)
+                        THEN id_municipio END AS municipio_objetivo
+            FROM {TABLA_BASE}
+            WHERE anio = ANY(:anios)
+        ) a"""
+
+# Llave de objetivo que comparten todos los resúmenes
+_COLUMNAS_OBJETIVO = "anio INTEGER, id_entidad INTEGER, id_municipio INTEGER"
+
+# nombre -> (columnas de la tabla, SELECT que la llena para los años :anios)
+RESUMENES = {
+    'resumen_temporal': (
+        f"""{_COLUMNAS_OBJETIVO}, mes INTEGER, diasemana VARCHAR(20), id_hora INTEGER,
+           accidentes BIGINT, muertos BIGINT, heridos BIGINT, accidentes_fatales BIGINT""",
+        f"""
+        SELECT a.anio, a.id_entidad, a.municipio_objetivo, a.mes, a.diasemana, a.id_hora, COUNT(*),
+               SUM(a.muertos), SUM(a.heridos),
+               COUNT(*) FILTER (WHERE a.muertos > 0)
+        FROM {_REGISTROS}
+        GROUP BY a.anio, a.id_entidad, a.municipio_objetivo, a.mes, a.diasemana, a.id_hora
+        """,
+    ),
+    'resumen_tipaccid': (
+        f"{_COLUMNAS_OBJETIVO}, tipaccid VARCHAR(100), accidentes BIGINT",
+        f"""
+        SELECT a.anio, a.id_entidad, a.municipio_objetivo, a.tipaccid, COUNT(*)
+        FROM {_REGISTROS}
+        GROUP BY a.anio, a.id_entidad, a.municipio_objetivo, a.tipaccid
+        """,
+    ),
+    'resumen_causaacci': (
+        f"{_COLUMNAS_OBJETIVO}, causaacci VARCHAR(200), accidentes BIGINT, muertos BIGINT, heridos BIGINT",
+        f"""
+        SELECT a.anio, a.id_entidad, a.municipio_objetivo, a.causaacci, COUNT(*),
+               SUM(a.muertos), SUM(a.heridos)
+        FROM {_REGISTROS}
+        GROUP BY a.anio, a.id_entidad, a.municipio_objetivo, a.causaacci
+        """,
+    ),
+    # Un accidente cuenta para cada tipo de vehículo involucrado (columna > 0)
+    'resumen_vehiculo': (
+        f"""{_COLUMNAS_OBJETIVO}, vehiculo VARCHAR(20), accidentes BIGINT, muertos BIGINT,
+           heridos BIGINT, accidentes_fatales BIGINT""",
+        f"""
+        SELECT a.anio, a.id_entidad, a.municipio_objetivo, v.vehiculo, COUNT(*),
+               SUM(a.muertos), SUM(a.heridos),
+               COUNT(*) FILTER (WHERE a.muertos > 0)
+        FROM {_REGISTROS}
+        CROSS JOIN LATERAL (VALUES {_VEHICULOS}) AS v(vehiculo, cantidad)
+        WHERE v.cantidad > 0
+        GROUP BY a.anio, a.id_entidad, a.municipio_objetivo, v.vehiculo
+        """,
+    ),
+}
+
+
+def _top(columna, origen, conteo, n=5):
+    """Los n valores de `columna` con más accidentes en cada entidad"""
+    return f"""SELECT id_entidad, {columna}, cantidad FROM (
+               SELECT id_entidad, {columna}, {conteo} as cantidad,
+                      ROW_NUMBER() OVER (PARTITION BY id_entidad
+                                         ORDER BY {conteo} DESC, {columna}) as orden
+               FROM {origen} GROUP BY id_entidad, {columna}
+           ) t WHERE orden <= {n} ORDER BY id_entidad, orden"""
+
+# Consultas de validación: versión sobre los resúmenes y versión equivalente
+# sobre la tabla completa (para verificar y medir), por entidad
+CONSULTAS_VALIDACION = {
+    "Registros por entidad": (
+        """SELECT id_entidad, SUM(accidentes)::bigint as total
+           FROM resumen_temporal GROUP BY id_entidad ORDER BY id_entidad""",
+        f"""SELECT id_entidad, COUNT(*) as total
+            FROM {TABLA_BASE} GROUP BY id_entidad ORDER BY id_entidad""",
+    ),
+    "Distribución por año": (
+        """SELECT id_entidad, anio, SUM(accidentes)::bigint as cantidad
+           FROM resumen_temporal GROUP BY id_entidad, anio ORDER BY id_entidad, anio""",
+        f"""SELECT id_entidad, anio, COUNT(*) as cantidad
+            FROM {TABLA_BASE} GROUP BY id_entidad, anio ORDER BY id_entidad, anio""",
+    ),
+    "Top 5 tipos de accidente": (
+        _top('tipaccid', 'resumen_tipaccid', 'SUM(accidentes)::bigint'),
+        _top('tipaccid', TABLA_BASE, 'COUNT(*)'),
+    ),
+    "Top 5 causas de accidente": (
+        _top('causaacci', 'resumen_causaacci', 'SUM(accidentes)::bigint'),
+        _top('causaacci', TABLA_BASE, 'COUNT(*)'),
+    ),
+    "Accidentes por hora": (
+        """SELECT id_entidad, id_hora, SUM(accidentes)::bigint as cantidad
+           FROM resumen_temporal GROUP BY id_entidad, id_hora ORDER BY id_entidad, id_hora""",
+        f"""SELECT id_entidad, id_hora, COUNT(*) as cantidad
+            FROM {TABLA_BASE} GROUP BY id_entidad, id_hora ORDER BY id_entidad, id_hora""",
+    ),
+    "Severidad por vehículo": (
+        """SELECT id_entidad, vehiculo, SUM(accidentes)::bigint as accidentes,
+                  SUM(muertos)::bigint as muertos, SUM(heridos)::bigint as heridos
+           FROM resumen_vehiculo GROUP BY id_entidad, vehiculo
+           ORDER BY id_entidad, accidentes DESC, vehiculo""",
+        f"""SELECT a.id_entidad, v.vehiculo, COUNT(*) as accidentes,
+                   SUM(a.muertos)::bigint as muertos, SUM(a.heridos)::bigint as heridos
+            FROM (SELECT *, {_MUERTOS} AS muertos, {_HERIDOS} AS heridos FROM {TABLA_BASE}) a
+            CROSS JOIN LATERAL (VALUES {_VEHICULOS}) AS v(vehiculo, cantidad)
+            WHERE v.cantidad > 0
+            GROUP BY a.id_entidad, v.vehiculo ORDER BY a.id_entidad, accidentes DESC, vehiculo""",
+    ),
+}
+
+
+def _municipios_objetivo(objetivos):
+    """Llaves entidad * FACTOR_MUNICIPIO + municipio de los objetivos municipales"""
+    objetivos = normalizar_objetivos(objetivos) or []
+    return [e * FACTOR_MUNICIPIO + m for e, m in objetivos if m is not None]
+
+
+def crear_resumenes(engine, objetivos=None):
+    """
+    Crea las tablas de resumen (vacías) si no existen. Las de una versión
+    anterior, sin id_entidad, se vuelven a crear y se llenan con todos los
+    años de la tabla.
+    """
+    with engine.begin() as conn:
+        anteriores = [nombre for nombre in RESUMENES if conn.execute(text("""
+            SELECT COUNT(*) FROM information_schema.columns
+            WHERE table_schema = current_schema() AND table_name = :tabla
+              AND column_name IN ('anio', 'id_entidad')
+        """), {'tabla': nombre}).scalar() == 1]
+        for nombre, (columnas, _) in RESUMENES.items():
+            if nombre in anteriores:
+                conn.execute(text(f"DROP TABLE {nombre}"))
+            conn.execute(text(f"CREATE TABLE IF NOT EXISTS {nombre} ({columnas})"))
+            conn.execute(text(f"CREATE INDEX IF NOT EXISTS idx_{nombre}_anio ON {nombre}(anio)"))
+    if anteriores:
+        print(f"✓ Resúmenes sin id_entidad recreados: {', '.join(anteriores)}")
+        refrescar_resumenes(engine, objetivos=objetivos)
+
+
+def refrescar_resumenes(engine, anios=None, objetivos=None):
+    """
+    Recalcula los resúmenes de los años indicados en una sola transacción.
+    Con anios=None se recalculan todos los años presentes en la tabla;
+    `objetivos` (los del ETL) dice qué municipios van por separado.
+    """
+    inicio = time.perf_counter()
+    municipios = _municipios_objetivo(objetivos)
+    with engine.begin() as conn:
+        if anios is None:
+            anios = [fila[0] for fila in conn.execute(text(f"SELECT DISTINCT anio FROM {TABLA_BASE}"))]
+            for nombre in RESUMENES:
+                conn.execute(text(f"TRUNCATE {nombre}"))
+        anios = [int(anio) for anio in anios]
+        for nombre, (_, select) in RESUMENES.items():
+            conn.execute(text(f"DELETE FROM {nombre} WHERE anio = ANY(:anios)"), {'anios': anios})
+            conn.execute(text(f"INSERT INTO {nombre} {select}"),
+                         {'anios': anios, 'municipios': municipios})
+    print(f"✓ Resúmenes actualizados para {sorted(anios)} en {time.perf_counter() - inicio:.2f} s")
+
+
+def comparar_resumenes(engine, repeticiones=5):
+    """
+    Ejecuta cada consulta de validación sobre los resúmenes y sobre la tabla
+    completa: verifica que den el mismo resultado y mide la latencia (mejor
+    de `repeticiones`). Regresa un DataFrame con el reporte.
+    """
+    reporte = []
+    with engine.connect() as conn:
+        for nombre, (sql_resumen, sql_tabla) in CONSULTAS_VALIDACION.items():
+            tiempos = {}
+            resultados = {}
+            for clave, sql in [('resumen', sql_resumen), ('tabla', sql_tabla)]:
+                mejor = float('inf')
+                for _ in range(repeticiones):
+                    inicio = time.perf_counter()
+                    resultados[clave] = leer_sql(conn, sql)
+                    mejor = min(mejor, time.perf_counter() - inicio)
+                tiempos[clave] = mejor * 1000
+            iguales = resultados['resumen'].astype('int64', errors='ignore').equals(
+                resultados['tabla'].astype('int64', errors='ignore'))
+            reporte.append({
+                'consulta': nombre,
+                'ms_tabla': round(tiempos['tabla'], 2),
+                'ms_resumen': round(tiempos['resumen'], 2),
+                'speedup': round(tiempos['tabla'] / tiempos['resumen'], 1),
+                'iguales': iguales,
+            })
+    return pd.DataFrame(reporte)
@@ -0,0 +1,155 @@
+"""
+PROYECTO: Análisis de Accidentes de Tránsito en Hermosillo, Sonora
+Intervalos de confianza bootstrap para la matriz de riesgo vehículo x causa
+
+analizar_vehiculo_causa reporta la tasa de mortalidad de cada (vehículo,
+causaacci) como un solo número, y varias de las "combinaciones más mortales"
+salen de unos cuantos accidentes. Aquí se calculan intervalos bootstrap
+(percentiles) de la tasa de mortalidad y del porcentaje de accidentes
+fatales para todas las celdas a la vez.
+
+El bootstrap remuestrea con reemplazo los n accidentes de cada celda. Las
+dos tasas solo dependen de cuántos accidentes de la muestra tienen 0, 1,
+2... muertos, así que remuestrear los n registros equivale exactamente a
+sacar de una multinomial(n, frecuencia de cada número de muertos en la
+celda). Un lote de réplicas es entonces una sola llamada a
+rng.multinomial para todas las celdas, con memoria proporcional a
+lote x celdas x valores distintos, sin importar cuántos accidentes haya.
+Los lotes se reparten en un pool de procesos; cada lote tiene su propia
+semilla (SeedSequence(semilla).spawn), así que el resultado es el mismo con
+cualquier número de procesos.
+
+Uso desde la libreta:
+    from bootstrap_riesgo import intervalos_vehiculo_causa, combinaciones_mas_mortales
+    intervalos = intervalos_vehiculo_causa(df, replicas=5000)
+    combinaciones_mas_mortales(intervalos, min_accidentes=10)
+"""
+
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from severidad_vehiculos import matriz_involucramiento, victimas_por_registro
+
+# Réplicas por lote (cada proceso arma un arreglo lote x celdas x valores)
+LOTE = 500
+
+
+# =============================================================================
+# CELDAS
+# =============================================================================
+
+def distribucion_por_celda(df, columnas=None):
+    """
+    Para cada (vehículo, causaacci) con accidentes: número de accidentes y
+    frecuencia de cada número de muertos por accidente.
+
+    Regresa (índice de celdas, n por celda, valores, conteos), con valores y
+    conteos de forma (celdas, máximo de valores distintos) rellenos con 0.
+    Los registros sin causa se descartan, como en metricas_vehiculo_causa.
+    """
+    matriz, columnas = matriz_involucramiento(df, columnas)
+    muertos, _ = victimas_por_registro(df)
+    codigos, causas = pd.factorize(df['causaacci'], sort=True)
+
+    filas, vehiculos = np.nonzero(matriz)
+    con_causa = codigos[filas] >= 0
+    filas, vehiculos = filas[con_causa], vehiculos[con_causa]
+    celda = vehiculos * len(causas) + codigos[filas]
+
+    # Pares (celda, muertos) distintos y cuántos accidentes tiene cada uno
+    muertos = muertos[filas].astype('int64')
+    base = muertos.max(initial=0) + 1
+    pares, conteo = np.unique(celda * base + muertos, return_counts=True)
+    celdas, inicio, distintos = np.unique(pares // base, return_index=True, return_counts=True)
+    posicion = np.arange(len(pares)) - np.repeat(inicio, distintos)
+    fila_celda = np.repeat(np.arange(len(celdas)), distintos)
+
+    valores = np.zeros((len(celdas), distintos.max(initial=1)), dtype='int64')
+    conteos = np.zeros_like(valores)
+    valores[fila_celda, posicion] = pares % base
+    conteos[fila_celda, posicion] = conteo
+
+    indice = pd.MultiIndex.from_arrays(
+        [np.asarray(columnas)[celdas // len(causas)], causas[celdas % len(causas)]],
+        names=['vehiculo', 'causaacci'])
+    return indice, conteos.sum(axis=1), valores, conteos
+
+
+# =============================================================================
+# BOOTSTRAP
+# =============================================================================
+
+def lote_bootstrap(n, probabilidades, valores, tamanio, semilla):
+    """
+    `tamanio` réplicas de todas las celdas: arreglo (tamanio, celdas, 2) con
+    la tasa de mortalidad y el porcentaje de accidentes fatales.
+    """
+    rng = np.random.default_rng(semilla)
+    muestras = rng.multinomial(n, probabilidades, size=(tamanio, len(n)))
+    muertos = np.einsum('rck,ck->rc', muestras, valores)
+    fatales = np.einsum('rck,ck->rc', muestras, (valores > 0).astype('int64'))
+    return np.stack([muertos, fatales], axis=-1) / n[:, None] * 100
+
+
+def replicas_bootstrap(n, valores, conteos, replicas, lote=LOTE, workers=None, semilla=0):
+    """
+    Réplicas bootstrap (replicas, celdas, 2) en lotes de `lote`, repartidos
+    en `workers` procesos (todos los CPU por defecto; 1 = sin pool).
+    """
+    probabilidades = conteos / n[:, None]
+    tamanios = [min(lote, replicas - i) for i in range(0, replicas, lote)]
+    semillas = np.random.SeedSequence(semilla).spawn(len(tamanios))
+    tareas = [(n, probabilidades, valores, tamanio, s) for tamanio, s in zip(tamanios, semillas)]
+
+    workers = min(workers or os.cpu_count() or 1, len(tareas))
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            resultados = list(pool.map(lote_bootstrap, *zip(*tareas)))
+    else:
+        resultados = [lote_bootstrap(*tarea) for tarea in tareas]
+    return np.concatenate(resultados)
+
+
+def intervalos_vehiculo_causa(df, replicas=2000, nivel=0.95, lote=LOTE, workers=None, semilla=0,
+                              columnas=None):
+    """
+    Tasa de mortalidad y % de accidentes fatales de cada (vehículo,
+    causaacci), con su intervalo bootstrap percentil al `nivel` indicado
+    (columnas *_inf y *_sup) y su error estándar bootstrap (*_ee).
+    """
+    indice, n, valores, conteos = distribucion_por_celda(df, columnas)
+    muestras = replicas_bootstrap(n, valores, conteos, replicas, lote, workers, semilla)
+    alfa = (1 - nivel) / 2
+    inferior, superior = np.quantile(muestras, [alfa, 1 - alfa], axis=0)
+    error = muestras.std(axis=0, ddof=1)
+
+    muertos = (valores * conteos).sum(axis=1)
+    fatales = np.where(valores > 0, conteos, 0).sum(axis=1)
+    intervalos = pd.DataFrame({
+        'accidentes': n,
+        'total_muertos': muertos,
+        'es_fatal': fatales,
+    }, index=indice)
+    for j, tasa in enumerate(['tasa_mortalidad', 'pct_accidentes_fatales']):
+        estimado = (muertos if j == 0 else fatales) / n * 100
+        intervalos[tasa] = estimado.round(2)
+        intervalos[f'{tasa}_inf'] = inferior[:, j].round(2)
+        intervalos[f'{tasa}_sup'] = superior[:, j].round(2)
+        intervalos[f'{tasa}_ee'] = error[:, j].round(2)
+    return intervalos
+
+
+def combinaciones_mas_mortales(intervalos, min_accidentes=10, top_n=10):
+    """
+    Combinaciones vehículo x causa ordenadas por el límite inferior de la
+    tasa de mortalidad: una celda con pocos accidentes y un intervalo ancho
+    ya no sube a la cima solo por su estimado puntual.
+    """
+    seleccion = intervalos[intervalos['accidentes'] >= min_accidentes]
+    return seleccion.sort_values(['tasa_mortalidad_inf', 'tasa_mortalidad'],
+                                 ascending=False).head(top_n)
@@ -0,0 +1,105 @@
+"""
+PROYECTO: Análisis de Accidentes de Tránsito en Hermosillo, Sonora
+Copia local (Parquet) de accidentes_hermosillo para la libreta
+
+La libreta leía toda la tabla con pd.read_sql en cada reinicio del kernel.
+cargar_accidentes regresa el mismo DataFrame desde una copia local en
+Parquet, identificada por la versión de la tabla (manifiesto de cargas): si
+la tabla no cambió desde la última lectura no se vuelve a consultar, y si
+cambió se descarga una copia nueva.
+
+Uso desde la libreta:
+    from cache_datos import cargar_accidentes
+    df = cargar_accidentes(engine)                                # tabla completa
+    df = cargar_accidentes(engine, columnas=['anio', 'causaacci'], anios=[2023, 2024])
+"""
+
+import os
+import sys
+import glob
+import time
+import hashlib
+
+import pandas as pd
+import pyarrow.parquet as pq
+from sqlalchemy import text
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "3PrepDatos"))
+from configuracion_bd import SQL_VERSION_MANIFIESTO, huella_manifiesto
+
+DIR_CACHE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'cache')
+TABLA = 'accidentes_hermosillo'
+
+# Copias que se conservan (las más recientes); las demás se borran
+MAX_COPIAS = 3
+
+
+def version_tabla(engine, tabla=TABLA):
+    """
+    Huella de la versión de la tabla según el manifiesto de cargas (checksum,
+    objetivos y fecha por año), la misma que usa pipeline.py: toda carga del
+    ETL lo actualiza en la misma transacción, así que no hace falta recorrer
+    la tabla. Solo si no hay manifiesto (tabla cargada por fuera del ETL) se
+    usan el número de registros y el id máximo.
+    """
+    with engine.connect() as conn:
+        if conn.execute(text("SELECT to_regclass('carga_manifiesto')")).scalar() is not None:
+            manifiesto = conn.execute(text(SQL_VERSION_MANIFIESTO)).scalar()
+            if manifiesto:
+                return huella_manifiesto(manifiesto, tabla)
+        registros, id_maximo = conn.execute(text(f"SELECT COUNT(*), MAX(id) FROM {tabla}")).fetchone()
+    huella = f"{tabla}|{registros}|{id_maximo}"
+    return hashlib.sha1(huella.encode('utf-8')).hexdigest()[:16]
+
+
+def _ruta_copia(dir_cache, tabla, version):
+    return os.path.join(dir_cache, f'{tabla}_{version}.parquet')
+
+
+def _descargar_copia(engine, tabla, ruta):
+    """Lee la tabla completa y la guarda como Parquet (escritura atómica)"""
+    df = pd.read_sql(f"SELECT * FROM {tabla}", engine)
+    tmp = ruta + '.tmp'
+    df.to_parquet(tmp, engine='pyarrow', compression='zstd', index=False)
+    os.replace(tmp, ruta)
+    return df
+
+
+def _desalojar(dir_cache, tabla, conservar, max_copias=MAX_COPIAS):
+    """Borra las copias más antiguas de la tabla, conservando `conservar`"""
+    copias = sorted(glob.glob(os.path.join(dir_cache, f'{tabla}_*.parquet')),
+                    key=os.path.getmtime, reverse=True)
+    vigentes = [conservar] + [c for c in copias if c != conservar][:max_copias - 1]
+    for copia in copias:
+        if copia not in vigentes:
+            os.remove(copia)
+
+
+def cargar_accidentes(engine, columnas=None, anios=None, tabla=TABLA, dir_cache=DIR_CACHE,
+                      max_copias=MAX_COPIAS):
+    """
+    Regresa accidentes_hermosillo como DataFrame, desde la copia local si la
+    tabla no cambió. `columnas` limita las columnas leídas y `anios` filtra
+    por año; ambos se aplican al leer el Parquet, así que una sola copia
+    sirve para cualquier combinación.
+    """
+    inicio = time.perf_counter()
+    os.makedirs(dir_cache, exist_ok=True)
+    ruta = _ruta_copia(dir_cache, tabla, version_tabla(engine, tabla))
+
+    if os.path.exists(ruta):
+        origen = 'copia local'
+        os.utime(ruta)
+        filtros = [('anio', 'in', list(anios))] if anios is not None else None
+        df = pq.read_table(ruta, columns=columnas, filters=filtros).to_pandas()
+    else:
+        origen = 'PostgreSQL (copia local actualizada)'
+        df = _descargar_copia(engine, tabla, ruta)
+        if anios is not None:
+            df = df[df['anio'].isin(anios)].reset_index(drop=True)
+        if columnas is not None:
+            df = df[columnas]
+    _desalojar(dir_cache, tabla, ruta, max_copias)
+
+    print(f"✅ {len(df):,} registros desde {origen} en {time.perf_counter() - inicio:.2f} s")
+    return df
@@ -0,0 +1,307 @@
+"""
+PROYECTO: Análisis de Accidentes de Tránsito en Hermosillo, Sonora
+Agregados del EDA calculados dentro de PostgreSQL
+
+Casi todas las figuras del EDA son un groupby sobre la tabla completa cargada
+en pandas. Cada función de este módulo manda una sola consulta de agregación
+al servidor y regresa únicamente el resultado (unas cuantas filas), con los
+mismos números y el mismo formato que la versión en pandas de la libreta o
+de severidad_vehiculos.py. Los resultados se leen con un cursor del lado del
+servidor, de modo que un agrupamiento grande (o iterar_registros) nunca
+tiene que caber completo en memoria. Todas aceptan `anios` y `entidades`
+(ids de entidad u objetivos (id_entidad, id_municipio), como OBJETIVOS del ETL).
+
+Uso desde la libreta:
+    from consultas_agregadas import conteo_por, conteo_valores, severidad_por_vehiculo
+    accidentes_anual = conteo_por(engine, 'anio')
+    causas = conteo_valores(engine, 'causaacci')
+    severidad_df = severidad_por_vehiculo(engine)
+    severidad_hermosillo = severidad_por_vehiculo(engine, entidades=[(26, 30)])
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "3PrepDatos"))
+from severidad_vehiculos import (COLUMNAS_VEHICULOS_EDA, NOMBRES_VEHICULOS, DIAS_FIN_SEMANA,
+                                 tabla_metricas, tabla_severidad, tabla_caracteristicas,
+                                 completar_metricas_causa)
+from severidad_vehiculos import analizar_vehiculo_causa as _analizar_metricas
+from esquema_accidentes import COLUMNAS_MUERTOS, COLUMNAS_HERIDOS, COLUMNA_HUELLA, columnas_tabla
+from objetivos import normalizar_objetivos, FACTOR_MUNICIPIO
+from backends import leer_sql_por_lotes
+
+TABLA = 'accidentes_hermosillo'
+
+# Filas por lote al leer del cursor del servidor
+LOTE = 50_000
+
+# Niveles de severidad del EDA: pd.cut(total_victimas, bins=[-1, 0, 1, 3, inf])
+NIVELES_SEVERIDAD = [
+    ('Sin víctimas', -1, 0),
+    ('Leve', 0, 1),
+    ('Moderado', 1, 3),
+    ('Grave', 3, None),
+]
+
+# Un NULL no suma, igual que np.nan_to_num en victimas_por_registro
+_MUERTOS = ' + '.join(f'COALESCE({col}, 0)' for col in COLUMNAS_MUERTOS)
+_HERIDOS = ' + '.join(f'COALESCE({col}, 0)' for col in COLUMNAS_HERIDOS)
+
+
+# =============================================================================
+# LECTURA
+# =============================================================================
+
+def _validar_columnas(columnas):
+    """Los nombres de columna van dentro del SQL: solo se aceptan los del esquema"""
+    columnas = [columnas] if isinstance(columnas, str) else list(columnas)
+    validas = set(columnas_tabla()) | {'id', COLUMNA_HUELLA[0]}
+    desconocidas = [col for col in columnas if col not in validas]
+    if desconocidas:
+        raise ValueError(f"Columnas desconocidas: {desconocidas}")
+    return columnas
+
+
+def _filtro_anios(anios, condiciones=None, entidades=None):
+    """
+    Cláusula WHERE (puede quedar vacía) y sus parámetros. `entidades` son ids
+    de entidad u objetivos (id_entidad, id_municipio) como OBJETIVOS del ETL;
+    None o 'todos' no filtra.
+    """
+    condiciones = list(condiciones or [])
+    parametros = {}
+    if anios is not None:
+        condiciones.append('anio = ANY(:anios)')
+        parametros['anios'] = [int(anio) for anio in anios]
+    objetivos = normalizar_objetivos(entidades)
+    if objetivos is not None:
+        completas = [entidad for entidad, municipio in objetivos if municipio is None]
+        municipios = [entidad * FACTOR_MUNICIPIO + municipio
+                      for entidad, municipio in objetivos if municipio is not None]
+        alternativas = []
+        if completas:
+            alternativas.append('id_entidad = ANY(:entidades)')
+            parametros['entidades'] = completas
+        if municipios:
+            alternativas.append(f'id_entidad * {FACTOR_MUNICIPIO} + id_municipio = ANY(:municipios)')
+            parametros['municipios'] = municipios
+        condiciones.append(f"({' OR '.join(alternativas)})" if alternativas else 'FALSE')
+    where = f"WHERE {' AND '.join(condiciones)}" if condiciones else ''
+    return where, parametros
+
+
+def consulta_en_lotes(engine, sql, parametros=None, lote=LOTE):
+    """
+    Ejecuta `sql` con un cursor del lado del servidor (o por vectores en
+    DuckDB) y entrega el resultado en DataFrames de hasta `lote` filas.
+    """
+    with engine.connect() as conn:
+        yield from leer_sql_por_lotes(conn, sql, parametros, lote)
+
+
+def _consultar(engine, sql, parametros=None, lote=LOTE):
+    partes = list(consulta_en_lotes(engine, sql, parametros, lote))
+    return pd.concat(partes, ignore_index=True)
+
+
+def iterar_registros(engine, columnas=None, anios=None, tabla=TABLA, lote=LOTE, entidades=None,
+                     orden=None):
+    """
+    Registros de la tabla en lotes de `lote` filas, sin cargarla completa.
+    `entidades` filtra por entidad u objetivo (ver _filtro_anios) y `orden`
+    es la columna del ORDER BY.
+    """
+    seleccion = ', '.join(_validar_columnas(columnas)) if columnas is not None else '*'
+    where, parametros = _filtro_anios(anios, entidades=entidades)
+    order_by = f"ORDER BY {_validar_columnas(orden)[0]}" if orden is not None else ''
+    yield from consulta_en_lotes(engine, f"SELECT {seleccion} FROM {tabla} {where} {order_by}",
+                                 parametros, lote)
+
+
+# =============================================================================
+# CONTEOS POR DIMENSIÓN
+# =============================================================================
+
+def conteo_por(engine, dimensiones, anios=None, tabla=TABLA, entidades=None):
+    """
+    Accidentes por una o varias dimensiones, igual que
+    df.groupby(dimensiones).size().reset_index(name='cantidad'): sin los
+    grupos con NULL y ordenado por las dimensiones.
+    """
+    dimensiones = _validar_columnas(dimensiones)
+    columnas = ', '.join(dimensiones)
+    where, parametros = _filtro_anios(anios, [f'{col} IS NOT NULL' for col in dimensiones], entidades)
+    conteo = _consultar(engine, f"""
+        SELECT {columnas}, COUNT(*) AS cantidad
+        FROM {tabla} {where}
+        GROUP BY {columnas}
+    """, parametros)
+    # El orden se hace aquí: la intercalación de PostgreSQL no ordena los
+    # textos igual que pandas
+    return conteo.sort_values(dimensiones, kind='stable').reset_index(drop=True)
+
+
+def conteo_valores(engine, columna, top=None, anios=None, tabla=TABLA, entidades=None):
+    """
+    Equivalente a df[columna].value_counts().head(top).reset_index(), con
+    columnas [columna, 'cantidad']. Los empates se ordenan por valor.
+    """
+    conteo = conteo_por(engine, columna, anios, tabla, entidades)
+    conteo = conteo.sort_values('cantidad', ascending=False, kind='stable').reset_index(drop=True)
+    return conteo if top is None else conteo.head(top)
+
+
+def niveles_severidad(engine, anios=None, tabla=TABLA, entidades=None):
+    """
+    Distribución de accidentes por nivel de severidad, igual que
+    df['nivel_severidad'].value_counts() del EDA. Como en pandas, un NULL en
+    cualquier columna de víctimas deja al registro sin nivel.
+    """
+    victimas = ' + '.join(COLUMNAS_MUERTOS + COLUMNAS_HERIDOS)
+    casos = []
+    for i, (_, desde, hasta) in enumerate(NIVELES_SEVERIDAD):
+        condicion = f'v > {desde}' + (f' AND v <= {hasta}' if hasta is not None else '')
+        casos.append(f'WHEN {condicion} THEN {i}')
+    where, parametros = _filtro_anios(anios, entidades=entidades)
+    conteo = _consultar(engine, f"""
+        SELECT nivel, COUNT(*) AS cantidad
+        FROM (SELECT CASE {' '.join(casos)} END AS nivel
+              FROM (SELECT {victimas} AS v FROM {tabla} {where}) a) n
+        WHERE nivel IS NOT NULL
+        GROUP BY nivel
+    """, parametros)
+
+    etiquetas = [nombre for nombre, _, _ in NIVELES_SEVERIDAD]
+    cantidades = np.zeros(len(etiquetas), dtype='int64')
+    cantidades[conteo['nivel'].to_numpy(dtype='int64')] = conteo['cantidad'].to_numpy()
+    indice = pd.CategoricalIndex(etiquetas, categories=etiquetas, ordered=True, name='nivel_severidad')
+    return pd.Series(cantidades, index=indice, name='count').sort_values(ascending=False)
+
+
+# =============================================================================
+# MÉTRICAS POR VEHÍCULO
+# =============================================================================
+
+def _vehiculos(columnas):
+    """Vehículos pedidos que existen en la tabla, en el orden pedido"""
+    existentes = set(columnas_tabla())
+    return [col for col in (columnas or COLUMNAS_VEHICULOS_EDA) if col in existentes]
+
+
+def _desde_vehiculos(columnas, tabla, where):
+    """
+    FROM que convierte cada registro en una fila por vehículo involucrado
+    (columna > 0), con muertos y heridos del registro ya sumados.
+    """
+    valores = ', '.join(f"('{col}', a.{col})" for col in columnas)
+    return f"""
+        FROM (SELECT *, {_MUERTOS} AS muertos, {_HERIDOS} AS heridos
+              FROM {tabla} {where}) a
+        CROSS JOIN LATERAL (VALUES {valores}) AS v(vehiculo, cantidad)
+        WHERE v.cantidad > 0
+    """
+
+
+def sumas_por_vehiculo(engine, columnas=None, anios=None, tabla=TABLA, entidades=None):
+    """
+    Sumas por vehículo en una sola consulta: accidentes, muertos, heridos,
+    accidentes fatales, víctimas, accidentes de noche y en fin de semana, y
+    el máximo de víctimas en un accidente. Índice: columna del vehículo, en
+    el orden de `columnas` (los vehículos sin accidentes quedan en cero).
+    """
+    columnas = _vehiculos(columnas)
+    where, parametros = _filtro_anios(anios, entidades=entidades)
+    parametros['fin_semana'] = list(DIAS_FIN_SEMANA)
+    sumas = _consultar(engine, f"""
+        SELECT v.vehiculo,
+               COUNT(*) AS accidentes,
+               SUM(a.muertos)::bigint AS muertos,
+               SUM(a.heridos)::bigint AS heridos,
+               COUNT(*) FILTER (WHERE a.muertos > 0) AS accidentes_fatales,
+               SUM(a.muertos + a.heridos)::bigint AS victimas,
+               COUNT(*) FILTER (WHERE a.id_hora >= 20 OR a.id_hora <= 6) AS noche,
+               COUNT(*) FILTER (WHERE a.diasemana = ANY(:fin_semana)) AS fin_semana,
+               MAX(a.muertos + a.heridos) AS max_victimas
+        {_desde_vehiculos(columnas, tabla, where)}
+        GROUP BY v.vehiculo
+    """, parametros).set_index('vehiculo')
+
+    sumas = sumas.reindex(pd.Index(columnas, name='vehiculo'))
+    conteos = sumas.columns.drop('max_victimas')
+    sumas[conteos] = sumas[conteos].fillna(0).astype('int64')
+    sumas['max_victimas'] = sumas['max_victimas'].astype('float64')
+    return sumas
+
+
+def metricas_vehiculo(engine, columnas=None, anios=None, tabla=TABLA, entidades=None):
+    """Mismo resultado que severidad_vehiculos.metricas_vehiculo(df, columnas)"""
+    sumas = sumas_por_vehiculo(engine, columnas, anios, tabla, entidades)
+    valores = sumas[['accidentes', 'muertos', 'heridos', 'accidentes_fatales']].to_numpy(dtype='float64')
+    return tabla_metricas(list(sumas.index), valores)
+
+
+def vehiculos_involucrados(engine, columnas=None, anios=None, tabla=TABLA, entidades=None):
+    """Ranking de vehículos del EDA (Vehiculo, Accidentes), de mayor a menor"""
+    sumas = sumas_por_vehiculo(engine, columnas, anios, tabla, entidades)
+    vehiculos_df = pd.DataFrame({
+        'Vehiculo': [NOMBRES_VEHICULOS.get(col, col) for col in sumas.index],
+        'Accidentes': sumas['accidentes'].to_numpy(),
+    })
+    return vehiculos_df.sort_values('Accidentes', ascending=False)
+
+
+def severidad_por_vehiculo(engine, columnas=None, anios=None, tabla=TABLA, entidades=None):
+    """Tabla de severidad por vehículo del EDA, calculada en el servidor"""
+    return tabla_severidad(metricas_vehiculo(engine, columnas, anios, tabla, entidades))
+
+
+def caracteristicas_vehiculos(engine, columnas=None, anios=None, tabla=TABLA, entidades=None):
+    """Matriz de características para clustering/PCA, calculada en el servidor"""
+    sumas = sumas_por_vehiculo(engine, columnas, anios, tabla, entidades)
+    valores = sumas[['accidentes', 'muertos', 'heridos', 'accidentes_fatales',
+                     'victimas', 'noche', 'fin_semana']].to_numpy(dtype='float64')
+    return tabla_caracteristicas(list(sumas.index), valores, sumas['max_victimas'].to_numpy())
+
+
+# =============================================================================
+# MATRIZ VEHÍCULO x CAUSA
+# =============================================================================
+
+def matriz_vehiculo_causa(engine, columnas=None, anios=None, tabla=TABLA, entidades=None):
+    """
+    Métricas por (vehículo, causaacci) en una sola consulta; mismo resultado
+    que severidad_vehiculos.metricas_vehiculo_causa(df, columnas).
+    """
+    columnas = _vehiculos(columnas)
+    where, parametros = _filtro_anios(anios, ['causaacci IS NOT NULL'], entidades)
+    metricas = _consultar(engine, f"""
+        SELECT v.vehiculo, a.causaacci,
+               COUNT(*) AS accidentes,
+               SUM(a.muertos)::bigint AS total_muertos,
+               SUM(a.heridos)::bigint AS total_heridos,
+               SUM(a.muertos + a.heridos)::bigint AS total_victimas,
+               COUNT(*) FILTER (WHERE a.muertos > 0) AS es_fatal
+        {_desde_vehiculos(columnas, tabla, where)}
+        GROUP BY v.vehiculo, a.causaacci
+    """, parametros)
+
+    # Orden de metricas_vehiculo_causa: vehículo según `columnas`, causa alfabética
+    metricas['orden'] = metricas['vehiculo'].map({col: i for i, col in enumerate(columnas)})
+    metricas = metricas.sort_values(['orden', 'causaacci'], kind='stable')
+    metricas = metricas.drop(columns='orden').set_index(['vehiculo', 'causaacci'])
+    return completar_metricas_causa(metricas.astype('int64'))
+
+
+def analizar_vehiculo_causa(engine, col_vehiculo, top_n=10, min_accidentes=10, anios=None,
+                            metricas=None, tabla=TABLA, entidades=None):
+    """
+    Causas más mortales para un vehículo. Para varios vehículos conviene
+    calcular una vez matriz_vehiculo_causa(engine) y pasarla en `metricas`.
+    """
+    if metricas is None:
+        metricas = matriz_vehiculo_causa(engine, [col_vehiculo], anios, tabla, entidades)
+    return _analizar_metricas(None, col_vehiculo, top_n, min_accidentes, metricas)
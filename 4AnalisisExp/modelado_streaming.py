@@ -0,0 +1,289 @@
+"""
+PROYECTO: Análisis de Accidentes de Tránsito en Hermosillo, Sonora
+Clustering y PCA por accidente, leyendo la tabla por lotes
+
+El modelado del EDA agrupa unos diez tipos de vehículo porque agrupar
+accidentes individuales pedía la tabla completa en memoria. Aquí cada
+accidente es una fila: se lee accidentes_hermosillo con un cursor del lado
+del servidor (consultas_agregadas.iterar_registros), las columnas de texto
+se codifican lote por lote contra un vocabulario que se consulta antes en
+el servidor, y los modelos se ajustan con partial_fit:
+
+    pasada 1    StandardScaler (media y varianza exactas)
+    pasada 2    MiniBatchKMeans e IncrementalPCA sobre los datos escalados,
+                en orden de huella (un orden pseudoaleatorio y reproducible)
+    pasada 3    cluster y componentes de cada accidente, que se escriben con
+                COPY en la tabla modelado_accidentes
+
+En memoria solo hay, a lo más, dos lotes a la vez, sin importar el tamaño de
+la tabla. Con varias entidades cargadas (OBJETIVOS) se ajusta un modelo por
+entidad (por_entidad=True) o uno para todas; cada modelo tiene su nombre en
+la columna `modelo`, y volver a correrlo solo reemplaza sus filas. Usa
+cursores del servidor, así que requiere PostgreSQL.
+
+Uso desde la libreta:
+    from modelado_streaming import modelar_accidentes
+    modelos = modelar_accidentes(engine, n_clusters=3)
+    modelos['entidad_26'].resumen      # accidentes y tasas por cluster
+    modelos['entidad_26'].cargas()     # loadings de cada característica en las PCs
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+from sklearn.preprocessing import StandardScaler
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.decomposition import IncrementalPCA
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "3PrepDatos"))
+from consultas_agregadas import iterar_registros, conteo_por, TABLA, LOTE
+from severidad_vehiculos import victimas_por_registro
+from esquema_accidentes import COLUMNAS_VEHICULOS, COLUMNAS_MUERTOS, COLUMNAS_HERIDOS
+from carga_copy import LectorCSVPorTramos, BYTES_POR_LECTURA, MARCADOR_NULO
+from backends import es_duckdb
+
+TABLA_MODELO = 'modelado_accidentes'
+
+# Características de cada accidente
+CICLICAS = {'id_hora': 24, 'mes': 12}
+CODIFICADAS = ['diasemana', 'tipaccid', 'causaacci', 'urbana', 'suburbana',
+               'caparod', 'sexo', 'aliento', 'cinturon', 'clasacc']
+
+# Columnas que se leen en cada pasada
+LLAVES = ['huella', 'id_entidad', 'anio']
+COLUMNAS_LECTURA = (LLAVES + COLUMNAS_VEHICULOS + COLUMNAS_MUERTOS + COLUMNAS_HERIDOS
+                    + list(CICLICAS) + CODIFICADAS)
+
+
+# =============================================================================
+# CODIFICACIÓN
+# =============================================================================
+
+class CodificadorRegistros:
+    """
+    Convierte un lote de registros en una matriz float64: número de vehículos
+    de cada tipo, muertos y heridos, hora y mes como seno/coseno, y una
+    columna 0/1 por cada valor de las columnas de texto. El vocabulario es
+    fijo, así que todos los lotes tienen las mismas columnas; un NULL o un
+    valor fuera del vocabulario queda en ceros.
+    """
+
+    def __init__(self, vocabulario):
+        self.vocabulario = {col: list(valores) for col, valores in vocabulario.items()}
+        self.nombres = (list(COLUMNAS_VEHICULOS) + ['muertos', 'heridos']
+                        + [f'{col}_{f}' for col in CICLICAS for f in ('sen', 'cos')]
+                        + [f'{col}={valor}' for col, valores in self.vocabulario.items()
+                           for valor in valores])
+
+    @classmethod
+    def desde_tabla(cls, engine, anios=None, entidades=None, tabla=TABLA):
+        """Vocabulario consultado en el servidor: valores distintos de cada columna de texto"""
+        return cls({col: conteo_por(engine, col, anios, tabla, entidades)[col].tolist()
+                    for col in CODIFICADAS})
+
+    def transformar(self, parte):
+        X = np.zeros((len(parte), len(self.nombres)))
+        n = len(COLUMNAS_VEHICULOS)
+        X[:, :n] = np.nan_to_num(parte[COLUMNAS_VEHICULOS].to_numpy(dtype='float64', na_value=np.nan))
+        X[:, n], X[:, n + 1] = victimas_por_registro(parte)
+        j = n + 2
+        for col, periodo in CICLICAS.items():
+            angulo = parte[col].to_numpy(dtype='float64', na_value=np.nan) * 2 * np.pi / periodo
+            X[:, j], X[:, j + 1] = np.nan_to_num(np.sin(angulo)), np.nan_to_num(np.cos(angulo))
+            j += 2
+        for col, valores in self.vocabulario.items():
+            codigos = pd.Categorical(parte[col], categories=valores).codes
+            filas = np.nonzero(codigos >= 0)[0]
+            X[filas, j + codigos[filas]] = 1
+            j += len(valores)
+        return X
+
+
+def _lotes_minimos(lotes, minimo):
+    """
+    Junta un lote con menos de `minimo` filas (el último de la consulta) con
+    el anterior: partial_fit de IncrementalPCA y de MiniBatchKMeans necesita
+    al menos n_components / n_clusters filas.
+    """
+    anterior = None
+    for parte in lotes:
+        if anterior is not None and len(parte) < minimo:
+            anterior = pd.concat([anterior, parte], ignore_index=True)
+            continue
+        if anterior is not None:
+            yield anterior
+        anterior = parte
+    if anterior is not None:
+        yield anterior
+
+
+# =============================================================================
+# MODELO
+# =============================================================================
+
+class ModeloAccidentes:
+    """Escalador, k-means y PCA ajustados por lotes sobre los accidentes de unas entidades"""
+
+    def __init__(self, nombre, entidades, codificador, n_clusters=3, n_componentes=2,
+                 semilla=42, lote=LOTE):
+        self.nombre = nombre
+        self.entidades = entidades
+        self.codificador = codificador
+        self.lote = lote
+        self.escalador = StandardScaler()
+        self.kmeans = MiniBatchKMeans(n_clusters=n_clusters, random_state=semilla, n_init=3)
+        self.pca = IncrementalPCA(n_components=n_componentes)
+        self.resumen = None
+
+    def _lotes(self, engine, anios, tabla, orden=None):
+        lotes = iterar_registros(engine, COLUMNAS_LECTURA, anios, tabla, self.lote,
+                                 self.entidades, orden)
+        minimo = max(self.kmeans.n_clusters, self.pca.n_components)
+        for parte in _lotes_minimos(lotes, minimo):
+            yield parte, self.codificador.transformar(parte)
+
+    def ajustar(self, engine, anios=None, tabla=TABLA, epocas=1):
+        """Pasada 1 (escalador) y pasada 2 (k-means y PCA; k-means repite `epocas` veces)"""
+        inicio = time.perf_counter()
+        registros = 0
+        for parte, X in self._lotes(engine, anios, tabla):
+            self.escalador.partial_fit(X)
+            registros += len(parte)
+        if registros < max(self.kmeans.n_clusters, self.pca.n_components):
+            raise ValueError(f"{self.nombre}: {registros} registros no alcanzan para el modelo")
+        print(f"✓ {self.nombre}: escalador con {registros:,} registros "
+              f"({len(self.codificador.nombres)} características) en {time.perf_counter() - inicio:.1f} s")
+
+        inicio = time.perf_counter()
+        for epoca in range(epocas):
+            for _, X in self._lotes(engine, anios, tabla, orden='huella'):
+                X = self.escalador.transform(X)
+                self.kmeans.partial_fit(X)
+                if epoca == 0:
+                    self.pca.partial_fit(X)
+        varianza = self.pca.explained_variance_ratio_.sum()
+        print(f"✓ {self.nombre}: k-means ({self.kmeans.n_clusters} clusters) y PCA "
+              f"({varianza:.1%} de la varianza) en {time.perf_counter() - inicio:.1f} s")
+        return self
+
+    def predecir(self, X):
+        """(cluster, componentes) de una matriz ya codificada"""
+        X = self.escalador.transform(X)
+        return self.kmeans.predict(X), self.pca.transform(X)
+
+    def cargas(self):
+        """Loadings: peso de cada característica en cada componente principal"""
+        return pd.DataFrame(self.pca.components_.T, index=self.codificador.nombres,
+                            columns=[f'PC{i + 1}' for i in range(self.pca.n_components_)])
+
+
+# =============================================================================
+# RESULTADOS
+# =============================================================================
+
+def columnas_modelo(n_componentes):
+    """(nombre, tipo SQL) de modelado_accidentes"""
+    return ([('modelo', 'VARCHAR(100)'), ('huella', 'BIGINT'), ('id_entidad', 'INTEGER'),
+             ('anio', 'INTEGER'), ('cluster', 'INTEGER')]
+            + [(f'pc{i + 1}', 'DOUBLE PRECISION') for i in range(n_componentes)])
+
+
+def crear_tabla_modelo(engine, n_componentes, tabla=TABLA_MODELO):
+    """Crea la tabla de resultados; agrega las columnas pcN que falten"""
+    columnas = columnas_modelo(n_componentes)
+    definiciones = ', '.join(f'{nombre} {tipo}' for nombre, tipo in columnas)
+    with engine.begin() as conn:
+        conn.execute(text(f"CREATE TABLE IF NOT EXISTS {tabla} ({definiciones}, "
+                          f"PRIMARY KEY (modelo, huella))"))
+        for nombre, tipo in columnas[5:]:
+            conn.execute(text(f"ALTER TABLE {tabla} ADD COLUMN IF NOT EXISTS {nombre} {tipo}"))
+
+
+def escribir_resultados(engine, modelo, anios=None, tabla=TABLA, tabla_modelo=TABLA_MODELO):
+    """
+    Pasada 3: cluster y componentes de cada accidente a `tabla_modelo`, en
+    una sola transacción que antes borra las filas anteriores del modelo.
+    Guarda en modelo.resumen los accidentes y las tasas de cada cluster.
+    """
+    inicio = time.perf_counter()
+    n_clusters = modelo.kmeans.n_clusters
+    columnas = [nombre for nombre, _ in columnas_modelo(modelo.pca.n_components_)]
+    sql = (f"COPY {tabla_modelo} ({', '.join(columnas)}) FROM STDIN "
+           f"WITH (FORMAT csv, NULL '{MARCADOR_NULO}')")
+    sumas = np.zeros((n_clusters, 4))
+
+    conn = engine.raw_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(f"DELETE FROM {tabla_modelo} WHERE modelo = %s", (modelo.nombre,))
+        for parte, X in modelo._lotes(engine, anios, tabla):
+            clusters, componentes = modelo.predecir(X)
+            muertos, heridos = X[:, len(COLUMNAS_VEHICULOS)], X[:, len(COLUMNAS_VEHICULOS) + 1]
+            sumas += np.column_stack([
+                np.bincount(clusters, minlength=n_clusters),
+                np.bincount(clusters, muertos, n_clusters),
+                np.bincount(clusters, heridos, n_clusters),
+                np.bincount(clusters, muertos > 0, n_clusters),
+            ])
+            resultado = parte[LLAVES].astype('int64').assign(cluster=clusters)
+            for i in range(componentes.shape[1]):
+                resultado[f'pc{i + 1}'] = componentes[:, i]
+            resultado.insert(0, 'modelo', modelo.nombre)
+            cursor.copy_expert(sql, LectorCSVPorTramos(resultado[columnas]), size=BYTES_POR_LECTURA)
+        cursor.close()
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    accidentes = sumas[:, 0]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        modelo.resumen = pd.DataFrame({
+            'accidentes': accidentes.astype('int64'),
+            'tasa_mortalidad': sumas[:, 1] / accidentes * 100,
+            'tasa_lesiones': sumas[:, 2] / accidentes * 100,
+            'pct_accidentes_fatales': sumas[:, 3] / accidentes * 100,
+        }, index=pd.RangeIndex(n_clusters, name='cluster')).sort_values('tasa_mortalidad')
+    print(f"✓ {modelo.nombre}: {int(accidentes.sum()):,} accidentes escritos en {tabla_modelo} "
+          f"en {time.perf_counter() - inicio:.1f} s")
+    return modelo.resumen
+
+
+def modelar_accidentes(engine, anios=None, entidades=None, por_entidad=True, n_clusters=3,
+                       n_componentes=2, epocas=1, semilla=42, lote=LOTE, tabla=TABLA,
+                       tabla_modelo=TABLA_MODELO):
+    """
+    Ajusta y escribe los modelos de las entidades cargadas (o de `entidades`):
+    uno por entidad ('entidad_26', ...) o, con por_entidad=False, uno solo
+    ('todas', o 'entidades_25_26' si se pasó `entidades`). Regresa
+    {nombre: ModeloAccidentes}.
+    """
+    if es_duckdb(engine):
+        raise ValueError("El modelado por lotes usa cursores del servidor: requiere PostgreSQL")
+    presentes = conteo_por(engine, 'id_entidad', anios, tabla, entidades)['id_entidad'].tolist()
+    if not presentes:
+        print("⚠️  No hay registros para modelar")
+        return {}
+    if por_entidad:
+        grupos = {f'entidad_{entidad}': [entidad] for entidad in presentes}
+    else:
+        nombre = 'todas' if entidades is None else 'entidades_' + '_'.join(str(e) for e in presentes)
+        grupos = {nombre: presentes}
+
+    crear_tabla_modelo(engine, n_componentes, tabla_modelo)
+    modelos = {}
+    for nombre, grupo in grupos.items():
+        print(f"\n🧮 Modelo {nombre}")
+        codificador = CodificadorRegistros.desde_tabla(engine, anios, grupo, tabla)
+        modelo = ModeloAccidentes(nombre, grupo, codificador, n_clusters, n_componentes, semilla, lote)
+        modelo.ajustar(engine, anios, tabla, epocas)
+        escribir_resultados(engine, modelo, anios, tabla, tabla_modelo)
+        modelos[nombre] = modelo
+    return modelos
@@ -0,0 +1,244 @@
+"""
+PROYECTO: Análisis de Accidentes de Tránsito en Hermosillo, Sonora
+Severidad por tipo de vehículo en una sola pasada
+
+El EDA filtraba el DataFrame completo una vez por vehículo (df[df[col] > 0])
+para sumar muertos y heridos, y repetía lo mismo en el análisis por causa y
+en las características del clustering. Aquí se construye una sola vez la
+matriz de involucramiento (registros x vehículos, 1 si el vehículo participó)
+y todas las métricas salen de productos matriciales y np.bincount sobre ella.
+
+Uso desde la libreta:
+    from severidad_vehiculos import severidad_por_vehiculo, analizar_vehiculo_causa
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "3PrepDatos"))
+from esquema_accidentes import COLUMNAS_MUERTOS, COLUMNAS_HERIDOS
+
+# Vehículos que analiza el EDA y sus nombres legibles
+COLUMNAS_VEHICULOS_EDA = ['automovil', 'campasaj', 'microbus', 'pascamion',
+                          'omnibus', 'camioneta', 'camion', 'motociclet',
+                          'bicicleta', 'otrovehic']
+
+NOMBRES_VEHICULOS = {
+    'automovil': 'Automóvil',
+    'campasaj': 'Camión de pasajeros chico',
+    'microbus': 'Microbús',
+    'pascamion': 'Camión de pasajeros grande',
+    'omnibus': 'Ómnibus',
+    'camioneta': 'Camioneta',
+    'camion': 'Camión',
+    'motociclet': 'Motocicleta',
+    'bicicleta': 'Bicicleta',
+    'otrovehic': 'Otro vehículo'
+}
+
+DIAS_FIN_SEMANA = ['Sábado', 'Domingo']
+
+
+# =============================================================================
+# MATRICES BASE
+# =============================================================================
+
+def _numerico(df, columnas):
+    """Columnas como matriz float64 (NaN donde falta el dato)"""
+    datos = df[columnas]
+    if not all(pd.api.types.is_numeric_dtype(t) for t in datos.dtypes):
+        datos = datos.apply(pd.to_numeric, errors='coerce')
+    return datos.to_numpy(dtype='float64', na_value=np.nan)
+
+
+def matriz_involucramiento(df, columnas=None):
+    """
+    Matriz (registros x vehículos) con 1 donde df[col] > 0.
+
+    Regresa (matriz int64, columnas presentes en df). Un NaN cuenta como
+    vehículo no involucrado, igual que el filtro df[col] > 0.
+    """
+    columnas = [c for c in (columnas or COLUMNAS_VEHICULOS_EDA) if c in df.columns]
+    with np.errstate(invalid='ignore'):
+        matriz = (_numerico(df, columnas) > 0).astype('int64')
+    return matriz, columnas
+
+
+def victimas_por_registro(df):
+    """(muertos, heridos) por accidente; un NaN no suma, como en pandas .sum()"""
+    muertos = np.nan_to_num(_numerico(df, COLUMNAS_MUERTOS)).sum(axis=1)
+    heridos = np.nan_to_num(_numerico(df, COLUMNAS_HERIDOS)).sum(axis=1)
+    return muertos, heridos
+
+
+# =============================================================================
+# MÉTRICAS POR VEHÍCULO
+# =============================================================================
+
+def metricas_vehiculo(df, columnas=None):
+    """
+    Métricas por vehículo calculadas en una pasada: accidentes, muertos,
+    heridos, accidentes fatales y sus tasas por cada 100 accidentes.
+    Índice: columna del vehículo, en el orden de `columnas`.
+    """
+    matriz, columnas = matriz_involucramiento(df, columnas)
+    muertos, heridos = victimas_por_registro(df)
+    fatal = (muertos > 0).astype('float64')
+
+    # Una sola multiplicación da las cuatro sumas para todos los vehículos
+    valores = np.column_stack([np.ones(len(df)), muertos, heridos, fatal])
+    sumas = matriz.T @ valores
+    return tabla_metricas(columnas, sumas)
+
+
+def tabla_metricas(columnas, sumas):
+    """
+    DataFrame de metricas_vehiculo a partir de las sumas por vehículo
+    (columnas: accidentes, muertos, heridos, accidentes fatales).
+    """
+    metricas = pd.DataFrame({
+        'accidentes': sumas[:, 0].astype('int64'),
+        'muertos': sumas[:, 1].astype('int64'),
+        'heridos': sumas[:, 2].astype('int64'),
+        'accidentes_fatales': sumas[:, 3].astype('int64'),
+    }, index=pd.Index(columnas, name='vehiculo'))
+    metricas['total_victimas'] = metricas['muertos'] + metricas['heridos']
+    with np.errstate(invalid='ignore', divide='ignore'):
+        metricas['tasa_mortalidad'] = metricas['muertos'] / metricas['accidentes'] * 100
+        metricas['tasa_lesiones'] = metricas['heridos'] / metricas['accidentes'] * 100
+        metricas['pct_accidentes_fatales'] = metricas['accidentes_fatales'] / metricas['accidentes'] * 100
+    return metricas
+
+
+def tabla_severidad(metricas):
+    """Tabla de severidad del EDA a partir de la salida de metricas_vehiculo"""
+    severidad_df = pd.DataFrame({
+        'Vehiculo': [NOMBRES_VEHICULOS.get(col, col) for col in metricas.index],
+        'Accidentes': metricas['accidentes'].to_numpy(),
+        'Muertos': metricas['muertos'].to_numpy(),
+        'Heridos': metricas['heridos'].to_numpy(),
+        'Total_Victimas': metricas['total_victimas'].to_numpy(),
+    })
+    severidad_df = severidad_df.sort_values('Total_Victimas', ascending=False)
+    severidad_df['Tasa_Mortalidad'] = (severidad_df['Muertos'] / severidad_df['Accidentes'] * 100).round(2)
+    severidad_df['Tasa_Lesiones'] = (severidad_df['Heridos'] / severidad_df['Accidentes'] * 100).round(2)
+    return severidad_df
+
+
+def severidad_por_vehiculo(df, columnas=None):
+    """
+    Tabla de severidad por vehículo del EDA (Vehiculo, Accidentes, Muertos,
+    Heridos, Total_Victimas, Tasa_Mortalidad, Tasa_Lesiones), ordenada por
+    total de víctimas.
+    """
+    return tabla_severidad(metricas_vehiculo(df, columnas))
+
+
+def tabla_caracteristicas(columnas, sumas, maximo):
+    """
+    Matriz de características a partir de las sumas por vehículo (registros,
+    muertos, heridos, fatales, víctimas, noche, fin de semana) y del máximo
+    de víctimas en un accidente (NaN si el vehículo no aparece).
+    """
+    accidentes = sumas[:, 0]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        caracteristicas_df = pd.DataFrame({
+            'vehiculo': [NOMBRES_VEHICULOS.get(col, col) for col in columnas],
+            'total_accidentes': accidentes.astype('int64'),
+            'tasa_mortalidad': sumas[:, 1] / accidentes * 100,
+            'tasa_lesiones': sumas[:, 2] / accidentes * 100,
+            'pct_accidentes_fatales': sumas[:, 3] / accidentes * 100,
+            'promedio_victimas': sumas[:, 4] / accidentes,
+            'max_victimas': maximo,
+            'pct_noche': sumas[:, 5] / accidentes * 100,
+            'pct_fin_semana': sumas[:, 6] / accidentes * 100,
+        })
+    return caracteristicas_df.set_index('vehiculo')
+
+
+def caracteristicas_vehiculos(df, columnas=None):
+    """
+    Matriz de características por vehículo para clustering/PCA (mismas
+    columnas que construía el EDA), indexada por nombre legible.
+    """
+    matriz, columnas = matriz_involucramiento(df, columnas)
+    muertos, heridos = victimas_por_registro(df)
+    victimas = muertos + heridos
+
+    hora = pd.to_numeric(df['id_hora'], errors='coerce').to_numpy(dtype='float64')
+    noche = ((hora >= 20) | (hora <= 6)).astype('float64')
+    fin_semana = df['diasemana'].isin(DIAS_FIN_SEMANA).to_numpy(dtype='float64')
+
+    valores = np.column_stack([np.ones(len(df)), muertos, heridos, muertos > 0,
+                               victimas, noche, fin_semana]).astype('float64')
+    sumas = matriz.T @ valores
+    accidentes = sumas[:, 0]
+
+    # El máximo no sale de un producto: víctimas >= 0, así que basta con
+    # anular las filas donde el vehículo no participó
+    maximo = (matriz * victimas[:, None]).max(axis=0, initial=0)
+    maximo = np.where(accidentes > 0, maximo, np.nan)
+
+    return tabla_caracteristicas(columnas, sumas, maximo)
+
+
+# =============================================================================
+# MÉTRICAS VEHÍCULO x CAUSA
+# =============================================================================
+
+def metricas_vehiculo_causa(df, columnas=None):
+    """
+    Métricas por (vehículo, causaacci) para todos los vehículos a la vez.
+
+    Cada par (registro, vehículo involucrado) se convierte en un índice
+    causa * n_vehiculos + vehiculo y las sumas salen de np.bincount. Los
+    registros sin causa se descartan, como en groupby('causaacci').
+    """
+    matriz, columnas = matriz_involucramiento(df, columnas)
+    muertos, heridos = victimas_por_registro(df)
+    codigos, causas = pd.factorize(df['causaacci'], sort=True)
+
+    filas, vehiculos = np.nonzero(matriz)
+    con_causa = codigos[filas] >= 0
+    filas, vehiculos = filas[con_causa], vehiculos[con_causa]
+    indice = codigos[filas] * len(columnas) + vehiculos
+    n_celdas = len(causas) * len(columnas)
+
+    def suma(pesos=None):
+        conteo = np.bincount(indice, weights=pesos, minlength=n_celdas)
+        return conteo.reshape(len(causas), len(columnas)).T.ravel()
+
+    muertos_f, heridos_f = muertos[filas], heridos[filas]
+    metricas = pd.DataFrame({
+        'accidentes': suma().astype('int64'),
+        'total_muertos': suma(muertos_f).astype('int64'),
+        'total_heridos': suma(heridos_f).astype('int64'),
+        'total_victimas': suma(muertos_f + heridos_f).astype('int64'),
+        'es_fatal': suma((muertos_f > 0).astype('float64')).astype('int64'),
+    }, index=pd.MultiIndex.from_product([columnas, causas], names=['vehiculo', 'causaacci']))
+    return completar_metricas_causa(metricas)
+
+
+def completar_metricas_causa(metricas):
+    """Descarta las parejas sin accidentes y agrega las tasas por cada 100 accidentes"""
+    metricas = metricas[metricas['accidentes'] > 0]
+    metricas['tasa_mortalidad'] = (metricas['total_muertos'] / metricas['accidentes'] * 100).round(2)
+    metricas['tasa_lesiones'] = (metricas['total_heridos'] / metricas['accidentes'] * 100).round(2)
+    return metricas
+
+
+def analizar_vehiculo_causa(df, col_vehiculo, top_n=10, min_accidentes=10, metricas=None):
+    """
+    Causas más mortales para un vehículo (misma tabla que la función del EDA).
+
+    Para analizar varios vehículos conviene calcular una vez
+    metricas_vehiculo_causa(df) y pasarla en `metricas`.
+    """
+    if metricas is None:
+        metricas = metricas_vehiculo_causa(df, [col_vehiculo])
+    analisis = metricas.xs(col_vehiculo, level='vehiculo')
+    analisis = analisis[analisis['accidentes'] >= min_accidentes]
+    return analisis.sort_values('tasa_mortalidad', ascending=False).head(top_n)
@@ -0,0 +1,148 @@
+"""
+PROYECTO: Análisis de Accidentes de Tránsito en Hermosillo, Sonora
+BENCHMARK: PostgreSQL vs DuckDB embebido
+
+Genera datos sintéticos (datos_sinteticos.py), los transforma una sola vez y
+carga con ellos cada backend desde cero (conectar_base_datos + cargar_datos,
+que incluye los resúmenes). De cada backend se mide:
+
+    carga       tiempo y memoria máxima de la carga completa
+    consultas   latencia de cada consulta de validación sobre la tabla completa
+                (mejor de --repeticiones); se verifica que los dos backends
+                den el mismo resultado
+    validar     validar_carga completa (resúmenes + conciliación)
+
+PostgreSQL es el de DB_CONFIG o, con --embebido, uno local que levanta el
+paquete pgserver; DuckDB es un archivo en la carpeta de trabajo.
+
+Uso (desde la raíz del proyecto):
+    python benchmarks/bench_backends.py --registros 250000 --todos --embebido
+"""
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+
+RAIZ = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.insert(0, os.path.join(RAIZ, "benchmarks"))
+from bench_pipeline import Etapa, base_desechable, connect_inegi, etl
+from datos_sinteticos import generar_csv
+from backends import leer_sql
+from resumenes import CONSULTAS_VALIDACION
+
+
+def preparar_datos(args):
+    """CSV sintéticos → tidy → extract → transform (una sola vez para los dos backends)"""
+    print(f"\n📦 Generando {args.registros:,} registros por año ({args.desde}-{args.hasta})...")
+    generar_csv(os.path.join("data", "raw", "inegi"), range(args.desde, args.hasta + 1),
+                args.registros, semilla=args.semilla)
+    etl.RANGO_ANIOS = (args.desde, args.hasta)
+    etl.ESQUEMA_BD = "plano"
+    if args.todos:
+        etl.OBJETIVOS = "todos"
+    with Etapa("tidy + extract + transform", not args.detalle):
+        connect_inegi.tidy_inegi_data(year_range=etl.RANGO_ANIOS, workers=args.workers)
+        return etl.transformar_datos(etl.extraer_datos())
+
+
+def medir_backend(backend, df, args):
+    """Carga df en el backend y mide consultas y validación; regresa (medición, resultados)"""
+    print(f"\n🗄️  {backend}")
+    etl.BACKEND_BD = backend
+    with Etapa("carga", not args.detalle) as carga:
+        engine = etl.conectar_base_datos(interactivo=False)
+        cargado = engine is not None and etl.cargar_datos(df, engine)
+    if not cargado:
+        sys.exit(f"❌ La carga en {backend} falló (revisa con --detalle)")
+
+    latencias, resultados = {}, {}
+    with engine.connect() as conn:
+        for nombre, (_, sql_tabla) in CONSULTAS_VALIDACION.items():
+            mejor = float("inf")
+            for _ in range(args.repeticiones):
+                inicio = time.perf_counter()
+                resultados[nombre] = leer_sql(conn, sql_tabla)
+                mejor = min(mejor, time.perf_counter() - inicio)
+            latencias[nombre] = mejor * 1000
+
+    with Etapa("validar", not args.detalle) as validar:
+        reporte = etl.validar_carga(engine)
+    engine.dispose()
+    if reporte is None or (reporte["estado"] == "falla").any():
+        sys.exit(f"❌ La validación en {backend} tiene fallas (revisa con --detalle)")
+
+    medicion = {"carga": carga.resultado, "validar": validar.resultado, "consultas_ms": latencias}
+    return medicion, resultados
+
+
+def _iguales(a, b):
+    a, b = (r.reset_index(drop=True).astype("int64", errors="ignore") for r in (a, b))
+    return list(a.columns) == list(b.columns) and a.equals(b)
+
+
+def reportar(mediciones, resultados, registros):
+    pg, duck = mediciones["postgres"], mediciones["duckdb"]
+    print("\n" + "=" * 80)
+    print(f"RESULTADOS ({registros:,} registros)")
+    print("=" * 80)
+    print(f"   {'':32} {'PostgreSQL':>12} {'DuckDB':>12} {'PG / DuckDB':>12}")
+    for etapa in ["carga", "validar"]:
+        a, b = pg[etapa]["segundos"], duck[etapa]["segundos"]
+        print(f"   {etapa + ' (s)':32} {a:12.2f} {b:12.2f} {a / b:12.1f}")
+    for etapa in ["carga", "validar"]:
+        a, b = pg[etapa]["pico_mb"], duck[etapa]["pico_mb"]
+        if a is not None and b is not None:
+            print(f"   {etapa + ' pico RSS (MB)':32} {a:12.1f} {b:12.1f}")
+    print(f"\n   {'consulta sobre la tabla (ms)':32} {'PostgreSQL':>12} {'DuckDB':>12} {'PG / DuckDB':>12}")
+    diferentes = []
+    for nombre, ms_pg in pg["consultas_ms"].items():
+        ms_duck = duck["consultas_ms"][nombre]
+        iguales = _iguales(resultados["postgres"][nombre], resultados["duckdb"][nombre])
+        if not iguales:
+            diferentes.append(nombre)
+        print(f"   {nombre:32} {ms_pg:12.1f} {ms_duck:12.1f} {ms_pg / ms_duck:12.1f}"
+              f"{'' if iguales else '   ❌ resultado distinto'}")
+    if diferentes:
+        print(f"\n❌ Resultados distintos entre backends: {diferentes}")
+        sys.exit(1)
+    print("\n✅ Las consultas dan el mismo resultado en los dos backends")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Carga y consultas: PostgreSQL vs DuckDB")
+    parser.add_argument("--registros", type=int, default=50_000, help="registros sintéticos por año")
+    parser.add_argument("--desde", type=int, default=2018)
+    parser.add_argument("--hasta", type=int, default=2024)
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=1, help="procesos del tidy")
+    parser.add_argument("--todos", action="store_true", help="cargar todas las entidades, no solo OBJETIVOS")
+    parser.add_argument("--embebido", action="store_true", help="PostgreSQL embebido (pgserver)")
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--trabajo", help="carpeta de trabajo (por defecto una temporal que se borra)")
+    parser.add_argument("--detalle", action="store_true", help="mostrar la salida de cada etapa")
+    args = parser.parse_args()
+
+    dir_trabajo = os.path.abspath(args.trabajo or tempfile.mkdtemp(prefix="bench_backends_"))
+    os.makedirs(dir_trabajo, exist_ok=True)
+    directorio_original = os.getcwd()
+    os.chdir(dir_trabajo)
+    try:
+        df = preparar_datos(args)
+        mediciones, resultados = {}, {}
+        with base_desechable(args.embebido, dir_trabajo):
+            mediciones["postgres"], resultados["postgres"] = medir_backend("postgres", df, args)
+        etl.DUCKDB_PATH = os.path.join(dir_trabajo, "accidentes_bench.duckdb")
+        mediciones["duckdb"], resultados["duckdb"] = medir_backend("duckdb", df, args)
+    finally:
+        os.chdir(directorio_original)
+        if args.trabajo is None:
+            shutil.rmtree(dir_trabajo, ignore_errors=True)
+
+    reportar(mediciones, resultados, len(df))
+
+
+if __name__ == "__main__":
+    main()
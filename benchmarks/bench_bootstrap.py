@@ -0,0 +1,145 @@
+"""
+PROYECTO: Análisis de Accidentes de Tránsito en Hermosillo, Sonora
+BENCHMARK: intervalos bootstrap vehículo x causa, ciclo por celda vs bootstrap_riesgo
+
+Genera datos sintéticos (datos_sinteticos.py), los transforma y calcula los
+intervalos de la tasa de mortalidad y del % de accidentes fatales de cada
+(vehículo, causaacci):
+
+    ingenuo      un ciclo por celda y por réplica, remuestreando los registros
+                 con rng.choice (se mide con --replicas-ingenuo y se extrapola)
+    lotes        intervalos_vehiculo_causa con 1 proceso y con --workers
+
+Verifica que los estimados coincidan con metricas_vehiculo_causa, que el
+resultado no dependa del número de procesos y que el error estándar
+bootstrap se acerque al analítico (desviación estándar / raíz de n).
+
+Uso (desde la raíz del proyecto):
+    python benchmarks/bench_bootstrap.py --registros 250000 --replicas 5000 --workers 4
+"""
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+
+import numpy as np
+
+RAIZ = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.insert(0, os.path.join(RAIZ, "benchmarks"))
+sys.path.insert(0, os.path.join(RAIZ, "4AnalisisExp"))
+from bench_backends import preparar_datos
+from severidad_vehiculos import matriz_involucramiento, victimas_por_registro, metricas_vehiculo_causa
+from bootstrap_riesgo import intervalos_vehiculo_causa, distribucion_por_celda, replicas_bootstrap, LOTE
+
+
+def muertos_por_celda(df):
+    """Muertos de cada accidente, agrupados por (vehículo, causaacci)"""
+    matriz, columnas = matriz_involucramiento(df)
+    muertos, _ = victimas_por_registro(df)
+    causas = df['causaacci'].to_numpy()
+    celdas = {}
+    for j, col in enumerate(columnas):
+        for causa in sorted(df['causaacci'].dropna().unique()):
+            filtro = (matriz[:, j] > 0) & (causas == causa)
+            if filtro.any():
+                celdas[(col, causa)] = muertos[filtro]
+    return celdas
+
+
+def bootstrap_ingenuo(celdas, replicas, semilla=0):
+    """Un remuestreo de los registros por celda y por réplica"""
+    rng = np.random.default_rng(semilla)
+    resultado = {}
+    for celda, muertos in celdas.items():
+        tasas = np.empty((replicas, 2))
+        for r in range(replicas):
+            muestra = rng.choice(muertos, size=len(muertos), replace=True)
+            tasas[r] = muestra.sum() / len(muestra) * 100, (muestra > 0).mean() * 100
+        resultado[celda] = tasas
+    return resultado
+
+
+def ee_analitico(n, valores, conteos):
+    """Error estándar de la media de muertos y de fatal (x100) en cada celda: (celdas, 2)"""
+    errores = []
+    for x in [valores, (valores > 0).astype('int64')]:
+        media = (x * conteos).sum(axis=1) / n
+        varianza = (conteos * (x - media[:, None]) ** 2).sum(axis=1) / n
+        errores.append(np.sqrt(varianza / n) * 100)
+    return np.column_stack(errores)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Intervalos bootstrap vehículo x causa")
+    parser.add_argument("--registros", type=int, default=50_000, help="registros sintéticos por año")
+    parser.add_argument("--desde", type=int, default=2018)
+    parser.add_argument("--hasta", type=int, default=2024)
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--todos", action="store_true", help="todas las entidades, no solo OBJETIVOS")
+    parser.add_argument("--replicas", type=int, default=5000)
+    parser.add_argument("--replicas-ingenuo", type=int, default=20,
+                        help="réplicas del ciclo por celda (se extrapola a --replicas)")
+    parser.add_argument("--lote", type=int, default=LOTE)
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="procesos del bootstrap")
+    parser.add_argument("--trabajo", help="carpeta de trabajo (por defecto una temporal que se borra)")
+    parser.add_argument("--detalle", action="store_true", help="mostrar la salida de cada etapa")
+    args = parser.parse_args()
+
+    dir_trabajo = os.path.abspath(args.trabajo or tempfile.mkdtemp(prefix="bench_bootstrap_"))
+    os.makedirs(dir_trabajo, exist_ok=True)
+    directorio_original = os.getcwd()
+    os.chdir(dir_trabajo)
+    try:
+        df = preparar_datos(argparse.Namespace(**dict(vars(args), workers=1)))
+    finally:
+        os.chdir(directorio_original)
+        if args.trabajo is None:
+            shutil.rmtree(dir_trabajo, ignore_errors=True)
+
+    celdas = muertos_por_celda(df)
+    print(f"\n🎲 {len(df):,} registros, {len(celdas)} celdas vehículo x causa, {args.replicas:,} réplicas")
+
+    inicio = time.perf_counter()
+    bootstrap_ingenuo(celdas, args.replicas_ingenuo, args.semilla)
+    t_ingenuo = (time.perf_counter() - inicio) / args.replicas_ingenuo * args.replicas
+
+    tiempos, resultados = {}, {}
+    for workers in sorted({1, args.workers}):
+        inicio = time.perf_counter()
+        resultados[workers] = intervalos_vehiculo_causa(df, args.replicas, lote=args.lote,
+                                                        workers=workers, semilla=args.semilla)
+        tiempos[workers] = time.perf_counter() - inicio
+    intervalos = resultados[1]
+
+    # Verificaciones
+    metricas = metricas_vehiculo_causa(df)
+    estimados_iguales = (intervalos.index.equals(metricas.index)
+                         and (intervalos['tasa_mortalidad'] == metricas['tasa_mortalidad']).all())
+    reproducible = all(r.equals(intervalos) for r in resultados.values())
+    _, n, valores, conteos = distribucion_por_celda(df)
+    ee_bootstrap = replicas_bootstrap(n, valores, conteos, args.replicas, args.lote, 1,
+                                      args.semilla).std(axis=0, ddof=1)
+    con_datos = (n >= 100) & (ee_analitico(n, valores, conteos)[:, 1] > 0)
+    desvio = np.abs(ee_bootstrap[con_datos] / ee_analitico(n, valores, conteos)[con_datos] - 1).max()
+    mb_lote = args.lote * len(n) * valores.shape[1] * 8 / 1024 ** 2
+
+    print("\n" + "=" * 80)
+    print(f"RESULTADOS ({len(df):,} registros, {len(celdas)} celdas, {args.replicas:,} réplicas)")
+    print("=" * 80)
+    print(f"   {f'Ciclo por celda (extrapolado de {args.replicas_ingenuo})':46}{t_ingenuo:10.2f} s")
+    for workers, segundos in tiempos.items():
+        print(f"   {f'Lotes de {args.lote}, {workers} proceso(s)':46}{segundos:10.2f} s"
+              f"   speedup x{t_ingenuo / segundos:,.0f}")
+    print(f"   {'Memoria por lote (muestras multinomiales)':46}{mb_lote:10.1f} MB")
+    print(f"\n   {'Estimados = metricas_vehiculo_causa':46}{'✓' if estimados_iguales else '❌'}")
+    print(f"   {f'Mismo resultado con 1 y {args.workers} proceso(s)':46}{'✓' if reproducible else '❌'}")
+    print(f"   {'Error estándar vs analítico (n >= 100)':46}máx. {desvio:.1%} de diferencia")
+    if not (estimados_iguales and reproducible):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
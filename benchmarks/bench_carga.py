@@ -0,0 +1,62 @@
+"""
+PROYECTO: Análisis de Accidentes de Tránsito en Hermosillo, Sonora
+BENCHMARK: carga con to_sql(chunksize=1000) vs COPY FROM STDIN
+
+Toma los registros ya cargados en accidentes_hermosillo y los vuelve a cargar
+en una tabla temporal de pruebas con ambos métodos, sobre los mismos datos.
+
+Uso (desde la raíz del proyecto, después de ejecutar el ETL):
+    python benchmarks/bench_carga.py
+"""
+
+import os
+import sys
+import time
+
+import pandas as pd
+from sqlalchemy import text
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "3PrepDatos"))
+from configuracion_bd import crear_motor
+from backends import leer_sql, es_duckdb
+from carga_copy import cargar_copy
+
+TABLA_BENCH = "accidentes_bench_carga"
+
+
+def reiniciar_tabla(engine):
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP TABLE IF EXISTS {TABLA_BENCH}"))
+        conn.execute(text(f"CREATE TABLE {TABLA_BENCH} (LIKE accidentes_hermosillo INCLUDING DEFAULTS)"))
+
+
+def main():
+    engine = crear_motor()
+    if es_duckdb(engine):
+        print("❌ to_sql vs COPY FROM STDIN solo aplica a PostgreSQL (ACCIDENTES_BACKEND=postgres)")
+        return
+    with engine.connect() as conn:
+        df = leer_sql(conn, "SELECT * FROM accidentes_hermosillo").drop(columns=["id"])
+    print(f"📊 Registros de prueba: {len(df):,}")
+
+    reiniciar_tabla(engine)
+    inicio = time.perf_counter()
+    df.to_sql(TABLA_BENCH, engine, if_exists="append", index=False, chunksize=1000)
+    t_to_sql = time.perf_counter() - inicio
+    print(f"✓ to_sql: {len(df):,} registros en {t_to_sql:.2f} s ({len(df) / t_to_sql:,.0f} registros/s)")
+
+    reiniciar_tabla(engine)
+    _, t_copy = cargar_copy(df, engine, TABLA_BENCH)
+
+    with engine.begin() as conn:
+        cargados = conn.execute(text(f"SELECT COUNT(*) FROM {TABLA_BENCH}")).scalar()
+        conn.execute(text(f"DROP TABLE {TABLA_BENCH}"))
+
+    print("\n" + "="*80)
+    print(f"   to_sql(chunksize=1000): {t_to_sql:8.2f} s")
+    print(f"   COPY FROM STDIN:        {t_copy:8.2f} s   speedup x{t_to_sql / t_copy:.1f}")
+    print(f"   Registros verificados en la tabla de prueba: {cargados:,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+PROYECTO: Análisis de Accidentes de Tránsito en Hermosillo, Sonora
+BENCHMARK: agregados del EDA en pandas vs consultas_agregadas (en el servidor)
+
+La versión pandas lee la tabla completa con pd.read_sql y agrupa en la
+libreta, como EDA.ipynb; la versión SQL manda una consulta de agregación por
+análisis y solo recibe el resultado. Se verifica que los resultados sean
+idénticos y se reportan los tiempos.
+
+Uso (desde la raíz del proyecto, después de ejecutar el ETL):
+    python benchmarks/bench_consultas.py
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+RAIZ = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(RAIZ, "3PrepDatos"))
+sys.path.insert(0, os.path.join(RAIZ, "4AnalisisExp"))
+from configuracion_bd import crear_motor
+from backends import leer_sql
+import severidad_vehiculos as sv
+import consultas_agregadas as ca
+
+DIMENSIONES = ["anio", "mes", "diasemana", "id_hora"]
+
+
+def en_pandas(engine):
+    """Los mismos análisis tal como los hace la libreta"""
+    with engine.connect() as conn:
+        df = leer_sql(conn, "SELECT * FROM accidentes_hermosillo")
+    resultados = {dim: df.groupby(dim).size().reset_index(name="cantidad") for dim in DIMENSIONES}
+    for col in ["causaacci", "tipaccid"]:
+        conteo = df[col].value_counts().reset_index()
+        conteo.columns = [col, "cantidad"]
+        resultados[col] = conteo
+
+    victimas = df[sv.COLUMNAS_MUERTOS + sv.COLUMNAS_HERIDOS].sum(axis=1, skipna=False)
+    niveles = pd.cut(victimas, bins=[-1, 0, 1, 3, np.inf],
+                     labels=["Sin víctimas", "Leve", "Moderado", "Grave"])
+    resultados["niveles"] = niveles.rename("nivel_severidad").value_counts()
+
+    resultados["severidad"] = sv.severidad_por_vehiculo(df)
+    resultados["caracteristicas"] = sv.caracteristicas_vehiculos(df)
+    resultados["vehiculo_causa"] = sv.metricas_vehiculo_causa(df)
+    return resultados
+
+
+def en_sql(engine):
+    resultados = {dim: ca.conteo_por(engine, dim) for dim in DIMENSIONES}
+    for col in ["causaacci", "tipaccid"]:
+        resultados[col] = ca.conteo_valores(engine, col)
+    resultados["niveles"] = ca.niveles_severidad(engine)
+    resultados["severidad"] = ca.severidad_por_vehiculo(engine)
+    resultados["caracteristicas"] = ca.caracteristicas_vehiculos(engine)
+    resultados["vehiculo_causa"] = ca.matriz_vehiculo_causa(engine)
+    return resultados
+
+
+def verificar(pandas_res, sql_res):
+    for nombre, esperado in pandas_res.items():
+        obtenido = sql_res[nombre]
+        if nombre in ("causaacci", "tipaccid"):
+            # value_counts no garantiza el orden de los empates
+            esperado = esperado.sort_values([nombre]).sort_values("cantidad", ascending=False, kind="stable")
+            esperado = esperado.reset_index(drop=True)
+        if isinstance(esperado, pd.Series):
+            pd.testing.assert_series_equal(esperado, obtenido, check_dtype=False,
+                                           check_categorical=False, check_index_type=False)
+        else:
+            pd.testing.assert_frame_equal(esperado, obtenido, check_dtype=False)
+
+
+def medir(funcion, engine, repeticiones=3):
+    """Mejor tiempo (s) de `repeticiones` ejecuciones y el último resultado"""
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion(engine)
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor, resultado
+
+
+def main():
+    engine = crear_motor()
+    t_pandas, res_pandas = medir(en_pandas, engine)
+    t_sql, res_sql = medir(en_sql, engine)
+
+    verificar(res_pandas, res_sql)
+    print(f"✅ {len(res_pandas)} análisis idénticos a la versión en pandas")
+
+    print("\n" + "="*80)
+    print(f"   read_sql de la tabla + pandas: {t_pandas:8.3f} s")
+    print(f"   Agregados en el servidor:      {t_sql:8.3f} s   speedup x{t_pandas / t_sql:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""
+PROYECTO: Análisis de Accidentes de Tránsito en Hermosillo, Sonora
+BENCHMARK: cubo de accidentes precalculado vs groupby sobre los registros
+
+Genera datos sintéticos (datos_sinteticos.py), los transforma, construye el
+cubo (cubo_accidentes.py) y mide:
+
+    construcción    actualizar_cubo con todos los años, desde cero
+    recarga         actualizar_cubo de un solo año (solo escribe sus archivos)
+    consultas       cada corte del EDA con df.groupby (muertos y heridos ya
+                    sumados por registro, vehículos ya expandidos) y con el
+                    cubo: primera consulta (lee los archivos que necesita),
+                    siguientes (consultar → DataFrame, rebanada → arreglo); se
+                    verifica que den el mismo resultado
+
+Uso (desde la raíz del proyecto):
+    python benchmarks/bench_cubo.py --registros 250000
+
+El cubo solo guarda las combinaciones observadas, así que su tamaño crece
+con los registros y no con el producto de las dimensiones.
+"""
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+
+import pandas as pd
+
+RAIZ = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.insert(0, os.path.join(RAIZ, "benchmarks"))
+from bench_backends import preparar_datos
+from cubo_accidentes import CuboAccidentes, actualizar_cubo, MEDIDAS
+from esquema_accidentes import COLUMNAS_VEHICULOS, COLUMNAS_MUERTOS, COLUMNAS_HERIDOS
+
+
+def consultas(anio, entidad):
+    """(nombre, por, filtros) de los cortes del EDA"""
+    return [
+        ("Accidentes por año", ['anio'], {}),
+        ("Accidentes por entidad y año", ['id_entidad', 'anio'], {}),
+        (f"Hora en la entidad {entidad}", ['id_hora'], {'id_entidad': entidad}),
+        ("Accidentes por mes", ['mes'], {}),
+        ("Accidentes por día de la semana", ['diasemana'], {}),
+        ("Accidentes por hora", ['id_hora'], {}),
+        ("Severidad por vehículo", ['vehiculo'], {}),
+        ("Vehículo × causa", ['vehiculo', 'causaacci'], {}),
+        ("Tipo de accidente por año", ['anio', 'tipaccid'], {}),
+        (f"Causa por mes en {anio}", ['mes', 'causaacci'], {'anio': anio}),
+        ("Hora × día, motocicleta", ['id_hora', 'diasemana'], {'vehiculo': 'motociclet'}),
+        ("Mes × hora × causa", ['mes', 'id_hora', 'causaacci'], {}),
+    ]
+
+
+# =============================================================================
+# REFERENCIA CON PANDAS
+# =============================================================================
+
+def registros_con_totales(df):
+    """Columnas del groupby: muertos, heridos y fatal por registro; y la versión por vehículo"""
+    columnas = ['id_entidad', 'anio', 'mes', 'diasemana', 'id_hora', 'causaacci', 'tipaccid']
+    base = df[columnas].copy()
+    base['muertos'] = df[COLUMNAS_MUERTOS].sum(axis=1).astype('int64')
+    base['heridos'] = df[COLUMNAS_HERIDOS].sum(axis=1).astype('int64')
+    base['fatal'] = (base['muertos'] > 0).astype('int64')
+    # Un accidente aparece una vez por vehículo involucrado
+    por_vehiculo = pd.concat([base[df[col] > 0].assign(vehiculo=col) for col in COLUMNAS_VEHICULOS],
+                             ignore_index=True)
+    return base, por_vehiculo
+
+
+def con_groupby(base, por_vehiculo, por, filtros):
+    datos = por_vehiculo if 'vehiculo' in por or 'vehiculo' in filtros else base
+    for dim, valor in filtros.items():
+        datos = datos[datos[dim] == valor]
+    return datos.groupby(por, observed=True).agg(
+        accidentes=('muertos', 'size'), muertos=('muertos', 'sum'),
+        heridos=('heridos', 'sum'), accidentes_fatales=('fatal', 'sum'))
+
+
+def _filas(resultado):
+    """Filas (etiquetas..., medidas...) como tipos de Python, para comparar"""
+    return [tuple(v.item() if hasattr(v, 'item') else v for v in fila)
+            for fila in resultado.reset_index().itertuples(index=False)]
+
+
+def mejor_de(funcion, repeticiones):
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor, resultado
+
+
+# =============================================================================
+# MEDICIÓN
+# =============================================================================
+
+def medir(df, ruta, args):
+    inicio = time.perf_counter()
+    actualizar_cubo(df, ruta)
+    construccion = time.perf_counter() - inicio
+
+    anio = int(df['anio'].max())
+    inicio = time.perf_counter()
+    actualizar_cubo(df[df['anio'] == anio], ruta, anios=[anio])
+    recarga = time.perf_counter() - inicio
+
+    base, por_vehiculo = registros_con_totales(df)
+    cubo = CuboAccidentes.abrir(ruta)
+    filas = []
+    for nombre, por, filtros in consultas(anio, int(df['id_entidad'].mode()[0])):
+        t_pandas, esperado = mejor_de(lambda: con_groupby(base, por_vehiculo, por, filtros),
+                                      args.repeticiones_pandas)
+        inicio = time.perf_counter()
+        obtenido = cubo.consultar(por, **filtros)
+        t_primera = time.perf_counter() - inicio
+        t_cubo, obtenido = mejor_de(lambda: cubo.consultar(por, **filtros), args.repeticiones)
+        t_arreglo, _ = mejor_de(lambda: cubo.rebanada(por, **filtros), args.repeticiones)
+        filas.append({
+            'consulta': nombre,
+            'grupos': len(esperado),
+            'ms_groupby': t_pandas * 1000,
+            'ms_primera': t_primera * 1000,
+            'us_consultar': t_cubo * 1e6,
+            'us_rebanada': t_arreglo * 1e6,
+            'iguales': _filas(esperado[MEDIDAS]) == _filas(obtenido),
+        })
+    return construccion, recarga, cubo, pd.DataFrame(filas)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cubo de accidentes vs groupby")
+    parser.add_argument("--registros", type=int, default=50_000, help="registros sintéticos por año")
+    parser.add_argument("--desde", type=int, default=2018)
+    parser.add_argument("--hasta", type=int, default=2024)
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=1, help="procesos del tidy")
+    parser.add_argument("--todos", action="store_true", help="todas las entidades, no solo OBJETIVOS")
+    parser.add_argument("--repeticiones", type=int, default=200)
+    parser.add_argument("--repeticiones-pandas", type=int, default=3)
+    parser.add_argument("--trabajo", help="carpeta de trabajo (por defecto una temporal que se borra)")
+    parser.add_argument("--detalle", action="store_true", help="mostrar la salida de cada etapa")
+    args = parser.parse_args()
+
+    dir_trabajo = os.path.abspath(args.trabajo or tempfile.mkdtemp(prefix="bench_cubo_"))
+    os.makedirs(dir_trabajo, exist_ok=True)
+    directorio_original = os.getcwd()
+    os.chdir(dir_trabajo)
+    try:
+        df = preparar_datos(args)
+        construccion, recarga, cubo, reporte = medir(df, os.path.join(dir_trabajo, "cubo"), args)
+    finally:
+        os.chdir(directorio_original)
+        if args.trabajo is None:
+            shutil.rmtree(dir_trabajo, ignore_errors=True)
+
+    print("\n" + "=" * 80)
+    print(f"RESULTADOS ({len(df):,} registros, cubo de {cubo.celdas:,} celdas, "
+          f"{cubo.bytes_en_disco() / 1024 ** 2:,.1f} MB)")
+    print("=" * 80)
+    print(f"   Construcción (todos los años):  {construccion:8.2f} s")
+    print(f"   Recarga de un año:              {recarga:8.2f} s")
+    print()
+    print(reporte.to_string(index=False, float_format=lambda x: f"{x:,.1f}"))
+    if not reporte['iguales'].all():
+        print("\n❌ El cubo no coincide con groupby en: "
+              f"{reporte.loc[~reporte['iguales'], 'consulta'].tolist()}")
+        sys.exit(1)
+    print("\n✅ Todas las consultas del cubo coinciden con groupby")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+PROYECTO: Análisis de Accidentes de Tránsito en Hermosillo, Sonora
+BENCHMARK: tabla plana vs esquema en estrella
+
+Copia los registros de la tabla plana accidentes_hermosillo (esquema public)
+a un esquema en estrella dentro del esquema 'estrella' de la misma base y
+compara el tamaño en disco y la latencia de GROUP BY causaacci / tipaccid.
+
+Uso (desde la raíz del proyecto, con ESQUEMA_BD = 'plano' ya cargado):
+    python benchmarks/bench_estrella.py
+"""
+
+import os
+import sys
+import time
+
+import pandas as pd
+from sqlalchemy import text
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "3PrepDatos"))
+from configuracion_bd import crear_motor
+from backends import leer_sql, es_duckdb
+from esquema_estrella import crear_esquema_estrella, cargar_estrella, reporte_tamanos, TABLA_HECHOS
+
+ESQUEMA = "estrella"
+REPETICIONES = 5
+
+
+def medir(engine, sql):
+    """Mejor tiempo (ms) de REPETICIONES ejecuciones de una consulta"""
+    mejor = float("inf")
+    with engine.connect() as conn:
+        for _ in range(REPETICIONES):
+            inicio = time.perf_counter()
+            conn.execute(text(sql)).fetchall()
+            mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor * 1000
+
+
+def main():
+    engine = crear_motor()
+    if es_duckdb(engine):
+        print("❌ El esquema en estrella solo existe en PostgreSQL (ACCIDENTES_BACKEND=postgres)")
+        return
+    with engine.connect() as conn:
+        df = leer_sql(conn, "SELECT * FROM public.accidentes_hermosillo").drop(columns=["id"])
+    print(f"📊 Registros de prueba: {len(df):,}")
+
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {ESQUEMA} CASCADE"))
+    crear_esquema_estrella(engine, ESQUEMA)
+    cargar_estrella(df, engine, esquema=ESQUEMA)
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("VACUUM ANALYZE public.accidentes_hermosillo"))
+        conn.execute(text(f"VACUUM ANALYZE {ESQUEMA}.{TABLA_HECHOS}"))
+
+    print("\n" + "="*80)
+    print("TAMAÑO EN DISCO")
+    print("="*80)
+    reporte_tamanos(engine, "public", ESQUEMA)
+
+    print("\n" + "="*80)
+    print(f"LATENCIA GROUP BY (mejor de {REPETICIONES})")
+    print("="*80)
+    for col in ["causaacci", "tipaccid"]:
+        plano = medir(engine, f"""
+            SELECT {col}, COUNT(*) FROM public.accidentes_hermosillo GROUP BY {col}""")
+        estrella = medir(engine, f"""
+            SELECT d.valor, t.cantidad
+            FROM (SELECT {col}_id, COUNT(*) AS cantidad
+                  FROM {ESQUEMA}.{TABLA_HECHOS} GROUP BY {col}_id) t
+            LEFT JOIN {ESQUEMA}.dim_{col} d ON d.id = t.{col}_id""")
+        print(f"   {col:<10} plano {plano:8.1f} ms   estrella {estrella:8.1f} ms   "
+              f"speedup x{plano / estrella:.1f}")
+
+
+if __name__ == "__main__":
+    main()
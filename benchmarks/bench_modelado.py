@@ -0,0 +1,137 @@
+"""
+PROYECTO: Análisis de Accidentes de Tránsito en Hermosillo, Sonora
+BENCHMARK: clustering y PCA por accidente, por lotes vs en memoria
+
+Genera datos sintéticos (datos_sinteticos.py), los transforma y los carga en
+PostgreSQL (cargar_datos). Después mide:
+
+    por lotes    modelar_accidentes (modelado_streaming.py): escalador,
+                 MiniBatchKMeans e IncrementalPCA con partial_fit sobre lotes
+                 del cursor del servidor, y escritura de clusters y
+                 componentes en modelado_accidentes
+    en memoria   la misma codificación sobre la tabla completa leída con
+                 pd.read_sql, con StandardScaler, KMeans y PCA
+
+y compara, para el primer modelo, las medias del escalador, la varianza
+explicada de la PCA y la inercia de k-means de las dos versiones. Por
+defecto se ajusta un solo modelo para todas las entidades cargadas, así que
+las dos versiones ven los mismos registros. La memoria es el incremento del
+RSS sobre el de antes de cada etapa.
+
+PostgreSQL es el de DB_CONFIG o, con --embebido, uno local que levanta el
+paquete pgserver.
+
+Uso (desde la raíz del proyecto):
+    python benchmarks/bench_modelado.py --registros 250000 --todos --embebido
+"""
+
+import os
+import gc
+import sys
+import shutil
+import argparse
+import tempfile
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+from sklearn.preprocessing import StandardScaler
+from sklearn.cluster import KMeans
+from sklearn.decomposition import PCA
+
+RAIZ = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.insert(0, os.path.join(RAIZ, "benchmarks"))
+sys.path.insert(0, os.path.join(RAIZ, "4AnalisisExp"))
+from bench_pipeline import Etapa, base_desechable, etl
+from bench_backends import preparar_datos
+from modelado_streaming import modelar_accidentes, COLUMNAS_LECTURA, TABLA_MODELO, LOTE
+
+
+def modelo_en_memoria(engine, modelo, args):
+    """Misma codificación y mismos modelos, con la tabla completa en memoria"""
+    entidades = ', '.join(str(e) for e in modelo.entidades)
+    df = pd.read_sql(f"SELECT {', '.join(COLUMNAS_LECTURA)} FROM accidentes_hermosillo "
+                     f"WHERE id_entidad IN ({entidades})", engine)
+    X = modelo.codificador.transformar(df)
+    escalador = StandardScaler().fit(X)
+    X = escalador.transform(X)
+    kmeans = KMeans(n_clusters=args.clusters, random_state=42, n_init=3).fit(X)
+    pca = PCA(n_components=args.componentes).fit(X)
+    return escalador, kmeans, pca, X
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Clustering y PCA por accidente: por lotes vs en memoria")
+    parser.add_argument("--registros", type=int, default=50_000, help="registros sintéticos por año")
+    parser.add_argument("--desde", type=int, default=2018)
+    parser.add_argument("--hasta", type=int, default=2024)
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=1, help="procesos del tidy")
+    parser.add_argument("--todos", action="store_true", help="cargar todas las entidades, no solo OBJETIVOS")
+    parser.add_argument("--embebido", action="store_true", help="PostgreSQL embebido (pgserver)")
+    parser.add_argument("--por-entidad", action="store_true",
+                        help="un modelo por entidad (se compara el primero); por defecto uno para todas")
+    parser.add_argument("--clusters", type=int, default=3)
+    parser.add_argument("--componentes", type=int, default=2)
+    parser.add_argument("--lote", type=int, default=LOTE)
+    parser.add_argument("--trabajo", help="carpeta de trabajo (por defecto una temporal que se borra)")
+    parser.add_argument("--detalle", action="store_true", help="mostrar la salida de cada etapa")
+    args = parser.parse_args()
+
+    dir_trabajo = os.path.abspath(args.trabajo or tempfile.mkdtemp(prefix="bench_modelado_"))
+    os.makedirs(dir_trabajo, exist_ok=True)
+    directorio_original = os.getcwd()
+    os.chdir(dir_trabajo)
+    try:
+        df = preparar_datos(args)
+        etl.BACKEND_BD = "postgres"
+        with base_desechable(args.embebido, dir_trabajo):
+            with Etapa("carga", not args.detalle):
+                engine = etl.conectar_base_datos(interactivo=False)
+                cargado = engine is not None and etl.cargar_datos(df, engine)
+            if not cargado:
+                sys.exit("❌ La carga falló (revisa con --detalle)")
+            registros = len(df)
+            del df
+            gc.collect()
+
+            with Etapa("modelado por lotes", not args.detalle) as por_lotes:
+                modelos = modelar_accidentes(engine, por_entidad=args.por_entidad, n_clusters=args.clusters,
+                                             n_componentes=args.componentes, lote=args.lote)
+            with engine.connect() as conn:
+                escritos = conn.execute(text(f"SELECT COUNT(*) FROM {TABLA_MODELO}")).scalar()
+            modelo = next(iter(modelos.values()))
+            with Etapa("modelado en memoria", not args.detalle) as en_memoria:
+                escalador, kmeans, pca, X = modelo_en_memoria(engine, modelo, args)
+            engine.dispose()
+    finally:
+        os.chdir(directorio_original)
+        if args.trabajo is None:
+            shutil.rmtree(dir_trabajo, ignore_errors=True)
+
+    diferencia_media = np.abs(modelo.escalador.mean_ - escalador.mean_).max()
+    varianza_lotes = modelo.pca.explained_variance_ratio_.sum()
+    varianza_memoria = pca.explained_variance_ratio_.sum()
+    inercia_lotes = -modelo.kmeans.score(X)
+
+    print("\n" + "=" * 80)
+    print(f"RESULTADOS ({registros:,} registros, {len(modelos)} modelo(s), lotes de {args.lote:,})")
+    print("=" * 80)
+    print(f"   {'':34} {'por lotes':>12} {'en memoria':>12}")
+    print(f"   {'tiempo (s)':34} {por_lotes.resultado['segundos']:12.2f} {en_memoria.resultado['segundos']:12.2f}")
+    if por_lotes.resultado["incremento_mb"] is not None:
+        print(f"   {'incremento RSS (MB)':34} {por_lotes.resultado['incremento_mb']:12.1f} "
+              f"{en_memoria.resultado['incremento_mb']:12.1f}")
+    print(f"\n   Primer modelo: {modelo.nombre} ({len(X):,} accidentes, {X.shape[1]} características)")
+    print(f"   {'varianza explicada por la PCA':34} {varianza_lotes:12.1%} {varianza_memoria:12.1%}")
+    print(f"   {'inercia de k-means':34} {inercia_lotes:12,.0f} {kmeans.inertia_:12,.0f}")
+    print(f"   {'máx. diferencia de medias':34} {diferencia_media:12.2e}")
+    print(f"\n   Filas en {TABLA_MODELO}: {escritos:,} de {registros:,}")
+    if escritos != registros:
+        print("\n❌ No se escribió un resultado por accidente")
+        sys.exit(1)
+    print("\n✅ Un cluster y sus componentes por accidente")
+
+
+if __name__ == "__main__":
+    main()
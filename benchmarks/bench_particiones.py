@@ -0,0 +1,103 @@
+"""
+PROYECTO: Análisis de Accidentes de Tránsito en Hermosillo, Sonora
+BENCHMARK: tabla plana con índices previos vs tabla particionada por año
+
+Carga los mismos registros en (a) una tabla plana con los índices de
+crear_tabla_accidentes ya creados y (b) una tabla particionada por anio con
+índices construidos después de cada COPY. Luego mide una consulta filtrada
+por año y mes en ambas.
+
+Uso (desde la raíz del proyecto, después de ejecutar el ETL):
+    python benchmarks/bench_particiones.py
+"""
+
+import os
+import sys
+import time
+
+import pandas as pd
+from sqlalchemy import text
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "3PrepDatos"))
+from configuracion_bd import crear_motor
+from backends import leer_sql, es_duckdb
+from esquema_accidentes import ddl_columnas
+from carga_copy import cargar_copy
+from particiones import crear_tabla_particionada, cargar_particionado
+
+TABLA_PLANA = "accidentes_bench_plano"
+TABLA_PARTICIONADA = "accidentes_bench_part"
+
+
+def crear_tabla_plana(engine):
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP TABLE IF EXISTS {TABLA_PLANA}"))
+        conn.execute(text(f"CREATE TABLE {TABLA_PLANA} ({ddl_columnas()})"))
+        for col in ["anio", "mes", "tipaccid", "causaacci"]:
+            conn.execute(text(f"CREATE INDEX ON {TABLA_PLANA}({col})"))
+
+
+CONSULTAS = {
+    "conteo de un mes": "SELECT COUNT(*), SUM(condmuerto) FROM {tabla} WHERE anio = :anio AND mes = 3",
+    "causas del año": """SELECT causaacci, COUNT(*) FROM {tabla} WHERE anio = :anio
+                         GROUP BY causaacci ORDER BY causaacci""",
+}
+
+
+def medir_consulta(engine, sql, anio, repeticiones=5):
+    """Mejor tiempo (ms) de una consulta filtrada por año y su resultado"""
+    mejor = float("inf")
+    with engine.connect() as conn:
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            resultado = conn.execute(text(sql), {"anio": anio}).fetchall()
+            mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor * 1000, [tuple(fila) for fila in resultado]
+
+
+def main():
+    engine = crear_motor()
+    if es_duckdb(engine):
+        print("❌ La tabla particionada solo existe en PostgreSQL (ACCIDENTES_BACKEND=postgres)")
+        return
+    with engine.connect() as conn:
+        df = leer_sql(conn, "SELECT * FROM accidentes_hermosillo").drop(columns=["id"])
+    print(f"📊 Registros de prueba: {len(df):,}")
+
+    crear_tabla_plana(engine)
+    inicio = time.perf_counter()
+    cargar_copy(df, engine, TABLA_PLANA)
+    t_plana = time.perf_counter() - inicio
+
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP TABLE IF EXISTS {TABLA_PARTICIONADA} CASCADE"))
+    crear_tabla_particionada(engine, TABLA_PARTICIONADA)
+    inicio = time.perf_counter()
+    cargar_particionado(df, engine, TABLA_PARTICIONADA)
+    t_part = time.perf_counter() - inicio
+
+    with engine.begin() as conn:
+        conn.execute(text(f"ANALYZE {TABLA_PLANA}"))
+    anio = int(df["anio"].max())
+    tiempos = {}
+    for nombre, sql in CONSULTAS.items():
+        ms_plana, res_plana = medir_consulta(engine, sql.format(tabla=TABLA_PLANA), anio)
+        ms_part, res_part = medir_consulta(engine, sql.format(tabla=TABLA_PARTICIONADA), anio)
+        tiempos[nombre] = (ms_plana, ms_part, res_plana == res_part)
+
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP TABLE {TABLA_PLANA}"))
+        conn.execute(text(f"DROP TABLE {TABLA_PARTICIONADA} CASCADE"))
+
+    print("\n" + "="*80)
+    print(f"   Carga, tabla plana con índices previos:    {t_plana:8.2f} s")
+    print(f"   Carga, particionada + índices posteriores: {t_part:8.2f} s   speedup x{t_plana / t_part:.1f}")
+    for nombre, (ms_plana, ms_part, iguales) in tiempos.items():
+        print(f"\n   Consulta '{nombre}' ({anio}):")
+        print(f"      plana:        {ms_plana:8.2f} ms")
+        print(f"      particionada: {ms_part:8.2f} ms   speedup x{ms_plana / ms_part:.1f}   "
+              f"mismo resultado: {iguales}")
+
+
+if __name__ == "__main__":
+    main()
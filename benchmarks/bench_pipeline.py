@@ -0,0 +1,317 @@
+"""
+PROYECTO: Análisis de Accidentes de Tránsito en Hermosillo, Sonora
+BENCHMARK: pipeline completo sobre datos sintéticos
+
+Genera CSV sintéticos con el formato de INEGI (datos_sinteticos.py) en una
+carpeta de trabajo temporal y ejecuta sobre ellos, etapa por etapa:
+
+    tidy      connect_inegi.tidy_inegi_data (ZIP -> dataset Parquet)
+    extract   ETL_postgreSQL.extraer_datos
+    transform ETL_postgreSQL.transformar_datos
+    load      ETL_postgreSQL.conectar_base_datos + cargar_datos
+    validar   ETL_postgreSQL.validar_carga
+
+De cada etapa se mide el tiempo y la memoria máxima (RSS del proceso y de
+sus procesos hijos). La carga va a una base de datos desechable que se
+borra al terminar: en el PostgreSQL de DB_CONFIG o, con --embebido, en un
+PostgreSQL local que levanta el paquete pgserver (pip install pgserver).
+
+Cada ejecución se agrega a benchmarks/resultados/bench_pipeline.jsonl y se
+compara con la última ejecución con los mismos parámetros, para que una
+regresión salte a la vista.
+
+Uso (desde la raíz del proyecto):
+    python benchmarks/bench_pipeline.py --registros 400000 --desde 2018 --hasta 2024 --embebido
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import threading
+import contextlib
+import subprocess
+from datetime import datetime
+
+RAIZ = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.insert(0, os.path.join(RAIZ, "2ConexionADatos"))
+sys.path.insert(0, os.path.join(RAIZ, "3PrepDatos"))
+sys.path.insert(0, os.path.join(RAIZ, "benchmarks"))
+import connect_inegi
+import ETL_postgreSQL as etl
+from datos_sinteticos import generar_csv
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+ARCHIVO_RESULTADOS = os.path.join(RAIZ, "benchmarks", "resultados", "bench_pipeline.jsonl")
+
+# Intervalo de muestreo de la memoria (s)
+INTERVALO_MEMORIA = 0.02
+
+# Una etapa se marca como regresión si empeora más de UMBRAL_REGRESION y
+# además más de lo mínimo absoluto (las etapas de milisegundos son puro ruido)
+UMBRAL_REGRESION = 0.10
+MINIMO_SEGUNDOS = 0.5
+MINIMO_MB = 50
+
+
+# =============================================================================
+# MEDICIÓN
+# =============================================================================
+
+def _rss_mb(proceso):
+    """RSS del proceso más el de sus hijos (los workers del tidy), en MB"""
+    total = proceso.memory_info().rss
+    for hijo in proceso.children(recursive=True):
+        try:
+            total += hijo.memory_info().rss
+        except psutil.Error:
+            pass
+    return total / 1e6
+
+
+class Etapa:
+    """
+    Mide tiempo y memoria máxima de un bloque `with`. La memoria se muestrea
+    en un hilo aparte con psutil; sin psutil se reporta None.
+    """
+
+    def __init__(self, nombre, silencio=True):
+        self.nombre = nombre
+        self.silencio = silencio
+        self.resultado = {}
+
+    def _muestrear(self, proceso):
+        while not self._fin.wait(INTERVALO_MEMORIA):
+            self._pico = max(self._pico, _rss_mb(proceso))
+
+    def __enter__(self):
+        print(f"   ⏱️  {self.nombre}...", flush=True)
+        self._hilo = None
+        if psutil is not None:
+            proceso = psutil.Process()
+            self._inicial = self._pico = _rss_mb(proceso)
+            self._fin = threading.Event()
+            self._hilo = threading.Thread(target=self._muestrear, args=(proceso,), daemon=True)
+            self._hilo.start()
+        self._salida = contextlib.redirect_stdout(io.StringIO()) if self.silencio else contextlib.nullcontext()
+        self._salida.__enter__()
+        self._inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        segundos = time.perf_counter() - self._inicio
+        self._salida.__exit__(*exc)
+        self.resultado = {"segundos": round(segundos, 3), "pico_mb": None, "incremento_mb": None}
+        if self._hilo is not None:
+            self._fin.set()
+            self._hilo.join()
+            self._pico = max(self._pico, _rss_mb(psutil.Process()))
+            self.resultado["pico_mb"] = round(self._pico, 1)
+            self.resultado["incremento_mb"] = round(self._pico - self._inicial, 1)
+        return False
+
+
+# =============================================================================
+# BASE DE DATOS DESECHABLE
+# =============================================================================
+
+@contextlib.contextmanager
+def base_desechable(embebido, dir_trabajo):
+    """
+    Apunta DB_CONFIG a una base nueva (accidentes_bench_<pid>) y la borra al
+    salir. Con `embebido` el servidor lo levanta pgserver dentro de la
+    carpeta de trabajo.
+    """
+    servidor = None
+    if embebido:
+        try:
+            import pgserver
+        except ImportError:
+            sys.exit("❌ --embebido requiere el paquete pgserver (pip install pgserver)")
+        servidor = pgserver.get_server(os.path.join(dir_trabajo, "pgdata"), cleanup_mode="stop")
+        info = servidor.get_postmaster_info()
+        host = str(info.socket_dir) if info.socket_dir is not None else (info.hostname or "localhost")
+        etl.DB_CONFIG.update(host=host, port=info.port or 5432, user="postgres", password="")
+    etl.DB_CONFIG["database"] = f"accidentes_bench_{os.getpid()}"
+
+    try:
+        yield etl.DB_CONFIG["database"]
+    finally:
+        conn = etl.psycopg2.connect(host=etl.DB_CONFIG["host"], port=etl.DB_CONFIG["port"],
+                                    user=etl.DB_CONFIG["user"], password=etl.DB_CONFIG["password"],
+                                    database="postgres")
+        conn.set_isolation_level(etl.ISOLATION_LEVEL_AUTOCOMMIT)
+        with conn.cursor() as cursor:
+            cursor.execute(f"DROP DATABASE IF EXISTS {etl.DB_CONFIG['database']}")
+        conn.close()
+        if servidor is not None:
+            servidor.cleanup()
+
+
+# =============================================================================
+# PIPELINE
+# =============================================================================
+
+def ejecutar_pipeline(args, dir_trabajo):
+    """Corre las etapas dentro de dir_trabajo y regresa {etapa: medición}"""
+    etapas = {}
+    anios = (args.desde, args.hasta)
+    silencio = not args.detalle
+
+    print(f"\n📦 Generando {args.registros:,} registros por año ({args.desde}-{args.hasta})...")
+    generar_csv(os.path.join("data", "raw", "inegi"), range(args.desde, args.hasta + 1),
+                args.registros, como_zip=not args.csv, semilla=args.semilla)
+
+    with Etapa("tidy", silencio) as etapa:
+        connect_inegi.tidy_inegi_data(year_range=anios, chunksize=args.chunksize,
+                                      workers=args.workers)
+    etapas["tidy"] = etapa.resultado
+
+    etl.RANGO_ANIOS = anios
+    etl.ESQUEMA_BD = args.esquema
+    if args.todos:
+        etl.OBJETIVOS = "todos"
+
+    with Etapa("extract", silencio) as etapa:
+        df = etl.extraer_datos()
+    etapas["extract"] = etapa.resultado
+    if df is None:
+        sys.exit("❌ La extracción no regresó datos (revisa con --detalle)")
+
+    with Etapa("transform", silencio) as etapa:
+        df_objetivos = etl.transformar_datos(df)
+    etapas["transform"] = etapa.resultado
+    del df
+
+    with base_desechable(args.embebido, dir_trabajo):
+        with Etapa("load", silencio) as etapa:
+            engine = etl.conectar_base_datos(interactivo=False)
+            cargado = engine is not None and etl.cargar_datos(df_objetivos, engine)
+        etapas["load"] = etapa.resultado
+        if not cargado:
+            sys.exit("❌ La carga falló (revisa con --detalle)")
+
+        with Etapa("validar", silencio) as etapa:
+            etl.validar_carga(engine)
+        etapas["validar"] = etapa.resultado
+        engine.dispose()
+
+    return etapas, len(df_objetivos)
+
+
+# =============================================================================
+# RESULTADOS
+# =============================================================================
+
+def _commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _anterior(parametros, archivo):
+    """Última ejecución registrada con los mismos parámetros (o None)"""
+    if not os.path.exists(archivo):
+        return None
+    anterior = None
+    with open(archivo, encoding="utf-8") as f:
+        for linea in f:
+            registro = json.loads(linea)
+            if registro.get("parametros") == parametros:
+                anterior = registro
+    return anterior
+
+
+def _cambio(actual, previo):
+    if actual is None or not previo:
+        return ""
+    return f"{(actual - previo) / previo:+7.1%}"
+
+
+def _es_regresion(actual, previo, minimo):
+    if actual is None or not previo:
+        return False
+    return actual - previo > max(previo * UMBRAL_REGRESION, minimo)
+
+
+def reportar(registro, anterior):
+    print("\n" + "="*80)
+    print(f"RESULTADOS ({registro['registros_cargados']:,} registros cargados)")
+    if anterior:
+        print(f"Comparado con la ejecución del {anterior['fecha']} ({anterior.get('commit')})")
+    print("="*80)
+    print(f"   {'etapa':<10} {'tiempo':>10} {'Δ':>8}   {'pico RSS':>11} {'Δ':>8}")
+    for nombre, medicion in registro["etapas"].items():
+        previo = (anterior or {}).get("etapas", {}).get(nombre, {})
+        pico = f"{medicion['pico_mb']:8.1f} MB" if medicion["pico_mb"] is not None else "        n/d"
+        regresion = (_es_regresion(medicion["segundos"], previo.get("segundos"), MINIMO_SEGUNDOS) or
+                     _es_regresion(medicion["pico_mb"], previo.get("pico_mb"), MINIMO_MB))
+        print(f"   {nombre:<10} {medicion['segundos']:8.2f} s "
+              f"{_cambio(medicion['segundos'], previo.get('segundos')):>8}   {pico} "
+              f"{_cambio(medicion['pico_mb'], previo.get('pico_mb')):>8}"
+              f"{'   ⚠️ regresión' if regresion else ''}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del pipeline completo con datos sintéticos")
+    parser.add_argument("--registros", type=int, default=50_000, help="registros sintéticos por año")
+    parser.add_argument("--desde", type=int, default=2018)
+    parser.add_argument("--hasta", type=int, default=2024)
+    parser.add_argument("--csv", action="store_true", help="CSV sueltos en vez de ZIP")
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=1, help="procesos del tidy")
+    parser.add_argument("--chunksize", type=int, default=connect_inegi.CHUNKSIZE_TIDY)
+    parser.add_argument("--esquema", choices=["plano", "estrella", "particionado"], default=etl.ESQUEMA_BD)
+    parser.add_argument("--todos", action="store_true", help="cargar todas las entidades, no solo OBJETIVOS")
+    parser.add_argument("--embebido", action="store_true", help="PostgreSQL embebido (pgserver)")
+    parser.add_argument("--trabajo", help="carpeta de trabajo (por defecto una temporal que se borra)")
+    parser.add_argument("--resultados", default=ARCHIVO_RESULTADOS)
+    parser.add_argument("--detalle", action="store_true", help="mostrar la salida de cada etapa")
+    args = parser.parse_args()
+
+    if psutil is None:
+        print("⚠️ psutil no está instalado: solo se medirán tiempos")
+
+    parametros = {clave: getattr(args, clave) for clave in
+                  ["registros", "desde", "hasta", "csv", "semilla", "workers", "chunksize",
+                   "esquema", "todos", "embebido"]}
+    dir_trabajo = os.path.abspath(args.trabajo or tempfile.mkdtemp(prefix="bench_pipeline_"))
+    os.makedirs(dir_trabajo, exist_ok=True)
+    directorio_original = os.getcwd()
+    os.chdir(dir_trabajo)
+    try:
+        etapas, registros_cargados = ejecutar_pipeline(args, dir_trabajo)
+    finally:
+        os.chdir(directorio_original)
+        if args.trabajo is None:
+            shutil.rmtree(dir_trabajo, ignore_errors=True)
+
+    registro = {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "commit": _commit(),
+        "parametros": parametros,
+        "registros_cargados": registros_cargados,
+        "etapas": etapas,
+    }
+    archivo = os.path.abspath(args.resultados)
+    anterior = _anterior(parametros, archivo)
+    os.makedirs(os.path.dirname(archivo), exist_ok=True)
+    with open(archivo, "a", encoding="utf-8") as f:
+        f.write(json.dumps(registro, ensure_ascii=False) + "\n")
+
+    reportar(registro, anterior)
+    print(f"\n💾 Resultado agregado a {archivo}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+"""
+PROYECTO: Análisis de Accidentes de Tránsito en Hermosillo, Sonora
+BENCHMARK: consultas de validación sobre la tabla completa vs resúmenes
+
+Verifica que cada consulta de validar_carga dé el mismo resultado leyendo de
+las tablas de resumen que de accidentes_hermosillo y compara su latencia.
+
+Uso (desde la raíz del proyecto, después de ejecutar el ETL):
+    python benchmarks/bench_resumenes.py
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "3PrepDatos"))
+from configuracion_bd import crear_motor
+from resumenes import comparar_resumenes
+
+
+def main():
+    engine = crear_motor()
+    reporte = comparar_resumenes(engine)
+    print("="*80)
+    print("LATENCIA: TABLA COMPLETA vs RESÚMENES (mejor de 5, ms)")
+    print("="*80)
+    print(reporte.to_string(index=False))
+    if not reporte['iguales'].all():
+        print("\n❌ Hay consultas cuyo resultado difiere entre tabla y resumen")
+        sys.exit(1)
+    print("\n✅ Todas las consultas coinciden")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+PROYECTO: Análisis de Accidentes de Tránsito en Hermosillo, Sonora
+BENCHMARK: severidad por vehículo con ciclos del EDA vs severidad_vehiculos
+
+Ejecuta los ciclos originales de la libreta (un filtro df[df[col] > 0] por
+vehículo) y las funciones vectorizadas sobre los mismos datos, verifica que
+los resultados coincidan y reporta los tiempos.
+
+Uso (desde la raíz del proyecto, después de ejecutar el ETL):
+    python benchmarks/bench_severidad.py
+"""
+
+import os
+import sys
+import time
+
+import pandas as pd
+
+RAIZ = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(RAIZ, "3PrepDatos"))
+sys.path.insert(0, os.path.join(RAIZ, "4AnalisisExp"))
+from configuracion_bd import crear_motor
+from backends import leer_sql
+from severidad_vehiculos import (COLUMNAS_VEHICULOS_EDA, NOMBRES_VEHICULOS,
+                                 severidad_por_vehiculo, caracteristicas_vehiculos,
+                                 metricas_vehiculo_causa, analizar_vehiculo_causa)
+
+
+# =============================================================================
+# VERSIÓN ORIGINAL (tal como estaba en EDA.ipynb)
+# =============================================================================
+
+def agregar_totales(df):
+    df['total_muertos'] = (df['condmuerto'] + df['pasamuerto'] + df['peatmuerto'] +
+                           df['ciclmuerto'] + df['otromuerto'])
+    df['total_heridos'] = (df['condherido'] + df['pasaherido'] + df['peatherido'] +
+                           df['ciclherido'] + df['otroherido'])
+    df['total_victimas'] = df['total_muertos'] + df['total_heridos']
+    df['es_fatal'] = (df['total_muertos'] > 0).astype(int)
+
+
+def severidad_original(df):
+    severidad_vehiculos = []
+    for col in COLUMNAS_VEHICULOS_EDA:
+        if col in df.columns:
+            df_vehiculo = df[df[col] > 0]
+            total_muertos = (df_vehiculo['condmuerto'].sum() + df_vehiculo['pasamuerto'].sum() +
+                             df_vehiculo['peatmuerto'].sum() + df_vehiculo['ciclmuerto'].sum() +
+                             df_vehiculo['otromuerto'].sum())
+            total_heridos = (df_vehiculo['condherido'].sum() + df_vehiculo['pasaherido'].sum() +
+                             df_vehiculo['peatherido'].sum() + df_vehiculo['ciclherido'].sum() +
+                             df_vehiculo['otroherido'].sum())
+            severidad_vehiculos.append({
+                'Vehiculo': NOMBRES_VEHICULOS[col],
+                'Accidentes': len(df_vehiculo),
+                'Muertos': int(total_muertos),
+                'Heridos': int(total_heridos),
+                'Total_Victimas': int(total_muertos + total_heridos)
+            })
+    severidad_df = pd.DataFrame(severidad_vehiculos)
+    severidad_df = severidad_df.sort_values('Total_Victimas', ascending=False)
+    severidad_df['Tasa_Mortalidad'] = (severidad_df['Muertos'] / severidad_df['Accidentes'] * 100).round(2)
+    severidad_df['Tasa_Lesiones'] = (severidad_df['Heridos'] / severidad_df['Accidentes'] * 100).round(2)
+    return severidad_df
+
+
+def vehiculo_causa_original(df, col_vehiculo, top_n=10):
+    df_vehiculo = df[df[col_vehiculo] > 0].copy()
+    analisis = df_vehiculo.groupby('causaacci').agg({
+        'causaacci': 'count',
+        'total_muertos': 'sum',
+        'total_heridos': 'sum',
+        'total_victimas': 'sum',
+        'es_fatal': 'sum'
+    }).rename(columns={'causaacci': 'accidentes'})
+    analisis['tasa_mortalidad'] = (analisis['total_muertos'] / analisis['accidentes'] * 100).round(2)
+    analisis['tasa_lesiones'] = (analisis['total_heridos'] / analisis['accidentes'] * 100).round(2)
+    analisis = analisis[analisis['accidentes'] >= 10]
+    return analisis.sort_values('tasa_mortalidad', ascending=False).head(top_n)
+
+
+def caracteristicas_original(df):
+    caracteristicas = []
+    for col in COLUMNAS_VEHICULOS_EDA:
+        if col in df.columns:
+            df_vehiculo = df[df[col] > 0]
+            caracteristicas.append({
+                'vehiculo': NOMBRES_VEHICULOS[col],
+                'total_accidentes': len(df_vehiculo),
+                'tasa_mortalidad': (df_vehiculo['total_muertos'].sum() / len(df_vehiculo) * 100),
+                'tasa_lesiones': (df_vehiculo['total_heridos'].sum() / len(df_vehiculo) * 100),
+                'pct_accidentes_fatales': (df_vehiculo['es_fatal'].sum() / len(df_vehiculo) * 100),
+                'promedio_victimas': df_vehiculo['total_victimas'].mean(),
+                'max_victimas': df_vehiculo['total_victimas'].max(),
+                'pct_noche': ((df_vehiculo['id_hora'] >= 20) | (df_vehiculo['id_hora'] <= 6)).sum() / len(df_vehiculo) * 100,
+                'pct_fin_semana': (df_vehiculo['diasemana'].isin(['Sábado', 'Domingo'])).sum() / len(df_vehiculo) * 100,
+            })
+    return pd.DataFrame(caracteristicas).set_index('vehiculo')
+
+
+def original(df):
+    df = df.copy()
+    agregar_totales(df)
+    severidad = severidad_original(df)
+    causas = {col: vehiculo_causa_original(df, col) for col in COLUMNAS_VEHICULOS_EDA}
+    return severidad, causas, caracteristicas_original(df)
+
+
+def vectorizado(df):
+    severidad = severidad_por_vehiculo(df)
+    metricas = metricas_vehiculo_causa(df)
+    causas = {col: analizar_vehiculo_causa(df, col, metricas=metricas) for col in COLUMNAS_VEHICULOS_EDA}
+    return severidad, causas, caracteristicas_vehiculos(df)
+
+
+def medir(funcion, df, repeticiones=3):
+    """Mejor tiempo (s) de `repeticiones` ejecuciones y el último resultado"""
+    mejor = float('inf')
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion(df)
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor, resultado
+
+
+def main():
+    engine = crear_motor()
+    with engine.connect() as conn:
+        df = leer_sql(conn, "SELECT * FROM accidentes_hermosillo")
+    print(f"📊 Registros: {len(df):,}")
+
+    t_original, (sev_o, causas_o, car_o) = medir(original, df)
+    t_vector, (sev_v, causas_v, car_v) = medir(vectorizado, df)
+
+    pd.testing.assert_frame_equal(sev_o.reset_index(drop=True), sev_v.reset_index(drop=True),
+                                  check_dtype=False)
+    for col in COLUMNAS_VEHICULOS_EDA:
+        pd.testing.assert_frame_equal(causas_o[col], causas_v[col], check_dtype=False)
+    pd.testing.assert_frame_equal(car_o, car_v, check_dtype=False)
+    print("✅ Resultados idénticos a los ciclos del EDA")
+
+    print("\n" + "="*80)
+    print(f"   Ciclos por vehículo (EDA): {t_original:8.3f} s")
+    print(f"   Una sola pasada:           {t_vector:8.3f} s   speedup x{t_original / t_vector:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+PROYECTO: Análisis de Accidentes de Tránsito en Hermosillo, Sonora
+BENCHMARK: tidy_inegi_data secuencial vs pool de procesos
+
+Compara el camino original (lectura completa con inferencia de tipos) contra
+el plan de tipos declarado con 1 proceso y con N procesos.
+
+Uso (desde la raíz del proyecto, con el ZIP o los CSV de INEGI disponibles):
+    python benchmarks/bench_tidy.py --workers 8
+"""
+
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "2ConexionADatos"))
+import connect_inegi
+
+
+def medir(**kwargs):
+    """Tiempo de pared (s) de una ejecución de tidy_inegi_data."""
+    inicio = time.perf_counter()
+    connect_inegi.tidy_inegi_data(**kwargs)
+    return time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de tidy_inegi_data")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunksize", type=int, default=connect_inegi.CHUNKSIZE_TIDY)
+    parser.add_argument("--desde", type=int, default=2018)
+    parser.add_argument("--hasta", type=int, default=2024)
+    args = parser.parse_args()
+
+    year_range = (args.desde, args.hasta)
+    tiempos = {
+        "secuencial (original)": medir(year_range=year_range),
+        "plan de tipos, 1 proceso": medir(year_range=year_range, chunksize=args.chunksize,
+                                          workers=1),
+        f"plan de tipos, {args.workers} procesos": medir(year_range=year_range,
+                                                         chunksize=args.chunksize,
+                                                         workers=args.workers),
+    }
+
+    base = tiempos["secuencial (original)"]
+    print("\n" + "="*80)
+    print("RESULTADOS tidy_inegi_data")
+    print("="*80)
+    for nombre, segundos in tiempos.items():
+        print(f"   {nombre:<32} {segundos:8.2f} s   speedup x{base / segundos:5.2f}")
+
+
+if __name__ == "__main__":
+    main()
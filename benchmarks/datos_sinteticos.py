@@ -0,0 +1,249 @@
+"""
+PROYECTO: Análisis de Accidentes de Tránsito en Hermosillo, Sonora
+Generador de CSV sintéticos con el formato de INEGI (ATUS)
+
+Escribe atus_anual_<año>.csv con las mismas columnas que los archivos de
+INEGI y valores con distribuciones plausibles (entidades con peso parecido
+al real, municipio principal dominante, horas con pico por la tarde,
+vehículos y víctimas consistentes con CLASACC, un pequeño porcentaje de
+renglones duplicados). Sirve para medir el pipeline sin la descarga
+nacional. Los registros se generan y escriben por bloques, así que se puede
+pasar de la escala nacional sin que la memoria crezca.
+
+Uso (desde la raíz del proyecto):
+    python benchmarks/datos_sinteticos.py --registros 400000 --desde 2018 --hasta 2024 \\
+        --destino data/raw/inegi --zip
+"""
+
+import io
+import os
+import sys
+import time
+import zipfile
+import argparse
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "3PrepDatos"))
+from esquema_accidentes import columnas_tabla, COLUMNAS_MUERTOS, COLUMNAS_HERIDOS
+
+# Registros por año de la base nacional de INEGI (orden de magnitud)
+ESCALA_NACIONAL = 400_000
+
+# Registros generados y escritos a la vez
+LOTE_GENERACION = 200_000
+
+# Columnas del CSV de INEGI, en su orden ('año' la agrega connect_inegi)
+COLUMNAS_CSV = [nombre.upper() for nombre in columnas_tabla() if nombre != 'año']
+
+DIAS_SEMANA = ['Lunes', 'Martes', 'Miércoles', 'Jueves', 'Viernes', 'Sábado', 'Domingo']
+
+# Municipios por entidad y peso aproximado de cada entidad en la base nacional
+MUNICIPIOS = {
+    1: 11, 2: 7, 3: 5, 4: 13, 5: 38, 6: 10, 7: 124, 8: 67, 9: 16, 10: 39, 11: 46,
+    12: 85, 13: 84, 14: 125, 15: 125, 16: 113, 17: 36, 18: 20, 19: 51, 20: 570,
+    21: 217, 22: 18, 23: 11, 24: 58, 25: 20, 26: 72, 27: 17, 28: 43, 29: 60,
+    30: 212, 31: 106, 32: 58,
+}
+PESO_ENTIDAD = {
+    1: 3, 2: 4, 3: 2, 4: 1, 5: 6, 6: 2, 7: 2, 8: 9, 9: 4, 10: 2, 11: 6, 12: 2,
+    13: 2, 14: 9, 15: 3, 16: 3, 17: 2, 18: 1, 19: 19, 20: 1, 21: 2, 22: 3,
+    23: 2, 24: 2, 25: 3, 26: 5, 27: 1, 28: 4, 29: 1, 30: 4, 31: 3, 32: 1,
+}
+# Municipio con más accidentes (la capital o la ciudad principal)
+MUNICIPIO_PRINCIPAL = {26: 30, 19: 39, 14: 39, 8: 37, 2: 4}
+
+# Valor -> probabilidad para las columnas de texto
+CATEGORIAS = {
+    'COBERTURA': {'Municipal': 1.0},
+    'URBANA': {'Accidente en intersección': 0.45, 'Accidente en no intersección': 0.45,
+               'Sin accidente en esta zona': 0.10},
+    'SUBURBANA': {'Sin accidente en esta zona': 0.90, 'Camino rural': 0.03,
+                  'Carretera estatal': 0.05, 'Otro camino': 0.02},
+    'TIPACCID': {'Colisión con vehículo automotor': 0.62, 'Colisión con objeto fijo': 0.11,
+                 'Colisión con motocicleta': 0.09, 'Colisión con peatón (atropellamiento)': 0.05,
+                 'Salida del camino': 0.03, 'Volcadura': 0.02, 'Colisión con ciclista': 0.02,
+                 'Caída de pasajero': 0.01, 'Colisión con animal': 0.01,
+                 'Colisión con ferrocarril': 0.002, 'Incendio': 0.001, 'Otro': 0.037},
+    'CAUSAACCI': {'Conductor': 0.91, 'Peatón o pasajero': 0.02, 'Falla del vehículo': 0.02,
+                  'Mala condición del camino': 0.01, 'Otra': 0.04},
+    'CAPAROD': {'Pavimentada': 0.97, 'No pavimentada': 0.02, 'Certificado cero': 0.01},
+    'SEXO': {'Hombre': 0.74, 'Mujer': 0.13, 'Se fugó': 0.12, 'Certificado cero': 0.01},
+    'ALIENTO': {'No': 0.75, 'Sí': 0.03, 'Se ignora': 0.21, 'Certificado cero': 0.01},
+    'CINTURON': {'Sí': 0.55, 'No': 0.05, 'Se ignora': 0.39, 'Certificado cero': 0.01},
+}
+
+# Probabilidad de 0, 1, 2, ... vehículos de cada tipo en un accidente
+VEHICULOS = {
+    'AUTOMOVIL': [0.25, 0.45, 0.25, 0.04, 0.01],
+    'CAMPASAJ': [0.99, 0.01],
+    'MICROBUS': [0.99, 0.01],
+    'PASCAMION': [0.985, 0.015],
+    'OMNIBUS': [0.995, 0.005],
+    'TRANVIA': [0.9995, 0.0005],
+    'CAMIONETA': [0.60, 0.33, 0.06, 0.01],
+    'CAMION': [0.93, 0.065, 0.005],
+    'TRACTOR': [0.99, 0.01],
+    'FERROCARRI': [0.999, 0.001],
+    'MOTOCICLET': [0.85, 0.14, 0.01],
+    'BICICLETA': [0.97, 0.03],
+    'OTROVEHIC': [0.99, 0.01],
+}
+
+# Probabilidad de que haya al menos una víctima en la columna; el número de
+# víctimas sigue una geométrica
+VICTIMAS = {
+    'CONDMUERTO': 0.004, 'CONDHERIDO': 0.08, 'PASAMUERTO': 0.002, 'PASAHERIDO': 0.05,
+    'PEATMUERTO': 0.003, 'PEATHERIDO': 0.03, 'CICLMUERTO': 0.0005, 'CICLHERIDO': 0.01,
+    'OTROMUERTO': 0.0003, 'OTROHERIDO': 0.004, 'NEMUERTO': 0.0002, 'NEHERIDO': 0.002,
+}
+
+# Accidentes por hora del día (pico a las 14-15 h); 99 = no especificada
+PESO_HORA = np.array([2, 1.5, 1.2, 1, 1, 1.2, 2, 3.5, 4.5, 4.5, 4.5, 4.8, 5.2, 5.8,
+                      6.2, 6, 5.8, 5.6, 5.4, 5, 4.2, 3.6, 3, 2.5])
+
+
+def _elegir(rng, probabilidades, n):
+    valores = list(probabilidades)
+    p = np.array([probabilidades[v] for v in valores], dtype='float64')
+    return np.array(valores, dtype=object)[rng.choice(len(valores), size=n, p=p / p.sum())]
+
+
+def _municipios(rng, entidades):
+    """Municipio de cada registro: ley de Zipf dentro de cada entidad"""
+    municipios = np.empty(len(entidades), dtype='int64')
+    for entidad in np.unique(entidades):
+        seleccion = entidades == entidad
+        n_municipios = MUNICIPIOS[entidad]
+        orden = np.random.default_rng(entidad).permutation(np.arange(1, n_municipios + 1))
+        principal = MUNICIPIO_PRINCIPAL.get(entidad)
+        if principal is not None:
+            orden = np.concatenate([[principal], orden[orden != principal]])
+        peso = 1.0 / np.arange(1, n_municipios + 1)
+        municipios[seleccion] = orden[rng.choice(n_municipios, size=seleccion.sum(), p=peso / peso.sum())]
+    return municipios
+
+
+def generar_bloque(rng, anio, n, preliminar=False):
+    """DataFrame de `n` accidentes sintéticos del año `anio` con las columnas del CSV"""
+    datos = {}
+    entidades = np.array(list(PESO_ENTIDAD))
+    peso = np.array(list(PESO_ENTIDAD.values()), dtype='float64')
+    datos['ID_ENTIDAD'] = entidades[rng.choice(len(entidades), size=n, p=peso / peso.sum())]
+    datos['ID_MUNICIPIO'] = _municipios(rng, datos['ID_ENTIDAD'])
+    datos['ANIO'] = np.full(n, anio)
+
+    # Fechas válidas del año; el día de la semana sale de la fecha
+    inicio = np.datetime64(f'{anio}-01-01')
+    dias = (np.datetime64(f'{anio + 1}-01-01') - inicio).astype(int)
+    fechas = pd.DatetimeIndex(inicio + rng.integers(0, dias, size=n).astype('timedelta64[D]'))
+    datos['MES'] = fechas.month.to_numpy()
+    datos['ID_DIA'] = fechas.day.to_numpy()
+    datos['DIASEMANA'] = np.array(DIAS_SEMANA, dtype=object)[fechas.dayofweek.to_numpy()]
+
+    hora = rng.choice(24, size=n, p=PESO_HORA / PESO_HORA.sum())
+    datos['ID_HORA'] = np.where(rng.random(n) < 0.002, 99, hora)
+    datos['ID_MINUTO'] = np.where(rng.random(n) < 0.01, 99, rng.integers(0, 60, size=n))
+
+    for columna, probabilidades in CATEGORIAS.items():
+        datos[columna] = _elegir(rng, probabilidades, n)
+    for columna, probabilidades in VEHICULOS.items():
+        datos[columna] = rng.choice(len(probabilidades), size=n, p=probabilidades)
+
+    sin_conductor = np.isin(datos['SEXO'], ['Se fugó', 'Certificado cero'])
+    edad = np.clip(rng.normal(36, 13, size=n).round(), 12, 98).astype('int64')
+    datos['ID_EDAD'] = np.where(sin_conductor, 0, np.where(rng.random(n) < 0.03, 99, edad))
+
+    for columna, probabilidad in VICTIMAS.items():
+        con_victimas = rng.random(n) < probabilidad
+        datos[columna] = np.where(con_victimas, rng.geometric(0.7, size=n), 0)
+
+    muertos = sum(datos[col.upper()] for col in COLUMNAS_MUERTOS) + datos['NEMUERTO']
+    heridos = sum(datos[col.upper()] for col in COLUMNAS_HERIDOS) + datos['NEHERIDO']
+    datos['CLASACC'] = np.where(muertos > 0, 'Fatal', np.where(heridos > 0, 'No fatal', 'Sólo daños'))
+    datos['ESTATUS'] = np.full(n, 'Cifras preliminares' if preliminar else 'Cifras definitivas', dtype=object)
+
+    return pd.DataFrame(datos)[COLUMNAS_CSV]
+
+
+def bloques_anio(anio, registros, semilla=0, lote=LOTE_GENERACION, duplicados=0.002,
+                 preliminar=False):
+    """
+    Genera los `registros` del año en bloques de hasta `lote`. Una fracción
+    `duplicados` de cada bloque se repite tal cual (INEGI trae renglones
+    duplicados y el tidy los elimina).
+    """
+    rng = np.random.default_rng([semilla, anio])
+    pendientes = registros
+    while pendientes > 0:
+        n = min(lote, pendientes)
+        n_duplicados = int(n * duplicados)
+        bloque = generar_bloque(rng, anio, n - n_duplicados, preliminar)
+        if n_duplicados:
+            repetidos = bloque.iloc[rng.integers(0, len(bloque), size=n_duplicados)]
+            bloque = pd.concat([bloque, repetidos], ignore_index=True)
+        pendientes -= n
+        yield bloque
+
+
+def _escribir_bloques(archivo, bloques):
+    encabezado = True
+    for bloque in bloques:
+        bloque.to_csv(archivo, index=False, header=encabezado, lineterminator='\n')
+        encabezado = False
+
+
+def generar_csv(destino, anios, registros=ESCALA_NACIONAL, como_zip=True, semilla=0,
+                lote=LOTE_GENERACION):
+    """
+    Escribe atus_anual_<año>.csv para cada año en `destino`: dentro de
+    inegi_atus.zip (en conjunto_de_datos/, como el ZIP de INEGI) si
+    como_zip=True, o como archivos sueltos en destino/conjunto_de_datos/.
+    Regresa la ruta del ZIP o de la carpeta.
+    """
+    os.makedirs(destino, exist_ok=True)
+    anios = sorted(anios)
+    ultimo = anios[-1]
+    inicio = time.perf_counter()
+
+    if como_zip:
+        ruta = os.path.join(destino, 'inegi_atus.zip')
+        with zipfile.ZipFile(ruta, 'w', compression=zipfile.ZIP_DEFLATED, compresslevel=1) as z:
+            for anio in anios:
+                miembro = f'conjunto_de_datos/atus_anual_{anio}.csv'
+                with z.open(miembro, 'w', force_zip64=True) as crudo:
+                    with io.TextIOWrapper(crudo, encoding='utf-8', newline='') as archivo:
+                        _escribir_bloques(archivo, bloques_anio(anio, registros, semilla, lote,
+                                                                preliminar=anio == ultimo))
+                print(f"   ✓ {miembro}: {registros:,} registros")
+    else:
+        ruta = os.path.join(destino, 'conjunto_de_datos')
+        os.makedirs(ruta, exist_ok=True)
+        for anio in anios:
+            archivo_csv = os.path.join(ruta, f'atus_anual_{anio}.csv')
+            with open(archivo_csv, 'w', encoding='utf-8', newline='') as archivo:
+                _escribir_bloques(archivo, bloques_anio(anio, registros, semilla, lote,
+                                                        preliminar=anio == ultimo))
+            print(f"   ✓ {archivo_csv}: {registros:,} registros")
+
+    print(f"✅ {len(anios)} años sintéticos en {time.perf_counter() - inicio:.1f} s -> {ruta}")
+    return ruta
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CSV sintéticos con el formato ATUS de INEGI")
+    parser.add_argument("--registros", type=int, default=ESCALA_NACIONAL, help="registros por año")
+    parser.add_argument("--desde", type=int, default=2018)
+    parser.add_argument("--hasta", type=int, default=2024)
+    parser.add_argument("--destino", default=os.path.join("data", "raw", "inegi"))
+    parser.add_argument("--zip", action="store_true", help="escribir inegi_atus.zip en vez de CSV sueltos")
+    parser.add_argument("--semilla", type=int, default=0)
+    args = parser.parse_args()
+
+    generar_csv(args.destino, range(args.desde, args.hasta + 1), args.registros,
+                como_zip=args.zip, semilla=args.semilla)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,523 @@
+"""
+PROYECTO: Análisis de Accidentes de Tránsito en Hermosillo, Sonora
+Pipeline completo: descarga → tidy → transformación → carga → validación
+
+Cada etapa tiene una clave calculada con sus parámetros (rango de años,
+objetivos, esquema de la base...), el hash de las salidas de las etapas de
+las que depende y el hash de su código. La salida de cada clave se guarda en
+data/cache/pipeline/ y, si la clave ya tiene una salida válida, la etapa se
+omite. La descarga es la excepción: siempre revalida el ZIP con INEGI (una
+petición condicional con ETag / If-Modified-Since) y su salida se identifica
+por ETag, Last-Modified y tamaño del ZIP, así que un ZIP nuevo invalida el
+tidy y lo que sigue. Cambiar un parámetro o un archivo de entrada solo vuelve a ejecutar
+las etapas afectadas; regresar a parámetros anteriores reutiliza su salida.
+
+Uso (desde la raíz del proyecto):
+    python pipeline.py                          # todo, omitiendo lo que no cambió
+    python pipeline.py --estado                 # qué etapas están al día, sin ejecutar nada
+    python pipeline.py --from transformacion    # desde esa etapa (aunque esté en caché)
+    python pipeline.py --only carga,validacion  # solo esas etapas (aunque estén en caché)
+    python pipeline.py --anios 2020-2024 --objetivos 26,25:6 --esquema particionado
+
+Configuración (el flag tiene prioridad sobre la variable de entorno):
+    --anios          ACCIDENTES_ANIOS         rango de años, p. ej. 2018-2024
+    --objetivos      ACCIDENTES_OBJETIVOS     entidad o entidad:municipio separados
+                                              por coma, o 'todos'
+    --filtrar-tidy   ACCIDENTES_FILTRAR_TIDY  el tidy conserva solo las entidades objetivo
+    --workers        ACCIDENTES_WORKERS       procesos del tidy
+    --esquema        ACCIDENTES_ESQUEMA_BD    plano, estrella o particionado
+    --backend        ACCIDENTES_BACKEND       postgres o duckdb (archivo ACCIDENTES_DUCKDB,
+                                              por defecto data/accidentes.duckdb)
+    --cache          ACCIDENTES_CACHE         directorio de la caché
+    --zip            ACCIDENTES_ZIP           ZIP de INEGI (data/raw/inegi/inegi_atus.zip)
+    --url            ACCIDENTES_URL_INEGI     URL del ZIP
+    ACCIDENTES_DB_HOST, ACCIDENTES_DB_PORT, ACCIDENTES_DB_USER,
+    ACCIDENTES_DB_PASSWORD, ACCIDENTES_DB_NAME  conexión a PostgreSQL
+    --cubo           ACCIDENTES_CUBO_ACTIVO   la carga actualiza el cubo de accidentes
+                                              (opcional, desactivado por defecto)
+    ACCIDENTES_CUBO                           carpeta del cubo
+                                              (data/processed/cubo_accidentes)
+
+pandas, pyarrow y sqlalchemy se importan solo dentro de las etapas que los
+usan, así que --help y las etapas en caché no pagan su importación.
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import argparse
+from datetime import datetime
+
+RAIZ = os.path.dirname(os.path.abspath(__file__))
+for _directorio in ['2ConexionADatos', '3PrepDatos', '4AnalisisExp']:
+    sys.path.insert(0, os.path.join(RAIZ, _directorio))
+
+DIR_CACHE = os.path.join('data', 'cache', 'pipeline')
+ZIP_INEGI = os.path.join('data', 'raw', 'inegi', 'inegi_atus.zip')
+URL_INEGI = ("https://www.inegi.org.mx/contenidos/programas/accidentes/datosabiertos/"
+             "conjunto_de_datos_atus_anual_csv.zip")
+
+# Entradas por etapa que se conservan (las más recientes); las demás se borran
+MAX_ENTRADAS = 2
+
+# =============================================================================
+# GRAFO DE ETAPAS
+# =============================================================================
+
+ETAPAS = ['descarga', 'tidy', 'transformacion', 'carga', 'validacion']
+
+DEPENDENCIAS = {
+    'descarga': [],
+    'tidy': ['descarga'],
+    'transformacion': ['tidy'],
+    # La carga lee el registro de fuentes del tidy para el manifiesto
+    'carga': ['tidy', 'transformacion'],
+    'validacion': ['carga'],
+}
+
+# Código de cada etapa: si cambia, cambia la clave (la descarga solo depende
+# del archivo remoto, que se revalida en cada ejecución)
+CODIGO = {
+    'descarga': [],
+    'tidy': ['2ConexionADatos/connect_inegi.py', '3PrepDatos/esquema_accidentes.py',
+             '3PrepDatos/huellas.py'],
+    'transformacion': ['3PrepDatos/ETL_postgreSQL.py', '3PrepDatos/esquema_accidentes.py',
+                       '3PrepDatos/huellas.py', '3PrepDatos/objetivos.py'],
+    'carga': ['3PrepDatos/carga_copy.py', '3PrepDatos/particiones.py',
+              '3PrepDatos/esquema_estrella.py', '3PrepDatos/manifiesto.py',
+              '3PrepDatos/resumenes.py', '3PrepDatos/backends.py',
+              '3PrepDatos/cubo_accidentes.py', '3PrepDatos/configuracion_bd.py'],
+    'validacion': ['3PrepDatos/resumenes.py', '3PrepDatos/reconciliacion.py',
+                   '3PrepDatos/backends.py'],
+}
+
+
+# =============================================================================
+# CACHÉ DIRECCIONADA POR CONTENIDO
+# =============================================================================
+
+def _hash_texto(texto):
+    return hashlib.sha256(texto.encode('utf-8')).hexdigest()[:16]
+
+
+class Cache:
+    """
+    Índice de la caché (indice.json): la salida registrada para cada clave
+    de cada etapa y los hashes de los archivos ya leídos, memorizados por
+    tamaño y fecha de modificación para no releer lo que no cambió.
+    """
+
+    def __init__(self, directorio):
+        self.directorio = directorio
+        self.ruta_indice = os.path.join(directorio, 'indice.json')
+        try:
+            with open(self.ruta_indice, encoding='utf-8') as f:
+                self.indice = json.load(f)
+        except (OSError, ValueError):
+            self.indice = {}
+        self.indice.setdefault('archivos', {})
+        self.indice.setdefault('etapas', {})
+
+    def guardar(self):
+        os.makedirs(self.directorio, exist_ok=True)
+        # Hashes de archivos que ya no existen (salidas desalojadas)
+        self.indice['archivos'] = {ruta: memo for ruta, memo in self.indice['archivos'].items()
+                                   if os.path.exists(ruta)}
+        tmp = self.ruta_indice + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.indice, f, indent=2)
+        os.replace(tmp, self.ruta_indice)
+
+    def hash_archivo(self, ruta):
+        ruta = os.path.abspath(ruta)
+        info = os.stat(ruta)
+        memo = self.indice['archivos'].get(ruta)
+        if memo and memo['tamano'] == info.st_size and memo['mtime_ns'] == info.st_mtime_ns:
+            return memo['hash']
+        sha = hashlib.sha256()
+        with open(ruta, 'rb') as f:
+            for bloque in iter(lambda: f.read(1 << 20), b''):
+                sha.update(bloque)
+        self.indice['archivos'][ruta] = {'tamano': info.st_size, 'mtime_ns': info.st_mtime_ns,
+                                         'hash': sha.hexdigest()[:16]}
+        return sha.hexdigest()[:16]
+
+    def hash_salida(self, ruta):
+        """Hash de un archivo, o de un directorio (rutas relativas + hash de cada archivo)"""
+        if not os.path.isdir(ruta):
+            return self.hash_archivo(ruta)
+        partes = []
+        for actual, carpetas, archivos in os.walk(ruta):
+            carpetas.sort()
+            for nombre in sorted(archivos):
+                completa = os.path.join(actual, nombre)
+                partes.append(f'{os.path.relpath(completa, ruta)}:{self.hash_archivo(completa)}')
+        return _hash_texto('\n'.join(partes))
+
+    def clave(self, etapa, parametros, entradas):
+        codigo = {archivo: self.hash_archivo(os.path.join(RAIZ, archivo)) for archivo in CODIGO[etapa]}
+        return _hash_texto(json.dumps({'etapa': etapa, 'parametros': parametros,
+                                       'entradas': entradas, 'codigo': codigo}, sort_keys=True))
+
+    def registro(self, etapa, clave):
+        return self.indice['etapas'].get(etapa, {}).get(clave)
+
+    def registrar(self, etapa, clave, salida, hash_salida, segundos):
+        entradas = self.indice['etapas'].setdefault(etapa, {})
+        entradas[clave] = {'salida': salida, 'hash': hash_salida, 'segundos': round(segundos, 2),
+                           'fecha': datetime.now().isoformat(timespec='seconds')}
+        self._desalojar(etapa)
+        self.guardar()
+
+    def usar(self, etapa, clave):
+        self.indice['etapas'][etapa][clave]['fecha'] = datetime.now().isoformat(timespec='seconds')
+
+    def _desalojar(self, etapa):
+        """Borra las salidas más antiguas de la etapa que viven dentro de la caché"""
+        entradas = self.indice['etapas'][etapa]
+        recientes = sorted(entradas, key=lambda c: entradas[c]['fecha'], reverse=True)
+        for clave in recientes[MAX_ENTRADAS:]:
+            salida = entradas.pop(clave)['salida']
+            if salida and os.path.abspath(salida).startswith(os.path.abspath(self.directorio)):
+                if os.path.isdir(salida):
+                    shutil.rmtree(salida)
+                elif os.path.exists(salida):
+                    os.remove(salida)
+
+
+# =============================================================================
+# CONFIGURACIÓN
+# =============================================================================
+
+def _leer_anios(texto):
+    inicio, _, fin = texto.partition('-')
+    return [int(inicio), int(fin or inicio)]
+
+
+def _leer_objetivos(texto):
+    """'26,25:6' → [(26, None), (25, 6)]; 'todos' → 'todos' (mismo formato que firma_objetivos)"""
+    if texto.strip().lower() == 'todos':
+        return 'todos'
+    objetivos = []
+    for parte in texto.split(','):
+        entidad, _, municipio = parte.strip().partition(':')
+        objetivos.append((int(entidad), int(municipio) if municipio else None))
+    return sorted(set(objetivos), key=lambda o: (o[0], -1 if o[1] is None else o[1]))
+
+
+def _firma(objetivos):
+    if objetivos == 'todos':
+        return objetivos
+    return ','.join(f'{e}' if m is None else f'{e}:{m}' for e, m in objetivos)
+
+
+def _entidades(objetivos):
+    return None if objetivos == 'todos' else sorted({e for e, _ in objetivos})
+
+
+def parametros(etapa, config):
+    """Parámetros que forman parte de la clave de la etapa"""
+    if etapa == 'descarga':
+        return {'url': config['url']}
+    if etapa == 'tidy':
+        return {'anios': config['anios'],
+                'entidades': _entidades(config['objetivos']) if config['filtrar_tidy'] else None}
+    if etapa == 'transformacion':
+        return {'anios': config['anios'], 'objetivos': _firma(config['objetivos'])}
+    # La contraseña no forma parte de la clave; configuracion_bd no importa
+    # el ETL, así que una corrida sin cambios no paga pandas ni SQLAlchemy
+    from configuracion_bd import DB_CONFIG, DUCKDB_PATH
+    if config['backend'] == 'duckdb':
+        bd = {'duckdb': os.path.abspath(DUCKDB_PATH)}
+    else:
+        bd = {c: DB_CONFIG[c] for c in ['host', 'port', 'user', 'database']}
+    if etapa == 'carga':
+        return {'bd': bd, 'esquema': config['esquema'], 'cubo': config['cubo']}
+    return {'bd': bd}
+
+
+def _configurar_etl(config, rutas):
+    import ETL_postgreSQL as etl
+    etl.PARQUET_PATH = rutas['tidy']
+    etl.RANGO_ANIOS = tuple(config['anios'])
+    etl.OBJETIVOS = config['objetivos']
+    etl.ESQUEMA_BD = config['esquema']
+    etl.BACKEND_BD = config['backend']
+    etl.CUBO_ACTIVO = config['cubo']
+    return etl
+
+
+def _version_bd(config):
+    """Versión de accidentes_hermosillo según carga_manifiesto (None si la base o el manifiesto no existen)"""
+    from configuracion_bd import version_bd
+    return version_bd(config['backend'])
+
+
+# =============================================================================
+# ETAPAS
+# =============================================================================
+
+def _reemplazar(tmp, destino):
+    """Coloca la salida terminada en su lugar (una salida a medias nunca queda en destino)"""
+    if os.path.isdir(destino):
+        shutil.rmtree(destino)
+    elif os.path.exists(destino):
+        os.remove(destino)
+    os.replace(tmp, destino)
+
+
+def etapa_descarga(config, rutas, destino):
+    import connect_inegi as ci
+    return ci.download_inegi_zip(config['url'], destino)
+
+
+def etapa_tidy(config, rutas, destino):
+    import connect_inegi as ci
+    tmp = destino + '.tmp'
+    ci.TIDY_DATASET_DIR = tmp
+    entidades = _entidades(config['objetivos']) if config['filtrar_tidy'] else None
+    if ci.tidy_inegi_data(tuple(config['anios']), chunksize=ci.CHUNKSIZE_TIDY, entidades=entidades,
+                          zip_path=rutas['descarga'], workers=config['workers']) is None:
+        raise RuntimeError(f"No hay CSV anuales en {rutas['descarga']}")
+    _reemplazar(tmp, destino)
+    return destino
+
+
+def etapa_transformacion(config, rutas, destino):
+    etl = _configurar_etl(config, rutas)
+    df = etl.extraer_datos()
+    if df is None:
+        raise RuntimeError(f"No se pudo leer {rutas['tidy']}")
+    df = etl.transformar_datos(df)
+    tmp = destino + '.tmp'
+    df.to_parquet(tmp, index=False, compression='zstd')
+    _reemplazar(tmp, destino)
+    return destino
+
+
+def etapa_carga(config, rutas, destino):
+    """
+    Reemplaza en la base los años del rango cuyo archivo fuente u objetivos
+    cambiaron según el manifiesto (como proceso_etl_incremental), con sus
+    registros de la salida de la transformación
+    """
+    import pandas as pd
+    etl = _configurar_etl(config, rutas)
+    engine = etl.conectar_base_datos(interactivo=False)
+    if engine is None:
+        raise RuntimeError("No se pudo conectar a la base de datos (ver ACCIDENTES_DB_* / ACCIDENTES_BACKEND)")
+    fuentes = etl.fuentes_objetivo()
+    pendientes = etl.anios_modificados(engine, fuentes)
+    for anio in sorted(set(fuentes) - set(pendientes)):
+        print(f"   ✓ {anio}: sin cambios ({fuentes[anio]['checksum'][:16]}…), se omite")
+    if not pendientes:
+        etl.actualizar_cubo_accidentes(engine)
+        print("✓ Todos los años están al día, no hay nada que cargar")
+        return None
+    df = pd.read_parquet(rutas['transformacion'], filters=[('anio', 'in', pendientes)])
+    etl.recargar_anios(engine, df, pendientes, fuentes)
+    return None
+
+
+def etapa_validacion(config, rutas, destino):
+    etl = _configurar_etl(config, rutas)
+    reporte = etl.validar_carga(etl.crear_motor())
+    if reporte is None or (reporte['estado'] == 'falla').any():
+        raise RuntimeError("La conciliación de la carga tiene fallas (ver reporte)")
+    return None
+
+
+FUNCIONES = {
+    'descarga': etapa_descarga,
+    'tidy': etapa_tidy,
+    'transformacion': etapa_transformacion,
+    'carga': etapa_carga,
+    'validacion': etapa_validacion,
+}
+
+
+def _destino(etapa, clave, config):
+    if etapa == 'descarga':
+        return config['zip']
+    if etapa == 'tidy':
+        return os.path.join(config['cache'], 'tidy', clave)
+    if etapa == 'transformacion':
+        return os.path.join(config['cache'], 'transformacion', f'{clave}.parquet')
+    return None
+
+
+def _hash_descarga(cache, ruta):
+    """
+    Hash del ZIP según sus validadores HTTP (<zip>.json) y su tamaño; un ZIP
+    sin validadores (copiado a mano) se identifica por su contenido
+    """
+    try:
+        with open(ruta + '.json', encoding='utf-8') as f:
+            validadores = json.load(f)
+    except (OSError, ValueError):
+        validadores = {}
+    validadores = {c: validadores[c] for c in ['etag', 'last_modified'] if c in validadores}
+    if not validadores:
+        validadores['contenido'] = cache.hash_archivo(ruta)
+    validadores['tamano'] = os.path.getsize(ruta)
+    return _hash_texto(json.dumps(validadores, sort_keys=True))
+
+
+def _hash_de(cache, etapa, salida):
+    if etapa == 'descarga':
+        return _hash_descarga(cache, salida)
+    return cache.hash_salida(salida)
+
+
+def _salida_valida(cache, etapa, registro, config):
+    """Hash de la salida registrada si sigue intacta (None si ya no sirve)"""
+    if registro is None:
+        return None
+    if etapa == 'carga':
+        return registro['hash'] if _version_bd(config) == registro['hash'] else None
+    if etapa == 'validacion':
+        return registro['hash']
+    if not os.path.exists(registro['salida']):
+        return None
+    return registro['hash'] if _hash_de(cache, etapa, registro['salida']) == registro['hash'] else None
+
+
+# =============================================================================
+# EJECUCIÓN
+# =============================================================================
+
+def ejecutar(config, seleccion=None, forzar=False, solo_estado=False):
+    """
+    Recorre las etapas en orden. `seleccion` son las etapas que se pueden
+    ejecutar (por defecto todas); con forzar=True se ejecutan aunque estén
+    en caché. Las etapas fuera de la selección deben estar en caché.
+    Regresa True si todo terminó bien.
+    """
+    seleccion = ETAPAS if seleccion is None else seleccion
+    ultima = max(ETAPAS.index(e) for e in seleccion)
+    cache = Cache(config['cache'])
+    hashes, rutas = {}, {}
+
+    print("\n" + "="*80)
+    print("PIPELINE: " + " → ".join(ETAPAS))
+    print("="*80)
+
+    for etapa in ETAPAS[:len(ETAPAS) if solo_estado else ultima + 1]:
+        if any(hashes.get(d) is None for d in DEPENDENCIAS[etapa]):
+            print(f"   ⏳ {etapa:15} pendiente (depende de etapas sin salida)")
+            hashes[etapa] = None
+            continue
+
+        clave = cache.clave(etapa, parametros(etapa, config),
+                            {d: hashes[d] for d in DEPENDENCIAS[etapa]})
+        registro = cache.registro(etapa, clave)
+        hash_cache = _salida_valida(cache, etapa, registro, config)
+
+        if solo_estado:
+            estado = "al día" if hash_cache else "sin salida para esta clave"
+            print(f"   {'✅' if hash_cache else '❌'} {etapa:15} {clave}  {estado}")
+            hashes[etapa], rutas[etapa] = hash_cache, registro and registro['salida']
+            continue
+
+        # La descarga seleccionada siempre corre: su petición condicional
+        # cuesta una sola respuesta 304 si el ZIP no cambió
+        if etapa not in seleccion or (hash_cache and not forzar and etapa != 'descarga'):
+            if hash_cache is None:
+                print(f"\n❌ '{etapa}' no tiene salida en caché para estos parámetros: "
+                      f"ejecútala (p. ej. --from {etapa})")
+                return False
+            print(f"   ⏭️  {etapa:15} sin cambios (clave {clave}), se omite")
+            cache.usar(etapa, clave)
+            hashes[etapa], rutas[etapa] = hash_cache, registro['salida']
+            continue
+
+        print(f"\n▶️  {etapa} (clave {clave})")
+        destino = _destino(etapa, clave, config)
+        if destino:
+            os.makedirs(os.path.dirname(destino) or '.', exist_ok=True)
+        inicio = time.perf_counter()
+        try:
+            salida = FUNCIONES[etapa](config, rutas, destino)
+        except Exception as e:
+            print(f"\n❌ La etapa '{etapa}' falló: {type(e).__name__}: {e}")
+            cache.guardar()
+            return False
+        segundos = time.perf_counter() - inicio
+
+        if etapa == 'carga':
+            hash_salida = _version_bd(config)
+        elif etapa == 'validacion':
+            hash_salida = clave
+        else:
+            hash_salida = _hash_de(cache, etapa, salida)
+        cache.registrar(etapa, clave, salida, hash_salida, segundos)
+        hashes[etapa], rutas[etapa] = hash_salida, salida
+        print(f"✅ {etapa} en {segundos:.1f} s")
+
+    cache.guardar()
+    print("\n" + "="*80 + "\n")
+    return True
+
+
+def _lista_etapas(texto):
+    etapas = [e.strip() for e in texto.split(',') if e.strip()]
+    desconocidas = [e for e in etapas if e not in ETAPAS]
+    if desconocidas:
+        raise argparse.ArgumentTypeError(f"etapas desconocidas: {desconocidas} (válidas: {ETAPAS})")
+    return etapas
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Pipeline de accidentes: " + " → ".join(ETAPAS),
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="Las variables de entorno ACCIDENTES_* dan los valores por defecto (ver pipeline.py)")
+    grupo = parser.add_mutually_exclusive_group()
+    grupo.add_argument('--from', dest='desde', choices=ETAPAS,
+                       help="ejecutar desde esta etapa (las anteriores deben estar en caché)")
+    grupo.add_argument('--only', dest='solo', type=_lista_etapas,
+                       help="ejecutar solo estas etapas, separadas por coma")
+    grupo.add_argument('--estado', action='store_true', help="mostrar qué etapas están al día")
+    parser.add_argument('--forzar', action='store_true', help="ejecutar aunque estén en caché")
+    parser.add_argument('--anios', type=_leer_anios,
+                        default=_leer_anios(os.environ.get('ACCIDENTES_ANIOS', '2018-2024')))
+    parser.add_argument('--objetivos', type=_leer_objetivos,
+                        default=_leer_objetivos(os.environ.get('ACCIDENTES_OBJETIVOS', '26')))
+    parser.add_argument('--filtrar-tidy', action='store_true',
+                        default=os.environ.get('ACCIDENTES_FILTRAR_TIDY', '0') not in ('', '0'))
+    parser.add_argument('--cubo', action='store_true',
+                        default=os.environ.get('ACCIDENTES_CUBO_ACTIVO', '0') not in ('', '0'),
+                        help="actualizar el cubo de accidentes con la carga")
+    parser.add_argument('--workers', type=int,
+                        default=int(os.environ.get('ACCIDENTES_WORKERS', os.cpu_count() or 1)))
+    parser.add_argument('--esquema', choices=['plano', 'estrella', 'particionado'],
+                        default=os.environ.get('ACCIDENTES_ESQUEMA_BD', 'plano'))
+    parser.add_argument('--backend', choices=['postgres', 'duckdb'],
+                        default=os.environ.get('ACCIDENTES_BACKEND', 'postgres'))
+    parser.add_argument('--cache', default=os.environ.get('ACCIDENTES_CACHE', DIR_CACHE))
+    parser.add_argument('--url', default=os.environ.get('ACCIDENTES_URL_INEGI', URL_INEGI))
+    parser.add_argument('--zip', default=os.environ.get('ACCIDENTES_ZIP', ZIP_INEGI),
+                        help="ZIP de INEGI (se descarga aquí o se usa si ya existe)")
+    args = parser.parse_args(argv)
+
+    config = {'anios': args.anios, 'objetivos': args.objetivos, 'filtrar_tidy': args.filtrar_tidy,
+              'workers': args.workers, 'esquema': args.esquema, 'backend': args.backend,
+              'cubo': args.cubo,
+              'cache': args.cache, 'url': args.url,
+              'zip': args.zip}
+    if args.desde:
+        seleccion, forzar = ETAPAS[ETAPAS.index(args.desde):], True
+    elif args.solo:
+        seleccion, forzar = args.solo, True
+    else:
+        seleccion, forzar = None, args.forzar
+
+    ok = ejecutar(config, seleccion, forzar, solo_estado=args.estado)
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
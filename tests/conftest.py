@@ -0,0 +1,48 @@
+import os
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Los módulos del proyecto son scripts por carpeta (sin paquete instalable)
+for carpeta in ('2ConexionADatos', '3PrepDatos', '4AnalisisExp', 'benchmarks'):
+    sys.path.insert(0, os.path.join(RAIZ, carpeta))
+
+import pytest
+
+ANIOS_PRUEBA = (2019, 2021)
+OBJETIVOS_PRUEBA = [(26, None), (19, 39)]
+
+
+@pytest.fixture(scope='module')
+def base_duckdb(tmp_path_factory):
+    """
+    CSV sintéticos → tidy (Parquet) → ETL incremental en un archivo DuckDB,
+    dentro de un directorio temporal. Regresa (módulo del ETL, engine).
+    """
+    pytest.importorskip('duckdb')
+    import connect_inegi
+    import ETL_postgreSQL as etl
+    from datos_sinteticos import generar_csv
+
+    directorio = tmp_path_factory.mktemp('base_duckdb')
+    anterior = os.getcwd()
+    os.chdir(directorio)
+    globales = {nombre: getattr(etl, nombre)
+                for nombre in ['BACKEND_BD', 'DUCKDB_PATH', 'RANGO_ANIOS', 'OBJETIVOS', 'ESQUEMA_BD']}
+    try:
+        generar_csv(os.path.join('data', 'raw', 'inegi'), range(ANIOS_PRUEBA[0], ANIOS_PRUEBA[1] + 1),
+                    registros=4_000, semilla=3)
+        connect_inegi.tidy_inegi_data(ANIOS_PRUEBA, workers=1)
+        etl.BACKEND_BD = 'duckdb'
+        etl.DUCKDB_PATH = str(directorio / 'accidentes.duckdb')
+        etl.RANGO_ANIOS = ANIOS_PRUEBA
+        etl.OBJETIVOS = OBJETIVOS_PRUEBA
+        etl.ESQUEMA_BD = 'plano'
+        engine, _ = etl.proceso_etl_completo('incremental')
+        assert engine is not None
+        yield etl, engine
+        engine.dispose()
+    finally:
+        for nombre, valor in globales.items():
+            setattr(etl, nombre, valor)
+        os.chdir(anterior)
@@ -0,0 +1,32 @@
+"""
+Traducción del SQL de PostgreSQL a DuckDB: los marcadores de parámetros no
+se tocan dentro de literales ni en sentencias sin parámetros.
+"""
+
+from sqlalchemy import text
+
+from backends import MotorDuckDB, traducir
+
+
+def test_traducir_respeta_literales():
+    sql = ("SELECT * FROM t WHERE a LIKE '%s:x' AND c = :nombre "
+           "AND d::text = 'it''s :y' AND \"col:z\" = $$ :w $$ -- :v")
+    assert traducir(sql, {'nombre': 1}) == sql.replace('= :nombre', '= $nombre')
+    assert traducir(sql) == sql
+    assert traducir("SELECT 7 %% 2 WHERE a LIKE 'x%%' AND b = %s AND c = '%s'", [1]) == \
+        "SELECT 7 % 2 WHERE a LIKE 'x%' AND b = ? AND c = '%s'"
+
+
+def test_literales_con_marcadores_en_duckdb(tmp_path):
+    engine = MotorDuckDB(str(tmp_path / 'prueba.duckdb'))
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE t (a VARCHAR, b INTEGER)"))
+        conn.execute(text("INSERT INTO t VALUES ('%s:hora', 1), ('otro', 2)"))
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT b FROM t WHERE a LIKE '%s:%'")).scalar() == 1
+        assert conn.execute(text("SELECT b FROM t WHERE a = ':hora' OR b = :b"),
+                            {'b': 2}).scalar() == 2
+        cursor = conn.cursor()
+        cursor.execute("SELECT b FROM t WHERE a LIKE '%%s%%' AND b = %s", [1])
+        assert cursor.fetchone() == (1,)
+    engine.dispose()
@@ -0,0 +1,26 @@
+"""
+Bootstrap de la matriz vehículo x causa: con la misma semilla el resultado
+no depende del número de procesos.
+"""
+
+import numpy as np
+import pandas as pd
+
+import ETL_postgreSQL as etl
+from bootstrap_riesgo import intervalos_vehiculo_causa
+from datos_sinteticos import generar_bloque
+
+
+def test_bootstrap_igual_con_cualquier_numero_de_procesos(monkeypatch):
+    monkeypatch.setattr('metricas.ARCHIVO_METRICAS', '0')
+    monkeypatch.setattr(etl, 'RANGO_ANIOS', (2020, 2020))
+    monkeypatch.setattr(etl, 'OBJETIVOS', 'todos')
+    df = etl.transformar_datos(generar_bloque(np.random.default_rng(3), 2020, 5_000).assign(AÑO=2020))
+
+    un_proceso = intervalos_vehiculo_causa(df, replicas=1_000, lote=100, workers=1, semilla=7)
+    for workers in (2, 3):
+        pd.testing.assert_frame_equal(
+            un_proceso, intervalos_vehiculo_causa(df, replicas=1_000, lote=100, workers=workers, semilla=7))
+
+    otra_semilla = intervalos_vehiculo_causa(df, replicas=1_000, lote=100, workers=1, semilla=8)
+    assert not otra_semilla['tasa_mortalidad_sup'].equals(un_proceso['tasa_mortalidad_sup'])
@@ -0,0 +1,46 @@
+"""
+Cubo de accidentes: las consultas dan lo mismo que groupby sobre los
+registros y recargar un año solo reescribe los archivos de ese año.
+"""
+
+import numpy as np
+import pandas as pd
+
+import ETL_postgreSQL as etl
+from bench_cubo import consultas, registros_con_totales, con_groupby, _filas
+from cubo_accidentes import CuboAccidentes, actualizar_cubo, MEDIDAS
+from datos_sinteticos import generar_bloque
+
+
+def _transformados(monkeypatch):
+    monkeypatch.setattr('metricas.ARCHIVO_METRICAS', '0')
+    monkeypatch.setattr(etl, 'RANGO_ANIOS', (2019, 2021))
+    monkeypatch.setattr(etl, 'OBJETIVOS', 'todos')
+    rng = np.random.default_rng(11)
+    df = pd.concat([generar_bloque(rng, anio, 3_000).assign(AÑO=anio) for anio in (2019, 2020, 2021)],
+                   ignore_index=True)
+    return etl.transformar_datos(df)
+
+
+def test_cubo_igual_a_groupby(monkeypatch, tmp_path):
+    df = _transformados(monkeypatch)
+    actualizar_cubo(df, str(tmp_path))
+    cubo = CuboAccidentes.abrir(str(tmp_path))
+    base, por_vehiculo = registros_con_totales(df)
+    for nombre, por, filtros in consultas(2021, int(df['id_entidad'].mode()[0])):
+        esperado = con_groupby(base, por_vehiculo, por, filtros)[MEDIDAS]
+        assert _filas(esperado) == _filas(cubo.consultar(por, **filtros)), nombre
+
+
+def test_recarga_solo_reescribe_el_anio(monkeypatch, tmp_path):
+    df = _transformados(monkeypatch)
+    actualizar_cubo(df, str(tmp_path))
+    antes = {r['archivo']: r['anio'] for r in CuboAccidentes.abrir(str(tmp_path)).rebanadas}
+    totales = CuboAccidentes.abrir(str(tmp_path)).consultar(['anio'])
+
+    cubo = actualizar_cubo(df[df['anio'] == 2021], str(tmp_path), anios=[2021])
+    despues = {r['archivo']: r['anio'] for r in cubo.rebanadas}
+    assert {a for a, anio in antes.items() if anio != 2021} == {a for a, anio in despues.items() if anio != 2021}
+    assert not {a for a, anio in antes.items() if anio == 2021} & set(despues)
+    assert sorted(p.name for p in tmp_path.glob('rebanada-*')) == sorted(despues)
+    pd.testing.assert_frame_equal(cubo.consultar(['anio']), totales)
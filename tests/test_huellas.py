@@ -0,0 +1,71 @@
+"""
+Huellas por registro: estables ante el tipo con que se leyó cada columna,
+calculadas sobre los valores que se cargan, y duplicados iguales a
+drop_duplicates.
+"""
+
+import numpy as np
+import pandas as pd
+
+import ETL_postgreSQL as etl
+from datos_sinteticos import generar_bloque
+from esquema_accidentes import plan_lectura, plan_transformacion
+from huellas import huella_accidentes, quitar_duplicados, HuellasVistas
+
+
+def _registros(n=2_000, semilla=5):
+    df = generar_bloque(np.random.default_rng(semilla), 2020, n)
+    df['ID_ENTIDAD'] = 26
+    df['AÑO'] = 2020
+    return df
+
+
+def _como_parquet(df):
+    """Mismos valores con los tipos del dataset intermedio (Int8/Int16, category)"""
+    plan = plan_lectura()
+    return df.astype({col: plan[col] for col in df.columns if col in plan})
+
+
+def _transformar(monkeypatch, df):
+    monkeypatch.setattr('metricas.ARCHIVO_METRICAS', '0')
+    monkeypatch.setattr(etl, 'RANGO_ANIOS', (2018, 2024))
+    monkeypatch.setattr(etl, 'OBJETIVOS', [(26, None)])
+    return etl.transformar_datos(df.copy())
+
+
+def test_huella_igual_en_csv_y_parquet(monkeypatch):
+    df = _registros()
+    df.loc[df.index % 9 == 0, 'NEMUERTO'] = np.nan
+    desde_csv = _transformar(monkeypatch, df.astype({'NEMUERTO': 'float64'}))
+    desde_parquet = _transformar(monkeypatch, _como_parquet(df))
+    assert desde_csv['huella'].tolist() == desde_parquet['huella'].tolist()
+    assert desde_csv['huella'].is_unique
+
+
+def test_huella_sobre_valores_cargados(monkeypatch):
+    """Un entero vacío se carga como 0: los dos registros son el mismo"""
+    df = _registros(50)
+    df = df.drop_duplicates().reset_index(drop=True)
+    vacio = df.iloc[[0]].astype({'NEMUERTO': 'float64'})
+    vacio['NEMUERTO'] = np.nan
+    cero = df.iloc[[0]].copy()
+    cero['NEMUERTO'] = 0
+    resultado = _transformar(monkeypatch, pd.concat([df, vacio, cero], ignore_index=True))
+    assert len(resultado) == len(pd.concat([df, cero]).drop_duplicates())
+    assert resultado['huella'].is_unique
+
+    # La huella de la tabla es la de los valores ya convertidos
+    convertido = etl.aplicar_plan_tipos(cero.rename(columns=str.lower), plan_transformacion())
+    assert huella_accidentes(convertido)[0] in resultado['huella'].to_numpy()
+
+
+def test_quitar_duplicados_por_bloques():
+    df = _registros(3_000)
+    df = pd.concat([df, df.sample(400, random_state=1)], ignore_index=True)
+    df = df.sample(frac=1, random_state=2).reset_index(drop=True)
+    esperado = df.drop_duplicates()
+
+    vistas = HuellasVistas()
+    bloques = [quitar_duplicados(df.iloc[i:i + 250], vistas) for i in range(0, len(df), 250)]
+    pd.testing.assert_frame_equal(pd.concat(bloques), esperado)
+    pd.testing.assert_frame_equal(quitar_duplicados(_como_parquet(df)).astype(df.dtypes), esperado)
@@ -0,0 +1,36 @@
+"""
+Las tablas de resumen dan lo mismo que las consultas sobre
+accidentes_hermosillo, por objetivo, tras la carga y tras refrescar un año.
+"""
+
+from resumenes import comparar_resumenes, refrescar_resumenes, CONSULTAS_VALIDACION
+from backends import leer_sql
+from conftest import OBJETIVOS_PRUEBA
+
+
+def _diferentes(engine):
+    reporte = comparar_resumenes(engine, repeticiones=1)
+    assert len(reporte) == len(CONSULTAS_VALIDACION)
+    return reporte.loc[~reporte['iguales'], 'consulta'].tolist()
+
+
+def test_resumenes_igual_que_tabla(base_duckdb):
+    _, engine = base_duckdb
+    assert _diferentes(engine) == []
+
+    # Los dos objetivos quedan como filas propias (nunca sumados entre sí)
+    with engine.connect() as conn:
+        conteos = leer_sql(conn, "SELECT id_entidad, SUM(accidentes) AS n "
+                                 "FROM resumen_temporal GROUP BY id_entidad ORDER BY 1")
+    assert conteos['id_entidad'].tolist() == sorted(e for e, _ in OBJETIVOS_PRUEBA)
+    assert (conteos['n'] > 0).all()
+
+
+def test_refrescar_un_anio(base_duckdb):
+    _, engine = base_duckdb
+    with engine.begin() as conn:
+        conn.execute("DELETE FROM accidentes_hermosillo WHERE anio = 2020 AND mes = 1")
+    assert _diferentes(engine) != []
+
+    refrescar_resumenes(engine, anios=[2020], objetivos=OBJETIVOS_PRUEBA)
+    assert _diferentes(engine) == []
@@ -0,0 +1,71 @@
+"""
+El modo por bloques de tidy_inegi_data debe dar las mismas filas, columnas
+y valores que el modo en memoria (el original).
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow.dataset as ds
+
+import connect_inegi
+from datos_sinteticos import generar_csv
+from esquema_accidentes import particionado_arrow
+
+ANIOS = [2019, 2020]
+
+
+def _preparar_fuentes(raiz):
+    """CSV sintéticos sueltos con una columna fuera del esquema y celdas vacías"""
+    carpeta = generar_csv(os.path.join(raiz, 'data', 'raw', 'inegi'), ANIOS, registros=3_000,
+                          como_zip=False, semilla=7)
+    for anio in ANIOS:
+        ruta = os.path.join(carpeta, f'atus_anual_{anio}.csv')
+        df = pd.read_csv(ruta, dtype=str, keep_default_na=False)
+        df['OBSERVACION'] = np.where(np.arange(len(df)) % 5 == 0, '', 'sin dato')
+        df.loc[df.index % 7 == 0, 'NEMUERTO'] = ''
+        # Renglón repetido entre bloques distintos
+        df = pd.concat([df, df.iloc[[10]]], ignore_index=True)
+        df.to_csv(ruta, index=False)
+
+
+def _leer(ruta):
+    return pd.read_csv(ruta, low_memory=False)
+
+
+def test_bloques_igual_que_en_memoria(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    _preparar_fuentes(str(tmp_path))
+    sin_zip = str(tmp_path / 'no_existe.zip')
+    salida = os.path.join(connect_inegi.PROCESSED_DIR, 'inegi_tidy.csv')
+
+    en_memoria = connect_inegi.tidy_inegi_data((2019, 2020), zip_path=sin_zip)
+    esperado = _leer(salida)
+    assert en_memoria['AÑO'].dtype.kind == 'i'
+
+    connect_inegi.tidy_inegi_data((2019, 2020), chunksize=500, zip_path=sin_zip,
+                                  workers=2, exportar_csv=True)
+    por_bloques = _leer(salida)
+
+    assert list(por_bloques.columns) == list(esperado.columns)
+    assert 'OBSERVACION' in por_bloques.columns
+    pd.testing.assert_frame_equal(por_bloques, esperado, check_dtype=False)
+
+    # El dataset Parquet tiene las mismas filas, con AÑO entero
+    tabla = ds.dataset(connect_inegi.TIDY_DATASET_DIR, format='parquet',
+                       partitioning=particionado_arrow()).to_table()
+    assert str(tabla.schema.field('AÑO').type) == 'int16'
+    parquet = tabla.to_pandas()[list(esperado.columns)]
+    parquet = parquet.sort_values(list(esperado.columns)).reset_index(drop=True)
+    ordenado = esperado.sort_values(list(esperado.columns)).reset_index(drop=True)
+    for col in esperado.columns:
+        np.testing.assert_array_equal(_como_texto(parquet[col]), _como_texto(ordenado[col]),
+                                      err_msg=col)
+
+
+def _como_texto(serie):
+    """Texto de cada valor como lo guarda Parquet (enteros sin '.0')"""
+    if pd.api.types.is_float_dtype(serie):
+        serie = serie.astype('Int64')
+    return serie.astype(str).where(serie.notna(), '<nulo>').to_numpy()